@@ -0,0 +1,69 @@
+"""
+Measure the import time of the SDK modules with ``python -X importtime``, each import running in a fresh interpreter.
+
+For every module, the median over the runs of the total import time and of the time spent in the SDK's own modules
+is reported, along with the slowest imports of the last run and the specification modules that got loaded::
+
+    python benchmarks/bench_import_time.py --repeat 10 --top 10
+
+With ``--budget``, the script fails if the best time spent in the SDK's own modules exceeds the budget, for a
+regression check on a quiet machine::
+
+    python benchmarks/bench_import_time.py reality_capture.service.service --budget 120
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+_MODULES = ["reality_capture.service.job", "reality_capture.service.service",
+            "reality_capture.service.async_service", "reality_capture.service.data_handler"]
+
+
+def measure_import(module: str) -> list[tuple[str, int, int]]:
+    """
+    Import a module in a new interpreter and return the ``(module, self_us, cumulative_us)`` of each import.
+    """
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                             capture_output=True, text=True, check=True)
+    imports = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        imports.append((name.strip(), int(self_us), int(cumulative_us)))
+    return imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=_MODULES, help="Modules to import.")
+    parser.add_argument("--repeat", type=int, default=10, help="Number of imports of each module.")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest imports displayed.")
+    parser.add_argument("--budget", type=float, default=None,
+                        help="Maximum time in ms spent in reality_capture modules, best of the runs.")
+    args = parser.parse_args()
+
+    over_budget = []
+    for module in args.modules:
+        totals, own = [], []
+        for _ in range(args.repeat):
+            imports = measure_import(module)
+            totals.append(next(cumulative for name, _, cumulative in imports if name == module))
+            own.append(sum(self_us for name, self_us, _ in imports if name.startswith("reality_capture")))
+        print(f"{module}: {statistics.median(totals) / 1000:.1f} ms, "
+              f"{statistics.median(own) / 1000:.1f} ms in reality_capture")
+        dependencies = [i for i in imports if i[0] not in (module, "site")]
+        for name, _, cumulative in sorted(dependencies, key=lambda i: i[2], reverse=True)[:args.top]:
+            print(f"    {cumulative / 1000:8.1f} ms  {name}")
+        specifications = [name for name, _, _ in imports if name.startswith("reality_capture.specifications.")]
+        print(f"    specification modules loaded: {len(specifications)}")
+        if args.budget is not None and min(own) / 1000 > args.budget:
+            over_budget.append(module)
+
+    if over_budget:
+        sys.exit(f"Over the {args.budget} ms budget: {', '.join(over_budget)}")
+
+
+if __name__ == "__main__":
+    main()
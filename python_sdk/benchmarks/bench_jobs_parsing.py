@@ -0,0 +1,72 @@
+"""
+Compare the parsing time of a large ``get_jobs`` page with the specifications dispatch table and with the former
+``if``/``elif`` chain building the specifications through keyword arguments.
+
+The page is built from the sample jobs of the test data, with alternating job types::
+
+    python benchmarks/bench_jobs_parsing.py --jobs 1000 --repeat 20
+"""
+import argparse
+import json
+import os
+import time
+from typing import Any
+
+from pydantic import ValidationInfo, field_validator
+
+from reality_capture.service.job import Job, Jobs, JobType, _get_specifications_model
+
+_DATA_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests", "data")
+# Order of the former if/elif chain, which the table follows
+_CHAIN = [(job_type, _get_specifications_model(job_type)) for job_type in JobType]
+
+
+class _ChainJob(Job):
+    @field_validator("specifications", mode="plain")
+    @classmethod
+    def set_specification_validation_model(cls, raw_dict: dict[str, Any], validation_info: ValidationInfo):
+        job_type = validation_info.data['type']
+        for chain_type, model in _CHAIN:
+            if job_type == chain_type:
+                return model(**raw_dict)
+        raise ValueError(f"Unsupported job type: {job_type}")
+
+
+class _ChainJobs(Jobs):
+    jobs: list[_ChainJob]
+
+
+def _get_payload(nb_jobs: int) -> str:
+    samples = []
+    for name in ("jobs_get_200.json", "job_get_200.json", "job_create_201.json"):
+        with open(os.path.join(_DATA_FOLDER, name), "r") as payload_data:
+            payload = json.load(payload_data)
+        samples.extend(payload["jobs"] if "jobs" in payload else [payload["job"]])
+    jobs = []
+    for i in range(nb_jobs):
+        job = dict(samples[i % len(samples)])
+        job["id"] = f"00000000-0000-0000-0000-{i:012d}"
+        jobs.append(job)
+    return json.dumps({"jobs": jobs})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=1000, help="Number of jobs in the page.")
+    parser.add_argument("--repeat", type=int, default=20, help="Number of times the page is parsed.")
+    args = parser.parse_args()
+
+    payload = _get_payload(args.jobs)
+    data = json.loads(payload)
+    for name, model in [("if/elif chain", _ChainJobs), ("dispatch table", Jobs)]:
+        # Warm up pydantic
+        model.model_validate(data)
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            model.model_validate(data)
+        elapsed = (time.perf_counter() - start) / args.repeat
+        print(f"{name:>15}: {elapsed * 1000:8.2f} ms/page, {elapsed / args.jobs * 1e6:6.1f} us/job")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Compare the upload throughput of many small files with and without small-file batching.
+
+The blob endpoint is a local stand-in running in a separate process, with a configurable latency per request::
+
+    python benchmarks/bench_small_files.py --files 2000 --size 20000 --latency 0.02
+"""
+import argparse
+import http.server
+import multiprocessing
+import os
+import tempfile
+import time
+
+from reality_capture.service.data_handler import _DataHandler, TransferOptions
+
+
+class _BlobHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+
+    def do_PUT(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.latency)
+        self.send_response(201)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve(port: int, latency: float) -> None:
+    _BlobHandler.latency = latency
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", port), _BlobHandler)
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=2000, help="Number of files to upload.")
+    parser.add_argument("--size", type=int, default=20000, help="Size of each file in bytes.")
+    parser.add_argument("--latency", type=float, default=0.02, help="Latency of each blob request in seconds.")
+    parser.add_argument("--batch-size", type=int, default=32, help="Number of files per batch.")
+    parser.add_argument("--port", type=int, default=10100, help="Port of the local blob stand-in.")
+    args = parser.parse_args()
+
+    server = multiprocessing.Process(target=_serve, args=(args.port, args.latency), daemon=True)
+    server.start()
+    time.sleep(0.5)
+    container_url = f"http://127.0.0.1:{args.port}/container?sv=2020-01-01&sig=benchmark"
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for i in range(args.files):
+                with open(os.path.join(tmp_dir, f"{i:06d}.jpg"), "wb") as f:
+                    f.write(os.urandom(args.size))
+            for name, options in [("one call per file", TransferOptions()),
+                                  ("batched", TransferOptions(small_file_batch_size=args.batch_size))]:
+                start = time.perf_counter()
+                cpu_start = time.process_time()
+                r = _DataHandler.upload_data(container_url, tmp_dir, "", None, options)
+                elapsed = time.perf_counter() - start
+                cpu = time.process_time() - cpu_start
+                if r.is_error():
+                    raise RuntimeError(r.error)
+                print(f"{name:>20}: {args.files / elapsed:8.1f} files/s, {cpu / args.files * 1000:.2f} ms CPU/file")
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+Measure the upload and download throughput of the data handlers on many small files, a few huge files and a mixed
+tree, for several transfer configurations.
+
+Each transfer runs in a fresh process so that its peak RSS and CPU time are its own. The blobs go to the mock server
+of the SDK, running in another process with a configurable latency per blob request, or to any container given by
+its SAS url, for instance on Azurite::
+
+    python benchmarks/bench_transfers.py --scenarios small mixed --configs default batched --repeat 3
+    python benchmarks/bench_transfers.py --sweep max_in_flight=8,32,128 --handlers sync async
+    python benchmarks/bench_transfers.py --container-url "http://127.0.0.1:10000/devstoreaccount1/bench?<sas>"
+
+Results can be saved with ``--json`` and compared to a previous run with ``--baseline``, the throughput differences
+being reported in percent.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from dataclasses import asdict
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    # Not available on Windows, the peak RSS is not reported there
+    resource = None
+
+from reality_capture.service.data_handler import TransferOptions, _DataHandler
+from reality_capture.service.mock_server import MockServer, MockServerOptions
+
+_MB = 1024 * 1024
+
+_CONFIGS = {
+    "default": {},
+    "batched": {"small_file_batch_size": 32},
+    "in-flight-16": {"max_in_flight": 16},
+    "chunk-16MB": {"chunk_size": 16 * _MB},
+}
+
+
+def get_scenario(name: str, args) -> list[tuple[str, int]]:
+    """
+    Return the relative path and size of each file of a scenario.
+    """
+    rng = random.Random(args.seed)
+    if name == "small":
+        return [(f"{i // 100:03d}/{i:06d}.jpg", args.small_size) for i in range(args.small_files)]
+    if name == "huge":
+        return [(f"{i:02d}.bin", args.huge_size) for i in range(args.huge_files)]
+    # Mostly images with some point clouds and a few large files, as in a typical capture
+    files = []
+    for i in range(args.mixed_files):
+        draw = rng.random()
+        if draw < 0.80:
+            size = rng.randint(16 * 1024, 512 * 1024)
+        elif draw < 0.97:
+            size = rng.randint(1 * _MB, 16 * _MB)
+        else:
+            size = rng.randint(64 * _MB, 128 * _MB)
+        files.append((f"{i % 7}/{i % 3}/{i:05d}.dat", size))
+    return files
+
+
+def write_files(root: str, files: list[tuple[str, int]]) -> None:
+    # Incompressible content, generated once and sliced
+    pattern = os.urandom(4 * _MB)
+    for index, (path, size) in enumerate(files):
+        file_path = os.path.join(root, path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as f:
+            offset = index % len(pattern)
+            remaining = size
+            while remaining > 0:
+                chunk = pattern[offset:offset + remaining]
+                f.write(chunk)
+                remaining -= len(chunk)
+                offset = 0
+
+
+def _get_peak_rss() -> float:
+    if resource is None:
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (_MB if sys.platform == "darwin" else 1024)
+
+
+def _run_transfer(container_url: str, operation: str, handler: str, options: dict, local_path: str, prefix: str,
+                  results) -> None:
+    transfer_options = TransferOptions(**options)
+    cpu_start = os.times()
+    start = time.perf_counter()
+    if handler == "async":
+        from reality_capture.service.async_data_handler import _AsyncDataHandler
+        if operation == "upload":
+            coroutine = _AsyncDataHandler.upload_data(container_url, local_path, prefix, None, transfer_options)
+        else:
+            coroutine = _AsyncDataHandler.download_data(container_url, local_path, prefix + "/", None,
+                                                        transfer_options)
+        r = asyncio.run(coroutine)
+    elif operation == "upload":
+        r = _DataHandler.upload_data(container_url, local_path, prefix, None, transfer_options)
+    else:
+        r = _DataHandler.download_data(container_url, local_path, prefix + "/", None, transfer_options)
+    elapsed = time.perf_counter() - start
+    cpu_end = os.times()
+    results.put({"error": str(r.error) if r.is_error() else None, "seconds": elapsed,
+                 "cpu": (cpu_end.user - cpu_start.user) + (cpu_end.system - cpu_start.system),
+                 "peak_rss_mb": _get_peak_rss()})
+
+
+def measure(container_url: str, operation: str, handler: str, options: dict, local_path: str, prefix: str) -> dict:
+    """
+    Run a transfer in a new process and return its measures.
+    """
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_run_transfer,
+                              args=(container_url, operation, handler, options, local_path, prefix, results))
+    process.start()
+    result = results.get()
+    process.join()
+    if result["error"] is not None:
+        raise RuntimeError(f"{operation} failed: {result['error']}")
+    return result
+
+
+def _serve(options: MockServerOptions, container: str, urls) -> None:
+    server = MockServer(options)
+    urls.put(server.create_container(container))
+    server.serve_forever()
+
+
+def get_configs(args) -> dict[str, dict]:
+    configs = {name: _CONFIGS[name] for name in args.configs}
+    for sweep in args.sweep:
+        field_name, values = sweep.split("=", 1)
+        for value in values.split(","):
+            configs[f"{field_name}={value}"] = {field_name: int(value) if value.isdigit() else float(value)}
+    for name, options in configs.items():
+        # Fail before any transfer on a misspelled field
+        TransferOptions(**options)
+    return configs
+
+
+def format_row(row: dict, baseline: dict) -> str:
+    key = (row["scenario"], row["handler"], row["config"], row["operation"])
+    line = (f"{row['scenario']:>6} {row['handler']:>5} {row['config']:>24} {row['operation']:>8} "
+            f"{row['mb_per_s']:9.1f} {row['files_per_s']:9.1f} {row['cpu_s']:7.2f} {row['cpu_percent']:6.0f} "
+            f"{row['peak_rss_mb']:9.1f}")
+    # Throughputs are only comparable on the same data set
+    if key in baseline and baseline[key]["files"] == row["files"] and baseline[key]["megabytes"] == row["megabytes"]:
+        change = 100.0 * (row["mb_per_s"] / baseline[key]["mb_per_s"] - 1.0)
+        line += f" {change:+7.1f}%"
+    return line
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", default=["small", "huge", "mixed"],
+                        choices=["small", "huge", "mixed"], help="Data sets to transfer.")
+    parser.add_argument("--configs", nargs="*", default=["default", "batched"], choices=list(_CONFIGS),
+                        help="Named transfer configurations.")
+    parser.add_argument("--sweep", nargs="*", default=[],
+                        help="TransferOptions field and values to measure, like max_in_flight=8,32,128.")
+    parser.add_argument("--handlers", nargs="+", default=["sync"], choices=["sync", "async"],
+                        help="Data handlers to measure, async needs aiohttp.")
+    parser.add_argument("--operations", nargs="+", default=["upload", "download"], choices=["upload", "download"],
+                        help="Transfers to measure, downloads read the blobs of the upload of the same run.")
+    parser.add_argument("--repeat", type=int, default=1, help="Number of runs of each configuration, the median "
+                                                              "throughput is reported.")
+    parser.add_argument("--small-files", type=int, default=2000, help="Number of files of the small scenario.")
+    parser.add_argument("--small-size", type=int, default=16 * 1024, help="Size of the small files in bytes.")
+    parser.add_argument("--huge-files", type=int, default=2, help="Number of files of the huge scenario.")
+    parser.add_argument("--huge-size", type=int, default=256 * _MB, help="Size of the huge files in bytes.")
+    parser.add_argument("--mixed-files", type=int, default=500, help="Number of files of the mixed scenario.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the mixed scenario.")
+    parser.add_argument("--blob-latency", type=float, default=0.005,
+                        help="Latency of each blob request of the mock server in seconds.")
+    parser.add_argument("--container-url", default=None,
+                        help="SAS url of the container to use instead of the mock server.")
+    parser.add_argument("--json", default=None, help="File to write the results to.")
+    parser.add_argument("--baseline", default=None, help="Results of a previous run to compare to.")
+    args = parser.parse_args()
+
+    configs = get_configs(args)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {(row["scenario"], row["handler"], row["config"], row["operation"]): row
+                        for row in json.load(f)["results"]}
+
+    server = None
+    container_url = args.container_url
+    if container_url is None:
+        context = multiprocessing.get_context("spawn")
+        urls = context.Queue()
+        server = context.Process(target=_serve, args=(MockServerOptions(blob_latency=args.blob_latency),
+                                                      "benchmark", urls), daemon=True)
+        server.start()
+        container_url = urls.get()
+
+    rows = []
+    print(f"{'data':>6} {'mode':>5} {'config':>24} {'transfer':>8} {'MB/s':>9} {'files/s':>9} {'CPU s':>7} "
+          f"{'CPU %':>6} {'RSS MB':>9}" + (" vs base" if baseline else ""))
+    try:
+        for scenario in args.scenarios:
+            files = get_scenario(scenario, args)
+            total_mb = sum(size for _, size in files) / _MB
+            with tempfile.TemporaryDirectory() as src:
+                write_files(src, files)
+                for handler in args.handlers:
+                    for config, options in configs.items():
+                        runs = {operation: [] for operation in args.operations}
+                        for _ in range(args.repeat):
+                            prefix = f"{scenario}-{uuid.uuid4().hex[:8]}"
+                            with tempfile.TemporaryDirectory() as dst:
+                                # Downloads need the blobs of an upload, which is measured only if asked for
+                                upload = measure(container_url, "upload", handler, options, src, prefix)
+                                if "upload" in runs:
+                                    runs["upload"].append(upload)
+                                if "download" in runs:
+                                    runs["download"].append(measure(container_url, "download", handler, options,
+                                                                    dst, prefix))
+                            _DataHandler.delete_prefix(container_url, prefix + "/")
+                        for operation, measures in runs.items():
+                            seconds = statistics.median(m["seconds"] for m in measures)
+                            cpu = statistics.median(m["cpu"] for m in measures)
+                            row = {"scenario": scenario, "handler": handler, "config": config,
+                                   "operation": operation, "options": options, "files": len(files),
+                                   "megabytes": total_mb, "seconds": seconds, "mb_per_s": total_mb / seconds,
+                                   "files_per_s": len(files) / seconds, "cpu_s": cpu,
+                                   "cpu_percent": 100.0 * cpu / seconds,
+                                   "peak_rss_mb": max(m["peak_rss_mb"] for m in measures)}
+                            rows.append(row)
+                            print(format_row(row, baseline), flush=True)
+    finally:
+        if server is not None:
+            server.terminate()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"python": sys.version, "platform": sys.platform, "cpu_count": os.cpu_count(),
+                       "blob_latency": None if args.container_url else args.blob_latency,
+                       "defaults": asdict(TransferOptions()), "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,670 @@
+import asyncio
+import itertools
+import os.path
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable, Iterable, Iterator, Optional, Union
+from reality_capture.service.error import DetailedErrorResponse, DetailedError, Error
+from reality_capture.service.response import Response
+from reality_capture.service.async_service import AsyncRealityCaptureService
+from reality_capture.service.reality_data import RealityDataUpdate, RealityData, ContainerDetails
+from reality_capture.service.bucket import BucketResponse
+from reality_capture.service.data_handler import (RealityDataHandler, BucketDataHandler, TransferOptions,
+                                                  _DataHandler, _ProgressAggregator, _SasRenewal, _TransferRecorder)
+from azure.storage.blob import ContentSettings
+
+try:
+    import aiohttp
+    from azure.core.pipeline.transport import AioHttpTransport
+    from azure.storage.blob.aio import ContainerClient
+except ImportError:  # pragma: no cover
+    aiohttp = None
+    AioHttpTransport = object
+
+
+class _AsyncSasRenewal(_SasRenewal):
+    """
+    Asynchronous version of :class:`_SasRenewal`, the latest link is returned by a coroutine function.
+    """
+
+    def __init__(self, container_url: str, renew_url: Optional[Callable[[], Awaitable[Optional[str]]]]) -> None:
+        super().__init__(container_url, renew_url)
+
+    async def apply(self, url: str) -> str:
+        if self._renew_url is None or not self._sas:
+            return url
+        return self._swap(url, await self._renew_url())
+
+
+class _SasRenewingAioTransport(AioHttpTransport):
+    """
+    Aiohttp transport applying a SAS renewal to every request, including the retries.
+    """
+
+    def __init__(self, renewal: _AsyncSasRenewal, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self._renewal = renewal
+
+    async def send(self, request, **kwargs):
+        request.url = await self._renewal.apply(request.url)
+        return await super().send(request, **kwargs)
+
+
+class _AsyncDataHandler:
+    _END_OF_TASKS = object()
+
+    @staticmethod
+    def _get_container_client(container_url: str, options: TransferOptions,
+                              renew_url: Optional[Callable[[], Awaitable[Optional[str]]]] = None) -> "ContainerClient":
+        # One session per transfer, its connector bounds the number of connections shared by all the blobs
+        session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=options.max_connections),
+                                        trust_env=True, auto_decompress=False)
+        transport = _SasRenewingAioTransport(_AsyncSasRenewal(container_url, renew_url), session=session,
+                                             session_owner=True)
+        return ContainerClient.from_container_url(container_url, transport=transport,
+                                                  max_single_get_size=options.chunk_size,
+                                                  max_chunk_get_size=options.chunk_size,
+                                                  max_single_put_size=_DataHandler._SINGLE_PUT_SIZE,
+                                                  max_block_size=options.chunk_size)
+
+    @staticmethod
+    async def _iterate(tasks: Union[Iterable, AsyncIterable]) -> AsyncIterator:
+        if hasattr(tasks, "__aiter__"):
+            async for task in tasks:
+                yield task
+        else:
+            for task in tasks:
+                yield task
+
+    @staticmethod
+    async def _iterate_in_thread(iterator: Iterator, chunk_size: int = 256) -> AsyncIterator:
+        # Blocking iterators, like the walk of a source folder, are advanced in a thread a chunk at a time
+        loop = asyncio.get_running_loop()
+        while True:
+            chunk = await loop.run_in_executor(None, lambda: list(itertools.islice(iterator, chunk_size)))
+            if not chunk:
+                return
+            for item in chunk:
+                yield item
+
+    @staticmethod
+    async def _get_chunks(items: Union[Iterable, AsyncIterable], size: int) -> AsyncIterator[list]:
+        chunk = []
+        async for item in _AsyncDataHandler._iterate(items):
+            chunk.append(item)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    async def _run_workers(tasks: Union[Iterable, AsyncIterable], worker: Callable[..., Awaitable],
+                           max_workers: int) -> None:
+        """
+        Await worker on each task with at most max_workers tasks at the same time, pulling the tasks lazily.
+
+        The first exception raised by a worker cancels the other ones and is raised.
+        """
+        iterator = _AsyncDataHandler._iterate(tasks)
+        lock = asyncio.Lock()
+
+        async def _work():
+            while True:
+                async with lock:
+                    try:
+                        task = await iterator.__anext__()
+                    except StopAsyncIteration:
+                        return
+                await worker(task)
+
+        workers = [asyncio.ensure_future(_work()) for _ in range(max(1, max_workers))]
+        done, pending = await asyncio.wait(workers, return_when=asyncio.FIRST_EXCEPTION)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        for task in done:
+            if task.exception() is not None:
+                raise task.exception()
+
+    @staticmethod
+    async def download_data(container_url: str, dst: str, src: str, progress_hook,
+                            options: Optional[TransferOptions] = None, sync: bool = False,
+                            renew_url: Optional[Callable[[], Awaitable[Optional[str]]]] = None,
+                            recorder: Optional[_TransferRecorder] = None) -> Response[None]:
+        options = options or TransferOptions()
+        loop = asyncio.get_running_loop()
+        client = _AsyncDataHandler._get_container_client(container_url, options, renew_url)
+        try:
+            blobs = {blob.name: blob async for blob in client.list_blobs() if blob.name.startswith(src)}
+            progress = _ProgressAggregator(sum(blob.size for blob in blobs.values()), progress_hook,
+                                           options.progress_interval, "Download")
+            if recorder is not None:
+                recorder.track(progress)
+
+            async def _download_blob(blob):
+                async def _download_callback(current, _):
+                    progress.update(blob.name, current)
+
+                rel_path = blob.name.removeprefix(src) if src != blob.name else os.path.basename(src)
+                download_file_path = os.path.join(dst, rel_path.strip('/'))
+                os.makedirs(os.path.dirname(download_file_path), exist_ok=True)
+                if sync and (await loop.run_in_executor(None, _DataHandler._check_sync, download_file_path, blob,
+                                                        False))[0]:
+                    progress.skip(blob.name, blob.size)
+                    return
+
+                downloader = await client.download_blob(
+                    blob.name,
+                    connection_timeout=60,
+                    max_concurrency=_DataHandler._get_nb_chunks(blob.size, options.chunk_size, options),
+                    retry_total=20,
+                    retry_connect=10,
+                    progress_hook=_download_callback,
+                )
+                with open(download_file_path, "wb") as file:
+                    await downloader.readinto(file)
+                if sync:
+                    remote_time = blob.last_modified.timestamp()
+                    os.utime(download_file_path, (remote_time, remote_time))
+                progress.complete(blob.name, blob.size)
+
+            await _AsyncDataHandler._run_workers(blobs.values(), _download_blob, options.max_in_flight)
+            progress.finish()
+        except InterruptedError as _:
+            de = DetailedErrorResponse(error={"code": "DownloadInterrupted",
+                                              "message": "Download was interrupted by user."})
+            return Response(499, de, None)
+        except Exception as e:
+            de = DetailedErrorResponse(error={"code": "DownloadFailure",
+                                              "message": f"Download failed: {e}."})
+            return Response(500, de, None)
+        finally:
+            await client.close()
+        return Response(200, None, None)
+
+    @staticmethod
+    async def upload_data(container_url: str, src: str, reality_data_dst: str, progress_hook,
+                          options: Optional[TransferOptions] = None, sync: bool = False,
+                          renew_url: Optional[Callable[[], Awaitable[Optional[str]]]] = None,
+                          recorder: Optional[_TransferRecorder] = None) -> Response[None]:
+        options = options or TransferOptions()
+        loop = asyncio.get_running_loop()
+        progress = _ProgressAggregator(0, progress_hook, options.progress_interval, "Upload", total_known=False)
+        if recorder is not None:
+            recorder.track(progress)
+        client = _AsyncDataHandler._get_container_client(container_url, options, renew_url)
+        remote_blobs = {}
+
+        async def _upload_file(file_tuple):
+            async def _upload_callback(current, _):
+                progress.update(file_tuple[0], current)
+
+            blob_name = os.path.join(reality_data_dst, file_tuple[0])
+            file_path = os.path.join(src, file_tuple[0]) if os.path.isdir(src) else src
+            content_settings = None
+            if sync:
+                synced, md5 = await loop.run_in_executor(None, _DataHandler._check_sync, file_path,
+                                                         remote_blobs.get(blob_name), True)
+                if synced:
+                    progress.skip(file_tuple[0], file_tuple[1])
+                    return
+                md5 = md5 or await loop.run_in_executor(None, _DataHandler._get_md5, file_path)
+                content_settings = ContentSettings(content_md5=bytearray(md5))
+            with open(file_path, "rb") as data:
+                await client.upload_blob(
+                    blob_name,
+                    data,
+                    content_settings=content_settings,
+                    connection_timeout=60,
+                    max_concurrency=_DataHandler._get_nb_chunks(file_tuple[1], _DataHandler._SINGLE_PUT_SIZE,
+                                                                options),
+                    retry_total=20,
+                    retry_connect=10,
+                    progress_hook=_upload_callback,
+                    overwrite=True,
+                )
+            progress.complete(file_tuple[0], file_tuple[1])
+
+        async def _discover_files():
+            async for file_tuple in _AsyncDataHandler._iterate_in_thread(_DataHandler._iter_files(src)):
+                progress.add_total(file_tuple[1])
+                yield file_tuple
+            progress.set_total_known()
+
+        try:
+            if sync:
+                remote_blobs = {blob.name: blob async for blob in client.list_blobs(name_starts_with=reality_data_dst)}
+            await _AsyncDataHandler._run_workers(_discover_files(), _upload_file, options.max_in_flight)
+            progress.finish()
+        except InterruptedError as _:
+            de = DetailedErrorResponse(error={"code": "UploadInterrupted",
+                                              "message": "Upload was interrupted by user."})
+            return Response(499, de, None)
+        except Exception as e:
+            de = DetailedErrorResponse(error={"code": "UploadFailure",
+                                              "message": f"Upload failed: {e}."})
+            return Response(500, de, None)
+        finally:
+            await client.close()
+        return Response(200, None, None)
+
+    @staticmethod
+    async def copy_data(src_container_url: str, dst_container_url: str, prefix: str, progress_hook,
+                        options: Optional[TransferOptions] = None,
+                        src_renew_url: Optional[Callable[[], Awaitable[Optional[str]]]] = None,
+                        dst_renew_url: Optional[Callable[[], Awaitable[Optional[str]]]] = None,
+                        recorder: Optional[_TransferRecorder] = None) -> Response[None]:
+        options = options or TransferOptions()
+        src_renewal = _AsyncSasRenewal(src_container_url, src_renew_url)
+        src_client = _AsyncDataHandler._get_container_client(src_container_url, options, src_renew_url)
+        dst_client = _AsyncDataHandler._get_container_client(dst_container_url, options, dst_renew_url)
+        progress = _ProgressAggregator(0, progress_hook, options.progress_interval, "Copy", total_known=False)
+        if recorder is not None:
+            recorder.track(progress)
+
+        async def _copy_blob(blob_tuple):
+            # The source url carries the read SAS, so the storage service fetches the data itself
+            source_url = await src_renewal.apply(src_client.get_blob_client(blob_tuple[0]).url)
+            dst_blob = dst_client.get_blob_client(blob_tuple[0])
+            copy_props = await dst_blob.start_copy_from_url(source_url)
+            status = copy_props["copy_status"]
+            delay = _DataHandler._COPY_POLL_MIN_DELAY
+            try:
+                while status == "pending":
+                    await asyncio.sleep(delay)
+                    delay = min(2 * delay, _DataHandler._COPY_POLL_MAX_DELAY)
+                    copy = (await dst_blob.get_blob_properties()).copy
+                    status = copy.status
+                    if copy.progress:
+                        progress.update(blob_tuple[0], int(copy.progress.split("/")[0]))
+            except InterruptedError:
+                await dst_blob.abort_copy(copy_props["copy_id"])
+                raise
+            if status != "success":
+                raise RuntimeError(f"copy of {blob_tuple[0]} ended with status {status}")
+            progress.complete(blob_tuple[0], blob_tuple[1])
+
+        async def _list_blobs():
+            async for blob in src_client.list_blobs(name_starts_with=prefix or None):
+                progress.add_total(blob.size)
+                yield blob.name, blob.size
+            progress.set_total_known()
+
+        try:
+            await _AsyncDataHandler._run_workers(_list_blobs(), _copy_blob, options.max_in_flight)
+            progress.finish()
+        except InterruptedError as _:
+            de = DetailedErrorResponse(error={"code": "CopyInterrupted",
+                                              "message": "Copy was interrupted by user."})
+            return Response(499, de, None)
+        except Exception as e:
+            de = DetailedErrorResponse(error={"code": "CopyFailure",
+                                              "message": f"Copy failed: {e}."})
+            return Response(500, de, None)
+        finally:
+            await src_client.close()
+            await dst_client.close()
+        return Response(200, None, None)
+
+    @staticmethod
+    async def list_data(container_url: str) -> Response[list[str]]:
+        client = ContainerClient.from_container_url(container_url)
+        try:
+            blob_names = [name async for name in client.list_blob_names()]
+        finally:
+            await client.close()
+        return Response(200, None, blob_names)
+
+    @staticmethod
+    async def _delete_blobs(client: "ContainerClient", blob_names: Union[Iterable[str], AsyncIterable[str]],
+                            options: TransferOptions, recorder: Optional[_TransferRecorder] = None) -> Response[None]:
+        failed = []
+        batch_sizes = []
+
+        async def _delete_batch(batch):
+            batch_sizes.append(len(batch))
+            try:
+                responses = await client.delete_blobs(*batch, raise_on_any_failure=False)
+                statuses = [response.status_code async for response in responses]
+                failed.extend(name for name, status in zip(batch, statuses) if status >= 300)
+            except Exception as _:
+                failed.extend(batch)
+
+        await _AsyncDataHandler._run_workers(_AsyncDataHandler._get_chunks(blob_names, _DataHandler._DELETE_BATCH_SIZE),
+                                             _delete_batch, options.max_in_flight)
+        if recorder is not None:
+            recorder.metrics.files = sum(batch_sizes) - len(failed)
+        if not failed:
+            return Response(204, None, None)
+        detailed_error = DetailedError(code="DeletionFailed", message="Failed to delete one or multiple files",
+                                       details=[Error(code="DeletionFailed", message="Failed to delete a file",
+                                                      target=fail) for fail in failed])
+        return Response(400, DetailedErrorResponse(error=detailed_error), None)
+
+    @staticmethod
+    async def delete_data(container_url: str, files_to_delete: list[str],
+                          options: Optional[TransferOptions] = None,
+                          renew_url: Optional[Callable[[], Awaitable[Optional[str]]]] = None,
+                          recorder: Optional[_TransferRecorder] = None) -> Response[None]:
+        options = options or TransferOptions()
+        client = _AsyncDataHandler._get_container_client(container_url, options, renew_url)
+        try:
+            return await _AsyncDataHandler._delete_blobs(client, files_to_delete, options, recorder)
+        finally:
+            await client.close()
+
+    @staticmethod
+    async def delete_prefix(container_url: str, prefix: str,
+                            options: Optional[TransferOptions] = None,
+                            renew_url: Optional[Callable[[], Awaitable[Optional[str]]]] = None,
+                            recorder: Optional[_TransferRecorder] = None) -> Response[None]:
+        options = options or TransferOptions()
+        client = _AsyncDataHandler._get_container_client(container_url, options, renew_url)
+        try:
+            blob_names = client.list_blob_names(name_starts_with=prefix or None)
+            return await _AsyncDataHandler._delete_blobs(client, blob_names, options, recorder)
+        except Exception as e:
+            de = DetailedErrorResponse(error={"code": "DeletionFailed",
+                                              "message": f"Deletion failed: {e}."})
+            return Response(500, de, None)
+        finally:
+            await client.close()
+
+
+class AsyncUploadSession:
+    """
+    Asynchronous version of :class:`UploadSession`, to use as an async context manager. Uploads of a session can
+    run concurrently in several tasks.
+    """
+
+    def __init__(self, handler: "AsyncRealityDataHandler", reality_data_id: str,
+                 itwin_id: Optional[str] = None) -> None:
+        """
+        Constructor method
+
+        :param handler: Handler performing the uploads.
+        :param reality_data_id: Id of the Reality Data.
+        :param itwin_id: Optional iTwin id for finding the reality data.
+        """
+        self._handler = handler
+        self._reality_data_id = reality_data_id
+        self._itwin_id = itwin_id
+        self._lock = asyncio.Lock()
+        self._authoring = False
+
+    async def __aenter__(self) -> "AsyncUploadSession":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.close()
+
+    async def _open(self) -> Response[None]:
+        async with self._lock:
+            if not self._authoring:
+                r = await self._handler._set_authoring(self._reality_data_id, True)
+                if r.is_error():
+                    return Response(r.status_code, r.error, None)
+                self._authoring = True
+        return Response(200, None, None)
+
+    async def upload(self, src: str, reality_data_dst: str = "", sync: bool = False) -> Response[None]:
+        """
+        Coroutine version of :meth:`UploadSession.upload`.
+        """
+        rlink = await self._handler._get_link(self._reality_data_id, self._itwin_id, False)
+        if rlink.is_error():
+            return Response(rlink.status_code, rlink.error, None)
+        r = await self._open()
+        if r.is_error():
+            return r
+        recorder = self._handler._start_transfer("upload")
+        return recorder.record(await _AsyncDataHandler.upload_data(
+            rlink.value.links.container_url.href, src, reality_data_dst, self._handler._get_progress_hook(),
+            self._handler._transfer_options, sync,
+            self._handler._get_renew_url(self._reality_data_id, self._itwin_id, False), recorder))
+
+    async def close(self) -> Response[None]:
+        """
+        Coroutine version of :meth:`UploadSession.close`.
+        """
+        async with self._lock:
+            if not self._authoring:
+                return Response(200, None, None)
+            r = await self._handler._set_authoring(self._reality_data_id, False)
+            if r.is_error():
+                return Response(r.status_code, r.error, None)
+            self._authoring = False
+        return Response(200, None, None)
+
+
+class AsyncRealityDataHandler(RealityDataHandler):
+    """
+    Asynchronous version of :class:`RealityDataHandler`, based on ``azure.storage.blob.aio``.
+
+    It requires the ``async`` extra (``pip install reality_capture[async]``) and must be closed with :meth:`close`,
+    or used as an async context manager.
+    """
+
+    @staticmethod
+    def _create_service(token_factory, **kwargs) -> AsyncRealityCaptureService:
+        return AsyncRealityCaptureService(token_factory, **kwargs)
+
+    async def __aenter__(self) -> "AsyncRealityDataHandler":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """
+        Close the HTTP session used to communicate with the Reality Capture APIs.
+        """
+        await self._service.close()
+
+    async def _fetch_link(self, rd_id: str, itwin_id: Optional[str], read_only: bool) -> Response[ContainerDetails]:
+        if not read_only:
+            return await self._service.get_reality_data_write_access(rd_id, itwin_id)
+        return await self._service.get_reality_data_read_access(rd_id, itwin_id)
+
+    async def _get_link(self, rd_id: str, itwin_id: Optional[str], read_only: bool) -> Response[ContainerDetails]:
+        return await self._link_cache.get_async((rd_id, itwin_id, "Read" if read_only else "Write"),
+                                                lambda: self._fetch_link(rd_id, itwin_id, read_only))
+
+    def _get_renew_url(self, rd_id: str, itwin_id: Optional[str],
+                       read_only: bool) -> Callable[[], Awaitable[Optional[str]]]:
+        async def _renew_url() -> Optional[str]:
+            r = await self._get_link(rd_id, itwin_id, read_only)
+            return None if r.is_error() else r.value.links.container_url.href
+
+        return _renew_url
+
+    async def _set_authoring(self, rd_id: str, authoring: bool) -> Response[RealityData]:
+        rdu = RealityDataUpdate(authoring=authoring)
+        return await self._service.update_reality_data(rdu, rd_id)
+
+    async def upload_data(self, reality_data_id: str, src: str,
+                          reality_data_dst: str = "", itwin_id: Optional[str] = None,
+                          sync: bool = False) -> Response[None]:
+        """
+        Coroutine version of :meth:`RealityDataHandler.upload_data`.
+        """
+        async with self.upload_session(reality_data_id, itwin_id) as session:
+            resp = await session.upload(src, reality_data_dst, sync)
+            r = await session.close()
+        if r.is_error():
+            return r
+        return resp
+
+    def upload_session(self, reality_data_id: str, itwin_id: Optional[str] = None) -> AsyncUploadSession:
+        """
+        Asynchronous version of :meth:`RealityDataHandler.upload_session`, to use as an async context manager.
+        """
+        return AsyncUploadSession(self, reality_data_id, itwin_id)
+
+    async def download_data(self, reality_data_id: str, dst: str,
+                            reality_data_src: str = "", itwin_id: Optional[str] = None,
+                            sync: bool = False) -> Response[None]:
+        """
+        Coroutine version of :meth:`RealityDataHandler.download_data`.
+        """
+        r = await self._get_link(reality_data_id, itwin_id, True)
+        if r.is_error():
+            return Response(r.status_code, r.error, None)
+        recorder = self._start_transfer("download")
+        return recorder.record(await _AsyncDataHandler.download_data(
+            r.value.links.container_url.href, dst, reality_data_src, self._get_progress_hook(),
+            self._transfer_options, sync, self._get_renew_url(reality_data_id, itwin_id, True), recorder))
+
+    async def copy_data(self, src_reality_data_id: str, dst_reality_data_id: str, prefix: str = "",
+                        src_itwin_id: Optional[str] = None, dst_itwin_id: Optional[str] = None) -> Response[None]:
+        """
+        Coroutine version of :meth:`RealityDataHandler.copy_data`.
+        """
+        src_link = await self._get_link(src_reality_data_id, src_itwin_id, True)
+        if src_link.is_error():
+            return Response(src_link.status_code, src_link.error, None)
+        dst_link = await self._get_link(dst_reality_data_id, dst_itwin_id, False)
+        if dst_link.is_error():
+            return Response(dst_link.status_code, dst_link.error, None)
+        r = await self._set_authoring(dst_reality_data_id, True)
+        if r.is_error():
+            return Response(r.status_code, r.error, None)
+        recorder = self._start_transfer("copy")
+        try:
+            resp = recorder.record(await _AsyncDataHandler.copy_data(
+                src_link.value.links.container_url.href, dst_link.value.links.container_url.href, prefix,
+                self._get_progress_hook(), self._transfer_options,
+                self._get_renew_url(src_reality_data_id, src_itwin_id, True),
+                self._get_renew_url(dst_reality_data_id, dst_itwin_id, False), recorder))
+        finally:
+            r = await self._set_authoring(dst_reality_data_id, False)
+        if r.is_error():
+            return Response(r.status_code, r.error, None)
+        return resp
+
+    async def list_data(self, reality_data_id, itwin_id: Optional[str] = None) -> Response[list[str]]:
+        """
+        Coroutine version of :meth:`RealityDataHandler.list_data`.
+        """
+        r = await self._get_link(reality_data_id, itwin_id, True)
+        if r.is_error():
+            return Response(r.status_code, r.error, None)
+        return await _AsyncDataHandler.list_data(r.value.links.container_url.href)
+
+    async def delete_data(self, reality_data_id, files_to_delete: list[str],
+                          itwin_id: Optional[str] = None) -> Response[None]:
+        """
+        Coroutine version of :meth:`RealityDataHandler.delete_data`.
+        """
+        r = await self._get_link(reality_data_id, itwin_id, False)
+        if r.is_error():
+            return Response(r.status_code, r.error, None)
+        recorder = self._start_transfer("delete")
+        return recorder.record(await _AsyncDataHandler.delete_data(
+            r.value.links.container_url.href, files_to_delete, self._transfer_options,
+            self._get_renew_url(reality_data_id, itwin_id, False), recorder))
+
+    async def delete_prefix(self, reality_data_id, prefix: str, itwin_id: Optional[str] = None) -> Response[None]:
+        """
+        Coroutine version of :meth:`RealityDataHandler.delete_prefix`.
+        """
+        r = await self._get_link(reality_data_id, itwin_id, False)
+        if r.is_error():
+            return Response(r.status_code, r.error, None)
+        recorder = self._start_transfer("delete")
+        return recorder.record(await _AsyncDataHandler.delete_prefix(
+            r.value.links.container_url.href, prefix, self._transfer_options,
+            self._get_renew_url(reality_data_id, itwin_id, False), recorder))
+
+
+class AsyncBucketDataHandler(BucketDataHandler):
+    """
+    Asynchronous version of :class:`BucketDataHandler`, based on ``azure.storage.blob.aio``.
+
+    It requires the ``async`` extra (``pip install reality_capture[async]``) and must be closed with :meth:`close`,
+    or used as an async context manager.
+    """
+
+    @staticmethod
+    def _create_service(token_factory, **kwargs) -> AsyncRealityCaptureService:
+        return AsyncRealityCaptureService(token_factory, **kwargs)
+
+    async def __aenter__(self) -> "AsyncBucketDataHandler":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """
+        Close the HTTP session used to communicate with the Reality Capture APIs.
+        """
+        await self._service.close()
+
+    async def _get_bucket(self, itwin_id: str) -> Response[BucketResponse]:
+        return await self._link_cache.get_async((None, itwin_id, "Bucket"), lambda: self._service.get_bucket(itwin_id))
+
+    def _get_renew_url(self, itwin_id: str) -> Callable[[], Awaitable[Optional[str]]]:
+        async def _renew_url() -> Optional[str]:
+            r = await self._get_bucket(itwin_id)
+            return None if r.is_error() else r.value.links.container_url.href
+
+        return _renew_url
+
+    async def upload_data(self, itwin_id: str, src: str, bucket_dst: str = "", sync: bool = False) -> Response[None]:
+        """
+        Coroutine version of :meth:`BucketDataHandler.upload_data`.
+        """
+        r = await self._get_bucket(itwin_id)
+        if r.is_error():
+            return Response(r.status_code, r.error, None)
+        recorder = self._start_transfer("upload")
+        return recorder.record(await _AsyncDataHandler.upload_data(r.value.links.container_url.href, src, bucket_dst,
+                                                                   self._get_progress_hook(), self._transfer_options,
+                                                                   sync, self._get_renew_url(itwin_id), recorder))
+
+    async def download_data(self, itwin_id: str, dst: str,
+                            bucket_src: str = "", sync: bool = False) -> Response[None]:
+        """
+        Coroutine version of :meth:`BucketDataHandler.download_data`.
+        """
+        r = await self._get_bucket(itwin_id)
+        if r.is_error():
+            return Response(r.status_code, r.error, None)
+        recorder = self._start_transfer("download")
+        return recorder.record(await _AsyncDataHandler.download_data(r.value.links.container_url.href, dst,
+                                                                     bucket_src, self._get_progress_hook(),
+                                                                     self._transfer_options, sync,
+                                                                     self._get_renew_url(itwin_id), recorder))
+
+    async def list_data(self, itwin_id: str) -> Response[list[str]]:
+        """
+        Coroutine version of :meth:`BucketDataHandler.list_data`.
+        """
+        r = await self._get_bucket(itwin_id)
+        if r.is_error():
+            return Response(r.status_code, r.error, None)
+        return await _AsyncDataHandler.list_data(r.value.links.container_url.href)
+
+    async def delete_data(self, itwin_id, files_to_delete: list[str]) -> Response[None]:
+        """
+        Coroutine version of :meth:`BucketDataHandler.delete_data`.
+        """
+        r = await self._get_bucket(itwin_id)
+        if r.is_error():
+            return Response(r.status_code, r.error, None)
+        recorder = self._start_transfer("delete")
+        return recorder.record(await _AsyncDataHandler.delete_data(r.value.links.container_url.href, files_to_delete,
+                                                                   self._transfer_options,
+                                                                   self._get_renew_url(itwin_id), recorder))
+
+    async def delete_prefix(self, itwin_id, prefix: str) -> Response[None]:
+        """
+        Coroutine version of :meth:`BucketDataHandler.delete_prefix`.
+        """
+        r = await self._get_bucket(itwin_id)
+        if r.is_error():
+            return Response(r.status_code, r.error, None)
+        recorder = self._start_transfer("delete")
+        return recorder.record(await _AsyncDataHandler.delete_prefix(r.value.links.container_url.href, prefix,
+                                                                     self._transfer_options,
+                                                                     self._get_renew_url(itwin_id), recorder))
@@ -0,0 +1,442 @@
+import asyncio
+import json
+import ssl
+import time
+import certifi
+
+from reality_capture.service.bucket import BucketResponse
+from reality_capture.service.detectors import (DetectorBase, DetectorsMinimalResponse, DetectorResponse, DetectorUpdate,
+                                               DetectorVersionCreate, DetectorVersionWithLinks)
+from reality_capture.service.files import Files
+from reality_capture.service.response import Response
+from reality_capture.service.job import JobCreate, Job, Progress, Messages, Service, Jobs, JobType
+from reality_capture.service.job_handle import AsyncJobHandle
+from reality_capture.service.reality_data import (RealityDataCreate, RealityData, RealityDataUpdate, ContainerDetails,
+                                                  RealityDataFilter, Prefer, RealityDatas, RealityDataMinimal,
+                                                  get_continuation_token)
+from reality_capture.service.pagination import AsyncPageIterator
+from reality_capture.service.error import DetailedErrorResponse, DetailedError
+from reality_capture.service.instrumentation import RequestMetrics
+from reality_capture.service.service import RealityCaptureService, _token_duration
+from typing import Awaitable, Mapping, Optional, Type, Union
+from pydantic import BaseModel, ValidationError
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+
+class AsyncRealityCaptureService(RealityCaptureService):
+    """
+    Asynchronous service handling communication with Reality Capture APIs.
+
+    It exposes the same methods as :class:`RealityCaptureService` as coroutines, and returns the same models. It
+    requires the ``async`` extra (``pip install reality_capture[async]``). The underlying HTTP session is opened on
+    the first request and must be closed with :meth:`close`, or by using the service as an async context manager.
+    """
+
+    def __init__(self, token_factory, **kwargs) -> None:
+        """
+        Constructor method
+
+        :param token_factory: An object that implements a ``get_token() -> str`` method.
+        :type token_factory: Object
+        :param \\**kwargs: Same keyword arguments as :class:`RealityCaptureService`.
+        """
+        if aiohttp is None:
+            raise ImportError("AsyncRealityCaptureService requires aiohttp, install reality_capture[async]")
+        super().__init__(token_factory, **kwargs)
+        self._session.close()
+        self._session = None
+        self._ssl_context = ssl.create_default_context(cafile=certifi.where())
+
+    async def __aenter__(self) -> "AsyncRealityCaptureService":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """
+        Close the HTTP session of the service.
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        # Sessions are bound to the running event loop, so it cannot be created in the constructor
+        if self._session is None:
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=self._ssl_context))
+        return self._session
+
+    @staticmethod
+    def _get_ill_formed_text_message(text: str, exception) -> str:
+        try:
+            r = json.loads(text)
+        except ValueError:
+            r = text
+        return f"Service response is ill-formed: {r}. Exception : {exception}"
+
+    @staticmethod
+    def _get_body_size(kwargs: dict) -> int:
+        if kwargs.get("json") is not None:
+            return len(json.dumps(kwargs["json"]).encode())
+        data = kwargs.get("data")
+        return len(data.encode() if isinstance(data, str) else data or b"")
+
+    async def _send_request_async(self, method: str, url: str, headers: dict, metrics: RequestMetrics,
+                                  **kwargs) -> tuple[int, Mapping, str]:
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            if self._rate_limiter is not None:
+                await asyncio.sleep(self._rate_limiter.reserve())
+            sent = time.perf_counter()
+            metrics.add_phase("wait", sent - start)
+            try:
+                async with self._get_session().request(method, url, headers=headers, **kwargs) as response:
+                    status_code = response.status
+                    text = await response.text()
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                metrics.add_phase("network", time.perf_counter() - sent)
+                delay = self._get_retry_delay(method, attempt)
+                if delay is None:
+                    raise
+            else:
+                metrics.add_phase("network", time.perf_counter() - sent)
+                metrics.bytes_sent += self._get_body_size(kwargs)
+                metrics.bytes_received += response.content_length or len(text.encode())
+                delay = self._get_retry_delay(method, attempt, status_code, response.headers.get("Retry-After"))
+                if delay is None:
+                    return status_code, response.headers, text
+            await asyncio.sleep(delay)
+            metrics.add_phase("wait", delay)
+            metrics.retries += 1
+            attempt += 1
+
+    def _get_header(self, version) -> dict:
+        # The token is added by _execute_request_async, so that the token factory is never called on the event loop
+        return {**self._header, "Accept": f"application/vnd.bentley.itwin-platform.{version}+json"}
+
+    async def _get_token_async(self) -> str:
+        token = self._token_cache.get_cached_token()
+        if token is None:
+            token = await asyncio.get_running_loop().run_in_executor(None, self._token_cache.get_token)
+        return token
+
+    def _execute_request(self, method: str, url: str, headers: dict, success_model: Type[BaseModel] = None,
+                         data_key: str = None, cache_key: Optional[tuple] = None, invalidated_keys: tuple = (),
+                         **kwargs) -> Union[Response, Awaitable[Response]]:
+        cached, headers, etag = self._get_cached_response(cache_key, headers)
+        if cached is not None:
+            metrics = self._start_request_metrics(method, url)
+            metrics.cached = True
+            self._finish_request_metrics(metrics, cached)
+            return cached
+        return self._execute_request_async(method, url, headers, success_model, data_key, cache_key, etag,
+                                           invalidated_keys, **kwargs)
+
+    async def _execute_request_async(self, method: str, url: str, headers: dict,
+                                     success_model: Optional[Type[BaseModel]], data_key: Optional[str],
+                                     cache_key: Optional[tuple], etag: Optional[str], invalidated_keys: tuple,
+                                     **kwargs) -> Response:
+        start = time.perf_counter()
+        headers = {**headers, "Authorization": await self._get_token_async()}
+        _token_duration.set(time.perf_counter() - start)
+        metrics = self._start_request_metrics(method, url)
+        response = await self._execute_measured_request_async(method, url, headers, success_model, data_key,
+                                                              cache_key, etag, invalidated_keys, metrics, **kwargs)
+        self._finish_request_metrics(metrics, response)
+        return response
+
+    async def _execute_measured_request_async(self, method: str, url: str, headers: dict,
+                                              success_model: Optional[Type[BaseModel]], data_key: Optional[str],
+                                              cache_key: Optional[tuple], etag: Optional[str],
+                                              invalidated_keys: tuple, metrics: RequestMetrics,
+                                              **kwargs) -> Response:
+        try:
+            status_code, response_headers, text = await self._send_request_async(method, url, headers, metrics,
+                                                                                 **kwargs)
+            if status_code == 304 and etag is not None:
+                cached = self._response_cache.revalidate(cache_key, etag)
+                if cached is not None:
+                    metrics.cached = True
+                    return cached
+                # The cached response changed in the meantime, get the current one
+                headers = {k: v for k, v in headers.items() if k != "If-None-Match"}
+                status_code, response_headers, text = await self._send_request_async(method, url, headers, metrics,
+                                                                                     **kwargs)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error = DetailedError(code="NetworkError", message=f"Network error : {e}")
+            return Response(status_code=503, value=None, error=DetailedErrorResponse(error=error))
+        finally:
+            # Whatever the outcome of a write, the cached responses it may have changed are dropped
+            self._invalidate_cached_responses(invalidated_keys)
+
+        if status_code >= 400:
+            if status_code == 401:
+                self._token_cache.invalidate()
+            try:
+                error_details = DetailedErrorResponse.model_validate_json(text)
+                return Response(status_code=status_code, value=None, error=error_details)
+            except ValidationError as e:
+                error = DetailedError(code="UnknownError", message=self._get_ill_formed_text_message(
+                    text, f"{status_code} Error for url: {url}: {e}"))
+                return Response(status_code=status_code, value=None, error=DetailedErrorResponse(error=error))
+
+        try:
+            if not success_model:
+                return Response(status_code=status_code, value=None, error=None)
+            start = time.perf_counter()
+            json_data = json.loads(text)
+            decoded = time.perf_counter()
+            metrics.add_phase("decode", decoded - start)
+            if data_key:
+                data_to_validate = json_data[data_key]
+            else:
+                data_to_validate = json_data
+            validated_data = success_model.model_validate(data_to_validate)
+            metrics.add_phase("validation", time.perf_counter() - decoded)
+            result = Response(status_code=status_code, value=validated_data, error=None)
+            self._store_cached_response(cache_key, result, response_headers.get("ETag"))
+            return result
+        except (ValidationError, KeyError, TypeError, ValueError) as e:
+            error = DetailedError(code="InvalidResponse", message=self._get_ill_formed_text_message(text, e))
+            return Response(status_code=502, error=DetailedErrorResponse(error=error), value=None)
+
+    @staticmethod
+    async def _await(response: Union[Response, Awaitable[Response]]) -> Response:
+        # Requests rejected before being sent come back as plain responses
+        if isinstance(response, Response):
+            return response
+        return await response
+
+    async def get_jobs(self, service: Service, filters: str,
+                 top: int = None, continuation_token: str = "") -> Response[Jobs]:
+        """
+        Coroutine version of :meth:`RealityCaptureService.get_jobs`.
+        """
+        return await self._await(super().get_jobs(service, filters, top, continuation_token))
+
+    def iter_jobs(self, service: Service, filters: str, top: int = None, max_items: Optional[int] = None,
+                  prefetch: bool = True) -> AsyncPageIterator[Job]:
+        """
+        Asynchronous version of :meth:`RealityCaptureService.iter_jobs`, to use with ``async for``.
+        """
+        top = self._get_iter_jobs_top(top, max_items)
+        return AsyncPageIterator(lambda token: self.get_jobs(service, filters, top, token or ""),
+                                 lambda jobs: jobs.jobs, lambda jobs: jobs.get_continuation_token(), max_items,
+                                 prefetch)
+
+    async def submit_job(self, job: JobCreate) -> Response[Job]:
+        """
+        Coroutine version of :meth:`RealityCaptureService.submit_job`.
+        """
+        return await self._await(super().submit_job(job))
+
+    async def submit_jobs(self, jobs: list[JobCreate], max_parallel: int = 8) -> list[Response[Job]]:
+        """
+        Coroutine version of :meth:`RealityCaptureService.submit_jobs`.
+        """
+        responses = [self._prepare_job_submission(job) for job in jobs]
+        semaphore = asyncio.Semaphore(max(1, max_parallel))
+
+        async def _submit(prepared):
+            if isinstance(prepared, Response):
+                return prepared
+            async with semaphore:
+                return await self._post_job(*prepared)
+
+        return list(await asyncio.gather(*[_submit(prepared) for prepared in responses]))
+
+    async def get_job(self, job_id: str, service: Service) -> Response[Job]:
+        """
+        Coroutine version of :meth:`RealityCaptureService.get_job`.
+        """
+        return await self._await(super().get_job(job_id, service))
+
+    async def get_job_messages(self, job_id: str, service: Service) -> Response[Messages]:
+        """
+        Coroutine version of :meth:`RealityCaptureService.get_job_messages`.
+        """
+        return await self._await(super().get_job_messages(job_id, service))
+
+    async def get_job_progress(self, job_id: str, service: Service) -> Response[Progress]:
+        """
+        Coroutine version of :meth:`RealityCaptureService.get_job_progress`.
+        """
+        return await self._await(super().get_job_progress(job_id, service))
+
+    async def cancel_job(self, job_id: str, service: Service) -> Response[Job]:
+        """
+        Coroutine version of :meth:`RealityCaptureService.cancel_job`.
+        """
+        return await self._await(super().cancel_job(job_id, service))
+
+    def get_job_handle(self, job_id: str, job_type: JobType) -> AsyncJobHandle:
+        """
+        Asynchronous version of :meth:`RealityCaptureService.get_job_handle`, the methods of the handle are coroutines.
+        """
+        return AsyncJobHandle(self, job_id, job_type)
+
+    async def wait_for_job(self, job_id: str, job_type: JobType, timeout: Optional[float] = None,
+                           max_requests: Optional[int] = None, cancel_on_timeout: bool = False) -> Response[Job]:
+        """
+        Coroutine version of :meth:`RealityCaptureService.wait_for_job`. Cancelling the task stops waiting, but not
+        the job.
+        """
+        return await self.get_job_handle(job_id, job_type).result(timeout, max_requests, cancel_on_timeout)
+
+    async def submit_job_and_wait(self, job: JobCreate, timeout: Optional[float] = None,
+                                  max_requests: Optional[int] = None, cancel_on_timeout: bool = False) -> Response[Job]:
+        """
+        Coroutine version of :meth:`RealityCaptureService.submit_job_and_wait`.
+        """
+        r = await self.submit_job(job)
+        if r.is_error():
+            return r
+        return await self.wait_for_job(r.value.id, job.type, timeout, max_requests, cancel_on_timeout)
+
+    async def get_bucket(self, itwin_id: str) -> Response[BucketResponse]:
+        """
+        Coroutine version of :meth:`RealityCaptureService.get_bucket`.
+        """
+        return await self._await(super().get_bucket(itwin_id))
+
+    async def get_service_files(self) -> Response[Files]:
+        """
+        Coroutine version of :meth:`RealityCaptureService.get_service_files`.
+        """
+        return await self._await(super().get_service_files())
+
+    async def get_detectors(self, detectors_filter: Optional[str] = None) -> Response[DetectorsMinimalResponse]:
+        """
+        Coroutine version of :meth:`RealityCaptureService.get_detectors`.
+        """
+        return await self._await(super().get_detectors(detectors_filter))
+
+    async def get_detector(self, detector_name: str) -> Response[DetectorResponse]:
+        """
+        Coroutine version of :meth:`RealityCaptureService.get_detector`.
+        """
+        return await self._await(super().get_detector(detector_name))
+
+    async def create_detector(self, detector_create: DetectorBase) -> Response[DetectorResponse]:
+        """
+        Coroutine version of :meth:`RealityCaptureService.create_detector`.
+        """
+        return await self._await(super().create_detector(detector_create))
+
+    async def update_detector(self, detector_name: str, detector_update: DetectorUpdate) -> Response[DetectorResponse]:
+        """
+        Coroutine version of :meth:`RealityCaptureService.update_detector`.
+        """
+        return await self._await(super().update_detector(detector_name, detector_update))
+
+    async def delete_detector(self, detector_name: str) -> Response[None]:
+        """
+        Coroutine version of :meth:`RealityCaptureService.delete_detector`.
+        """
+        return await self._await(super().delete_detector(detector_name))
+
+    async def create_detector_version(self, detector_name: str,
+                                version_create: DetectorVersionCreate) -> Response[DetectorVersionWithLinks]:
+        """
+        Coroutine version of :meth:`RealityCaptureService.create_detector_version`.
+        """
+        return await self._await(super().create_detector_version(detector_name, version_create))
+
+    async def delete_detector_version(self, detector_name: str, detector_version: str) -> Response[None]:
+        """
+        Coroutine version of :meth:`RealityCaptureService.delete_detector_version`.
+        """
+        return await self._await(super().delete_detector_version(detector_name, detector_version))
+
+    async def publish_detector_version(self, detector_name: str, version_number: str) -> Response[None]:
+        """
+        Coroutine version of :meth:`RealityCaptureService.publish_detector_version`.
+        """
+        return await self._await(super().publish_detector_version(detector_name, version_number))
+
+    async def unpublish_detector_version(self, detector_name: str, version_number: str) -> Response[None]:
+        """
+        Coroutine version of :meth:`RealityCaptureService.unpublish_detector_version`.
+        """
+        return await self._await(super().unpublish_detector_version(detector_name, version_number))
+
+    async def complete_detector_version_upload(self, detector_name: str, version_number: str) -> Response[None]:
+        """
+        Coroutine version of :meth:`RealityCaptureService.complete_detector_version_upload`.
+        """
+        return await self._await(super().complete_detector_version_upload(detector_name, version_number))
+
+    async def create_reality_data(self, reality_data: RealityDataCreate) -> Response[RealityData]:
+        """
+        Coroutine version of :meth:`RealityCaptureService.create_reality_data`.
+        """
+        return await self._await(super().create_reality_data(reality_data))
+
+    async def get_reality_data(self, reality_data_id: str, itwin_id: Optional[str] = None) -> Response[RealityData]:
+        """
+        Coroutine version of :meth:`RealityCaptureService.get_reality_data`.
+        """
+        return await self._await(super().get_reality_data(reality_data_id, itwin_id))
+
+    async def update_reality_data(self, reality_data_update: RealityDataUpdate,
+                            reality_data_id: str) -> Response[RealityData]:
+        """
+        Coroutine version of :meth:`RealityCaptureService.update_reality_data`.
+        """
+        return await self._await(super().update_reality_data(reality_data_update, reality_data_id))
+
+    async def delete_reality_data(self, reality_data_id: str) -> Response[None]:
+        """
+        Coroutine version of :meth:`RealityCaptureService.delete_reality_data`.
+        """
+        return await self._await(super().delete_reality_data(reality_data_id))
+
+    async def get_reality_data_write_access(self, reality_data_id: str,
+                                      itwin_id: Optional[str] = None) -> Response[ContainerDetails]:
+        """
+        Coroutine version of :meth:`RealityCaptureService.get_reality_data_write_access`.
+        """
+        return await self._await(super().get_reality_data_write_access(reality_data_id, itwin_id))
+
+    async def get_reality_data_read_access(self, reality_data_id: str,
+                                     itwin_id: Optional[str] = None) -> Response[ContainerDetails]:
+        """
+        Coroutine version of :meth:`RealityCaptureService.get_reality_data_read_access`.
+        """
+        return await self._await(super().get_reality_data_read_access(reality_data_id, itwin_id))
+
+    async def list_reality_data(self, reality_data_filter: Optional[RealityDataFilter] = None,
+                          prefer: Optional[Prefer] = None) -> Response[RealityDatas]:
+        """
+        Coroutine version of :meth:`RealityCaptureService.list_reality_data`.
+        """
+        return await self._await(super().list_reality_data(reality_data_filter, prefer))
+
+    def iter_reality_data(self, reality_data_filter: Optional[RealityDataFilter] = None,
+                          prefer: Optional[Prefer] = None, max_items: Optional[int] = None,
+                          prefetch: bool = True) -> AsyncPageIterator[Union[RealityData, RealityDataMinimal]]:
+        """
+        Asynchronous version of :meth:`RealityCaptureService.iter_reality_data`, to use with ``async for``.
+        """
+        first_filter = self._get_iter_reality_data_filter(reality_data_filter, max_items)
+
+        def _fetch_page(token: Optional[str]) -> Awaitable[Response[RealityDatas]]:
+            if token is None:
+                return self.list_reality_data(first_filter, prefer)
+            page_filter = (first_filter or RealityDataFilter()).model_copy(update={"continuation_token": token})
+            return self.list_reality_data(page_filter, prefer)
+
+        return AsyncPageIterator(_fetch_page, lambda rds: rds.reality_data, get_continuation_token, max_items,
+                                 prefetch)
+
+    async def move_reality_data(self, reality_data_id: str, itwin_id: str) -> Response[None]:
+        """
+        Coroutine version of :meth:`RealityCaptureService.move_reality_data`.
+        """
+        return await self._await(super().move_reality_data(reality_data_id, itwin_id))
@@ -1,81 +1,570 @@
+import base64
+import hashlib
+import math
 import os.path
-from typing import Callable, Optional
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, Optional
 from reality_capture.service.error import DetailedErrorResponse, DetailedError, Error
+from reality_capture.service.instrumentation import Instrumentation, TransferMetrics
 from reality_capture.service.response import Response
 from reality_capture.service.service import RealityCaptureService
 from reality_capture.service.reality_data import RealityDataUpdate, RealityData, ContainerDetails
 from reality_capture.service.bucket import BucketResponse
-from azure.storage.blob import ContainerClient
+from reality_capture.service.link_cache import LinkCache, get_sas_parameters, replace_sas
+from azure.core.pipeline.transport import RequestsTransport
+from azure.storage.blob import BlobBlock, ContainerClient, ContentSettings
 from multiprocessing.pool import ThreadPool
+from requests import Session
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+@dataclass
+class TransferOptions:
+    """
+    Tuning options for the transfers performed by the data handlers.
+    """
+
+    chunk_size: int = 4 * 1024 * 1024
+    "Size in bytes of each ranged request when downloading a blob, and of each block when uploading one."
+    max_concurrency: int = 16
+    "Maximum number of parallel connections used for a single blob."
+    max_connections: int = 64
+    "Maximum number of connections opened by a transfer, shared by all of its workers."
+    max_in_flight: int = 64
+    """Global cap on the number of concurrent blob requests of a transfer, across files and chunks. Also the number
+    of batches of blobs deleted at the same time."""
+    progress_interval: float = 0.1
+    "Minimum time in seconds between two calls to the progress hooks."
+    small_file_batch_size: int = 0
+    """Number of small files (up to chunk_size bytes) uploaded by a worker in a row, 0 to disable batching. When
+    enabled, small files are sent as single requests with minimal overhead, and larger files are split in blocks of
+    chunk_size bytes staged in parallel."""
+
+
+@dataclass
+class TransferProgress:
+    """
+    Progress information of an ongoing transfer.
+    """
+
+    percentage: float
+    "Percentage of the transfer that is done."
+    transferred: int
+    "Number of bytes done so far, including the files skipped by a sync."
+    total: int
+    "Total number of bytes of the transfer."
+    bytes_per_second: float
+    "Average transfer rate since the beginning of the transfer."
+    eta: Optional[float]
+    "Estimated remaining time in seconds, None until a rate is known."
+
+
+class _ProgressAggregator:
+    """
+    Thread-safe running total of the bytes transferred by all the files of a transfer.
+
+    Each callback only applies its delta, so an update is O(1) whatever the number of files, and the progress hook
+    is called at most once per interval. The total can grow during the transfer when the files are discovered
+    lazily.
+    """
+
+    def __init__(self, total: int, progress_hook: Optional[Callable[[TransferProgress], bool]],
+                 interval: float, action: str, total_known: bool = True) -> None:
+        self._total = total
+        self._total_known = total_known
+        self._progress_hook = progress_hook
+        self._interval = interval
+        self._action = action
+        self._lock = threading.Lock()
+        self._values = {}
+        self._transferred = 0
+        self._skipped = 0
+        self._files = 0
+        self._skipped_files = 0
+        self._start = time.monotonic()
+        self._last_report = None
+        self._reported = None
+        self._proceed = True
+
+    def add_total(self, size: int) -> None:
+        with self._lock:
+            self._total += size
+
+    def set_total_known(self) -> None:
+        with self._lock:
+            self._total_known = True
+            # The update reaching the total may have been throttled while the total was still growing
+            report = None
+            if self._transferred >= self._total:
+                report = self._get_report(time.monotonic(), True)
+        self._call_hook(report)
+
+    def finish(self) -> None:
+        """
+        Report the final progress of a completed transfer, unless it was already reported.
+        """
+        with self._lock:
+            report = self._get_report(time.monotonic(), True)
+        if report is not None:
+            # Nothing is left to interrupt
+            self._progress_hook(report)
+
+    def update(self, key: str, current: int) -> None:
+        self._apply(key, current, False)
+
+    def skip(self, key: str, size: int) -> None:
+        self._apply(key, size, True, skipped_files=1)
+
+    def complete(self, key: str, size: int) -> None:
+        self._apply(key, size, False, files=1)
+
+    def get_counts(self) -> tuple[int, int, int]:
+        """
+        Return the number of files done, of files skipped and of bytes moved so far.
+        """
+        with self._lock:
+            return self._files, self._skipped_files, self._transferred - self._skipped
+
+    def _apply(self, key: str, current: int, skipped: bool, files: int = 0, skipped_files: int = 0) -> None:
+        with self._lock:
+            self._files += files
+            self._skipped_files += skipped_files
+            delta = current - self._values.get(key, 0)
+            self._values[key] = current
+            self._transferred += delta
+            if skipped:
+                self._skipped += delta
+            if not self._proceed:
+                raise InterruptedError(f"{self._action} interrupted by callback function")
+            report = self._get_report(time.monotonic(), self._total_known and self._transferred >= self._total)
+        self._call_hook(report)
+
+    def _get_report(self, now: float, force: bool) -> Optional[TransferProgress]:
+        # Called with the lock held: forced reports bypass the interval but are not repeated
+        state = (self._transferred, self._total)
+        if self._progress_hook is None or not self._proceed or (force and state == self._reported) or (
+                not force and self._last_report is not None and now - self._last_report < self._interval):
+            return None
+        self._last_report = now
+        self._reported = state
+        return self._get_progress(now)
+
+    def _call_hook(self, report: Optional[TransferProgress]) -> None:
+        # The hook runs outside the lock, so that the other workers are not held by user code
+        if report is not None and not self._progress_hook(report):
+            with self._lock:
+                self._proceed = False
+            raise InterruptedError(f"{self._action} interrupted by callback function")
+
+    def _get_progress(self, now: float) -> TransferProgress:
+        elapsed = now - self._start
+        rate = (self._transferred - self._skipped) / elapsed if elapsed > 0 else 0.0
+        remaining = max(self._total - self._transferred, 0)
+        eta = remaining / rate if rate > 0 else None
+        percentage = (self._transferred / self._total) * 100 if self._total else 100.0
+        return TransferProgress(percentage=percentage, transferred=self._transferred, total=self._total,
+                                bytes_per_second=rate, eta=eta)
+
+
+class _ConcurrencyController:
+    """
+    AIMD controller for the number of in-flight blob requests of a transfer.
+
+    Files and chunks share the same budget: each blob acquires as many slots as the chunks it can transfer in
+    parallel. The limit grows while the throughput keeps up, and shrinks on throttling (429/503) or when the latency
+    rises without any throughput gain.
+    """
+
+    _THROTTLING_STATUS = (429, 503)
+    _START_CONTEXT_KEY = "reality_capture_request_start"
+
+    def __init__(self, max_in_flight: int, interval: float = 1.0) -> None:
+        self._max_in_flight = max(1, max_in_flight)
+        self._limit = min(8, self._max_in_flight)
+        self._interval = interval
+        self._slow_start = True
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._condition = threading.Condition()
+        self._throughput = 0.0
+        self._latency = None
+        self.requests = 0
+        self.retried_requests = 0
+        self._reset_window(time.monotonic())
+
+    def _reset_window(self, now: float) -> None:
+        self._window_start = now
+        self._window_bytes = 0
+        self._window_latency = 0.0
+        self._window_requests = 0
+        self._window_throttled = False
+        self._peak_in_flight = self._in_flight
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @property
+    def throughput(self) -> float:
+        return self._throughput
+
+    def acquire(self, weight: int) -> int:
+        with self._condition:
+            while True:
+                granted = max(1, min(weight, self._limit))
+                if self._in_flight + granted <= self._limit:
+                    break
+                self._condition.wait()
+            self._in_flight += granted
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+            return granted
+
+    def release(self, granted: int) -> None:
+        with self._condition:
+            self._in_flight -= granted
+            self._condition.notify_all()
+
+    def on_request(self, request) -> None:
+        request.context[self._START_CONTEXT_KEY] = time.monotonic()
+
+    def on_response(self, response) -> None:
+        now = time.monotonic()
+        http_response = response.http_response
+        with self._condition:
+            self.requests += 1
+            if http_response.status_code in self._THROTTLING_STATUS or http_response.status_code >= 500:
+                # The storage client retries these ones
+                self.retried_requests += 1
+            if http_response.status_code in self._THROTTLING_STATUS:
+                self._window_throttled = True
+            elif http_response.status_code < 400:
+                headers = http_response.headers if response.http_request.method == "GET" \
+                    else response.http_request.headers
+                self._window_bytes += int(headers.get("Content-Length", 0))
+                self._window_latency += now - response.context.get(self._START_CONTEXT_KEY, now)
+                self._window_requests += 1
+            if now - self._window_start >= self._interval:
+                self._adjust(now)
+
+    def _adjust(self, now: float) -> None:
+        throughput = self._window_bytes / max(now - self._window_start, 1e-6)
+        latency = self._window_latency / self._window_requests if self._window_requests else None
+        if self._window_throttled:
+            self._limit = max(1, self._limit // 2)
+            self._slow_start = False
+        elif self._peak_in_flight >= self._limit and throughput >= 0.9 * self._throughput:
+            # Every slot was used and the throughput keeps up: probe for more parallelism
+            increase = self._limit if self._slow_start else 1
+            self._limit = min(self._max_in_flight, self._limit + increase)
+        elif (latency is not None and self._latency is not None and latency > 2 * self._latency
+              and throughput < self._throughput):
+            # Requests are slower without moving more bytes: the link is congested
+            self._limit = max(1, self._limit - 1)
+            self._slow_start = False
+        self._throughput = throughput
+        if latency is not None:
+            self._latency = latency
+        self._reset_window(now)
+        self._condition.notify_all()
+
+
+class _TransferRecorder:
+    """
+    Measures of a transfer, reported to the instrumentation of the handler when the transfer returns.
+    """
+
+    def __init__(self, instrumentation: Optional[Instrumentation], operation: str) -> None:
+        self._instrumentation = instrumentation
+        self._start = time.perf_counter()
+        self._progress: Optional[_ProgressAggregator] = None
+        self._controller: Optional[_ConcurrencyController] = None
+        self.metrics = TransferMetrics(operation=operation, start=time.time())
+
+    def track(self, progress: Optional[_ProgressAggregator] = None,
+              controller: Optional[_ConcurrencyController] = None) -> None:
+        self._progress = progress
+        self._controller = controller
+
+    def record(self, response: Response) -> Response:
+        if self._instrumentation is None:
+            return response
+        if self._progress is not None:
+            self.metrics.files, self.metrics.skipped_files, self.metrics.bytes = self._progress.get_counts()
+        if self._controller is not None:
+            self.metrics.requests = self._controller.requests
+            self.metrics.retried_requests = self._controller.retried_requests
+        self.metrics.status_code = response.status_code
+        self.metrics.duration = time.perf_counter() - self._start
+        self._instrumentation.on_transfer(self.metrics)
+        return response
+
+
+class _SasRenewal:
+    """
+    Swap the SAS token of a container url for the latest one, so that long transfers outlive the link they started
+    with.
+    """
+
+    def __init__(self, container_url: str, renew_url: Optional[Callable[[], Optional[str]]]) -> None:
+        self._sas = get_sas_parameters(container_url)
+        self._renew_url = renew_url
+        # Last link returned by renew_url and its SAS parameters, parsed once per link
+        self._current = (None, None)
+
+    def apply(self, url: str) -> str:
+        if self._renew_url is None or not self._sas:
+            return url
+        return self._swap(url, self._renew_url())
+
+    def _swap(self, url: str, current: Optional[str]) -> str:
+        if not current:
+            # The link could not be renewed, keep the current one until it actually expires
+            return url
+        current_url, sas = self._current
+        if current != current_url:
+            sas = get_sas_parameters(current)
+            self._current = (current, sas)
+        # The parameters are swapped by name, the storage client encodes the url its own way
+        return replace_sas(url, sas) if sas and sas != self._sas else url
+
+
+class _SasRenewingTransport(RequestsTransport):
+    """
+    Requests transport applying a SAS renewal to every request, including the retries.
+    """
+
+    def __init__(self, renewal: _SasRenewal, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self._renewal = renewal
+
+    def send(self, request, **kwargs):
+        request.url = self._renewal.apply(request.url)
+        return super().send(request, **kwargs)
 
 
 class _DataHandler:
+    _SINGLE_PUT_SIZE = 64 * 1024 * 1024
+    _END_OF_TASKS = object()
+    _COPY_POLL_MIN_DELAY = 0.1
+    _COPY_POLL_MAX_DELAY = 2.0
+    _DELETE_BATCH_SIZE = 256
+
+    @staticmethod
+    def _iter_files(path: str) -> Iterator[tuple[str, int]]:
+        # Lazy walk: the size comes from the directory entry, and uploads can start before the walk is over
+        if not os.path.isdir(path):
+            yield os.path.basename(path), os.path.getsize(path)
+            return
+        directories = [""]
+        while directories:
+            rel_dir = directories.pop()
+            with os.scandir(os.path.join(path, rel_dir)) as entries:
+                for entry in entries:
+                    rel_path = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+                    if entry.is_dir():
+                        # Like os.walk, symbolic links to directories are not followed
+                        if not entry.is_symlink():
+                            directories.append(rel_path)
+                        continue
+                    yield rel_path, entry.stat().st_size
+
+    @staticmethod
+    def _get_nb_threads(files: list[(str, int)], options: TransferOptions) -> int:
+        # Threads only carry files, the concurrency controller decides how many of them transfer at the same time
+        return max(1, min(options.max_in_flight, len(files)))
+
+    @staticmethod
+    def _get_nb_chunks(size: int, single_request_size: int, options: TransferOptions) -> int:
+        if size <= single_request_size:
+            return 1
+        return min(options.max_concurrency, math.ceil(size / options.chunk_size))
+
+    @staticmethod
+    def _get_batches(files: Iterable[tuple[str, int]], options: TransferOptions) -> Iterator[list[tuple[str, int]]]:
+        batch = []
+        for file_tuple in files:
+            if file_tuple[1] > options.chunk_size:
+                yield [file_tuple]
+                continue
+            batch.append(file_tuple)
+            if len(batch) >= options.small_file_batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    @staticmethod
+    def _run_workers(tasks: Iterable, worker: Callable, max_workers: int) -> None:
+        """
+        Run worker on each task, pulling the tasks lazily through a bounded queue.
+
+        Threads are only started while the queue does not drain, up to max_workers. The first exception raised by a
+        worker stops the iteration over the tasks and is raised once all the threads are done.
+        """
+        work_queue = queue.Queue(maxsize=2 * max_workers)
+        stop = threading.Event()
+        errors = []
+        threads = []
+
+        def _work():
+            while True:
+                task = work_queue.get()
+                if task is _DataHandler._END_OF_TASKS:
+                    return
+                if stop.is_set():
+                    continue
+                try:
+                    worker(task)
+                except BaseException as e:
+                    errors.append(e)
+                    stop.set()
+
+        try:
+            for task in tasks:
+                if stop.is_set():
+                    break
+                if len(threads) < max_workers and (not threads or not work_queue.empty()):
+                    thread = threading.Thread(target=_work, daemon=True)
+                    thread.start()
+                    threads.append(thread)
+                work_queue.put(task)
+        except BaseException:
+            # The tasks could not be listed: the workers drop what is left in the queue
+            stop.set()
+            raise
+        finally:
+            for _ in threads:
+                work_queue.put(_DataHandler._END_OF_TASKS)
+            for thread in threads:
+                thread.join()
+        if errors:
+            raise errors[0]
+
+    @staticmethod
+    def _get_block_ids(size: int, options: TransferOptions) -> list[str]:
+        return [base64.b64encode(f"{index:08d}".encode()).decode() for index in range(
+            math.ceil(size / options.chunk_size))]
+
+    @staticmethod
+    def _get_container_client(container_url: str, options: TransferOptions,
+                              renew_url: Optional[Callable[[], Optional[str]]] = None) -> ContainerClient:
+        # One client, hence one HTTP pipeline and one connection pool, is shared by all the workers of a transfer
+        session = Session()
+        adapter = HTTPAdapter(pool_maxsize=options.max_connections, pool_block=True,
+                              max_retries=Retry(total=False, redirect=False, raise_on_status=False))
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        # Ranged requests of chunk_size bytes are written straight to the file,
+        # so peak memory is bounded by chunk_size * max_concurrency per blob
+        transport = _SasRenewingTransport(_SasRenewal(container_url, renew_url), session=session)
+        return ContainerClient.from_container_url(container_url, transport=transport,
+                                                  max_single_get_size=options.chunk_size,
+                                                  max_chunk_get_size=options.chunk_size,
+                                                  max_single_put_size=_DataHandler._SINGLE_PUT_SIZE,
+                                                  max_block_size=options.chunk_size)
+
+    @staticmethod
+    def _get_progress_hook(progress_hook: Optional[Callable[[float], bool]],
+                           transfer_progress_hook: Optional[Callable[[TransferProgress], bool]]
+                           ) -> Optional[Callable[[TransferProgress], bool]]:
+        if progress_hook is None and transfer_progress_hook is None:
+            return None
+
+        def _hook(progress: TransferProgress) -> bool:
+            proceed = True
+            if progress_hook is not None:
+                proceed = progress_hook(progress.percentage)
+            if transfer_progress_hook is not None:
+                proceed = transfer_progress_hook(progress) and proceed
+            return proceed
+
+        return _hook
+
     @staticmethod
-    def _get_files_and_sizes(path: str) -> list[(str, int)]:
-        if os.path.isdir(path):
-            files_tuple = [
-                (
-                    os.path.relpath(os.path.join(dp, f), path),
-                    os.path.getsize(os.path.join(dp, f)),
-                )
-                for dp, dn, filenames in os.walk(path)
-                for f in filenames
-            ]
-        else:
-            files_tuple = [(os.path.basename(path), os.path.getsize(path))]
-        return files_tuple
+    def _get_md5(path: str) -> bytes:
+        md5 = hashlib.md5()
+        with open(path, "rb") as file:
+            for block in iter(lambda: file.read(1024 * 1024), b""):
+                md5.update(block)
+        return md5.digest()
 
     @staticmethod
-    def _get_nb_threads(files: list[(str, int)]) -> int:
-        size_threshold = 5 * 1024 * 1024  # 5mb
-        nb_small_files = sum(size <= size_threshold for _, size in files)
-        return min(32, 4 + nb_small_files // 100)  # control number of threads considering quantity of files
+    def _check_sync(file_path: str, blob, upload: bool) -> tuple[bool, Optional[bytes]]:
+        """
+        Tell whether a local file and a blob have the same content, and return the MD5 of the file when it had to be
+        computed so that an upload does not read the file twice.
+        """
+        # Same size and same Content-MD5 when the blob has one, otherwise fall back on modification times
+        if blob is None or not os.path.isfile(file_path):
+            return False, None
+        stat = os.stat(file_path)
+        if stat.st_size != blob.size:
+            return False, None
+        content_md5 = blob.content_settings.content_md5
+        if content_md5:
+            md5 = _DataHandler._get_md5(file_path)
+            return md5 == bytes(content_md5), md5
+        remote_time = blob.last_modified.timestamp()
+        return (stat.st_mtime <= remote_time if upload else stat.st_mtime == remote_time), None
 
     @staticmethod
-    def download_data(container_url: str, dst: str, src: str, progress_hook):
-        sas_uri = container_url
-        client = ContainerClient.from_container_url(sas_uri)
-        blobs_tuple = [(blob.name, blob.size) for blob in client.list_blobs()
-                       if blob.name.startswith(src)]
-        nb_threads = _DataHandler._get_nb_threads(blobs_tuple)
+    def download_data(container_url: str, dst: str, src: str, progress_hook,
+                      options: Optional[TransferOptions] = None, sync: bool = False,
+                      renew_url: Optional[Callable[[], Optional[str]]] = None,
+                      recorder: Optional[_TransferRecorder] = None):
+        options = options or TransferOptions()
+        client = _DataHandler._get_container_client(container_url, options, renew_url)
+        blobs = {blob.name: blob for blob in client.list_blobs() if blob.name.startswith(src)}
+        blobs_tuple = [(blob.name, blob.size) for blob in blobs.values()]
+        nb_threads = _DataHandler._get_nb_threads(blobs_tuple, options)
+        controller = _ConcurrencyController(options.max_in_flight)
 
-        total_size = sum(n for _, n in blobs_tuple)
-        proceed = True
-        downloaded_values = {}
+        progress = _ProgressAggregator(sum(n for _, n in blobs_tuple), progress_hook, options.progress_interval,
+                                       "Download")
+        if recorder is not None:
+            recorder.track(progress, controller)
 
         def _download_blob(blob_tuple):
             def _download_callback(current, _):
-                nonlocal downloaded_values
-                downloaded_values[blob_tuple[0]] = current
-                percentage = (sum(downloaded_values.values()) / total_size) * 100
-                nonlocal proceed
-                if progress_hook is not None:
-                    proceed = proceed and progress_hook(percentage)
-                if not proceed:
-                    raise InterruptedError("Download interrupted by callback function")
-
-            data = client.download_blob(
-                blob_tuple[0],
-                connection_timeout=60,
-                max_concurrency=16,
-                retry_total=20,
-                retry_connect=10,
-                progress_hook=_download_callback,
-            ).readall()
+                progress.update(blob_tuple[0], current)
 
             rel_path = blob_tuple[0].removeprefix(src) if src != blob_tuple[0] else os.path.basename(src)
             rel_path = rel_path.strip('/')
             download_file_path = os.path.join(dst, rel_path)
             os.makedirs(os.path.dirname(download_file_path), exist_ok=True)
+            if sync and _DataHandler._check_sync(download_file_path, blobs[blob_tuple[0]], False)[0]:
+                progress.skip(blob_tuple[0], blob_tuple[1])
+                return
 
-            with open(download_file_path, "wb") as file:
-                file.write(data)
-            nonlocal downloaded_values
-            downloaded_values[blob_tuple[0]] = blob_tuple[1]
+            granted = controller.acquire(_DataHandler._get_nb_chunks(blob_tuple[1], options.chunk_size, options))
+            try:
+                with open(download_file_path, "wb") as file:
+                    client.download_blob(
+                        blob_tuple[0],
+                        connection_timeout=60,
+                        max_concurrency=granted,
+                        retry_total=20,
+                        retry_connect=10,
+                        progress_hook=_download_callback,
+                        raw_request_hook=controller.on_request,
+                        raw_response_hook=controller.on_response,
+                    ).readinto(file)
+            finally:
+                controller.release(granted)
+            if sync:
+                # Align the local modification time on the blob so the next sync can skip it
+                remote_time = blobs[blob_tuple[0]].last_modified.timestamp()
+                os.utime(download_file_path, (remote_time, remote_time))
+            progress.complete(blob_tuple[0], blob_tuple[1])
 
         try:
             with ThreadPool(processes=nb_threads) as pool:
                 pool.map(_download_blob, blobs_tuple)
+            progress.finish()
         except InterruptedError as _:
             de = DetailedErrorResponse(error={"code": "DownloadInterrupted",
                                               "message": "Download was interrupted by user."})
@@ -84,47 +573,122 @@ class _DataHandler:
             de = DetailedErrorResponse(error={"code": "DownloadFailure",
                                               "message": f"Download failed: {e}."})
             return Response(500, de, None)
+        finally:
+            client.close()
         return Response(200, None, None)
 
     @staticmethod
-    def upload_data(container_url, src: str, reality_data_dst: str, progress_hook):
-        files = _DataHandler._get_files_and_sizes(src)
-        nb_threads = _DataHandler._get_nb_threads(files)
-        total_size = sum(size for _, size in files)
-        proceed = True
-        uploaded_values = {}
-        sas_uri = container_url
+    def upload_data(container_url, src: str, reality_data_dst: str, progress_hook,
+                    options: Optional[TransferOptions] = None, sync: bool = False,
+                    renew_url: Optional[Callable[[], Optional[str]]] = None,
+                    recorder: Optional[_TransferRecorder] = None):
+        options = options or TransferOptions()
+        controller = _ConcurrencyController(options.max_in_flight)
+        # The total grows while the source is walked
+        progress = _ProgressAggregator(0, progress_hook, options.progress_interval, "Upload", total_known=False)
+        if recorder is not None:
+            recorder.track(progress, controller)
+        client = _DataHandler._get_container_client(container_url, options, renew_url)
+        remote_blobs = {}
+        transfer_kwargs = {
+            "connection_timeout": 60,
+            "retry_total": 20,
+            "retry_connect": 10,
+            "raw_request_hook": controller.on_request,
+            "raw_response_hook": controller.on_response,
+        }
+
+        def _upload_small_file(file_tuple, blob_name, file_path, content_settings):
+            with open(file_path, "rb") as data:
+                payload = data.read()
+            granted = controller.acquire(1)
+            try:
+                client.upload_blob(blob_name, payload, content_settings=content_settings, max_concurrency=1,
+                                   overwrite=True, **transfer_kwargs)
+            finally:
+                controller.release(granted)
+            progress.complete(file_tuple[0], file_tuple[1])
+
+        def _upload_blocks(file_tuple, blob_name, file_path, content_settings):
+            blob_client = client.get_blob_client(blob_name)
+            block_ids = _DataHandler._get_block_ids(file_tuple[1], options)
+
+            def _stage_block(index):
+                with open(file_path, "rb") as data:
+                    data.seek(index * options.chunk_size)
+                    payload = data.read(options.chunk_size)
+                blob_client.stage_block(block_ids[index], payload, **transfer_kwargs)
+                progress.update(f"{file_tuple[0]}:{index}", len(payload))
+
+            granted = controller.acquire(min(options.max_concurrency, len(block_ids)))
+            try:
+                with ThreadPool(processes=granted) as block_pool:
+                    block_pool.map(_stage_block, range(len(block_ids)))
+                blob_client.commit_block_list([BlobBlock(block_id=block_id) for block_id in block_ids],
+                                              content_settings=content_settings, **transfer_kwargs)
+            finally:
+                controller.release(granted)
+            # The bytes were counted block by block
+            progress.complete(file_tuple[0], 0)
 
         def _upload_file(file_tuple):
             def _upload_callback(current, _):
-                nonlocal uploaded_values
-                uploaded_values[file_tuple[0]] = current
-                percentage = (sum(uploaded_values.values()) / total_size) * 100
-                nonlocal proceed
-                if progress_hook is not None:
-                    proceed = proceed and progress_hook(percentage)
-                if not proceed:
-                    raise InterruptedError("Upload interrupted by callback function")
-
-            client = ContainerClient.from_container_url(sas_uri)
+                progress.update(file_tuple[0], current)
+
+            blob_name = os.path.join(reality_data_dst, file_tuple[0])
             file_path = os.path.join(src, file_tuple[0]) if os.path.isdir(src) else src
-            with open(file_path, "rb") as data:
-                client.upload_blob(
-                    os.path.join(reality_data_dst, file_tuple[0]),
-                    data,
-                    connection_timeout=60,
-                    max_concurrency=16,
-                    retry_total=20,
-                    retry_connect=10,
-                    progress_hook=_upload_callback,
-                    overwrite=True,
-                )
-            nonlocal uploaded_values
-            uploaded_values[file_tuple[0]] = file_tuple[1]
+            content_settings = None
+            if sync:
+                synced, md5 = _DataHandler._check_sync(file_path, remote_blobs.get(blob_name), True)
+                if synced:
+                    progress.skip(file_tuple[0], file_tuple[1])
+                    return
+                # Store the MD5 so that the next sync can compare contents
+                md5 = md5 or _DataHandler._get_md5(file_path)
+                content_settings = ContentSettings(content_md5=bytearray(md5))
+            if options.small_file_batch_size > 0:
+                if file_tuple[1] > options.chunk_size:
+                    _upload_blocks(file_tuple, blob_name, file_path, content_settings)
+                else:
+                    _upload_small_file(file_tuple, blob_name, file_path, content_settings)
+                return
+
+            granted = controller.acquire(_DataHandler._get_nb_chunks(file_tuple[1], _DataHandler._SINGLE_PUT_SIZE,
+                                                                     options))
+            try:
+                with open(file_path, "rb") as data:
+                    client.upload_blob(
+                        blob_name,
+                        data,
+                        content_settings=content_settings,
+                        max_concurrency=granted,
+                        progress_hook=_upload_callback,
+                        overwrite=True,
+                        **transfer_kwargs,
+                    )
+            finally:
+                controller.release(granted)
+            progress.complete(file_tuple[0], file_tuple[1])
+
+        def _upload_batch(batch):
+            for file_tuple in batch:
+                _upload_file(file_tuple)
+
+        def _discover_files():
+            for file_tuple in _DataHandler._iter_files(src):
+                progress.add_total(file_tuple[1])
+                yield file_tuple
+            progress.set_total_known()
 
         try:
-            with ThreadPool(processes=nb_threads) as pool:
-                pool.map(_upload_file, files)
+            if sync:
+                remote_blobs = {blob.name: blob for blob in client.list_blobs(name_starts_with=reality_data_dst)}
+            if options.small_file_batch_size > 0:
+                _DataHandler._run_workers(_DataHandler._get_batches(_discover_files(), options), _upload_batch,
+                                          options.max_in_flight)
+            else:
+                _DataHandler._run_workers(_discover_files(), _upload_file, options.max_in_flight)
+            progress.finish()
         except InterruptedError as _:
             de = DetailedErrorResponse(error={"code": "UploadInterrupted",
                                               "message": "Upload was interrupted by user."})
@@ -133,6 +697,70 @@ class _DataHandler:
             de = DetailedErrorResponse(error={"code": "UploadFailure",
                                               "message": f"Upload failed: {e}."})
             return Response(500, de, None)
+        finally:
+            client.close()
+        return Response(200, None, None)
+
+    @staticmethod
+    def _wait_for_copy(blob_client, copy_props: dict, progress: _ProgressAggregator, key: str) -> None:
+        status = copy_props["copy_status"]
+        delay = _DataHandler._COPY_POLL_MIN_DELAY
+        while status == "pending":
+            time.sleep(delay)
+            delay = min(2 * delay, _DataHandler._COPY_POLL_MAX_DELAY)
+            copy = blob_client.get_blob_properties().copy
+            status = copy.status
+            if copy.progress:
+                progress.update(key, int(copy.progress.split("/")[0]))
+        if status != "success":
+            raise RuntimeError(f"copy of {key} ended with status {status}")
+
+    @staticmethod
+    def copy_data(src_container_url: str, dst_container_url: str, prefix: str, progress_hook,
+                  options: Optional[TransferOptions] = None,
+                  src_renew_url: Optional[Callable[[], Optional[str]]] = None,
+                  dst_renew_url: Optional[Callable[[], Optional[str]]] = None,
+                  recorder: Optional[_TransferRecorder] = None) -> Response[None]:
+        options = options or TransferOptions()
+        src_renewal = _SasRenewal(src_container_url, src_renew_url)
+        src_client = _DataHandler._get_container_client(src_container_url, options, src_renew_url)
+        dst_client = _DataHandler._get_container_client(dst_container_url, options, dst_renew_url)
+        progress = _ProgressAggregator(0, progress_hook, options.progress_interval, "Copy", total_known=False)
+        if recorder is not None:
+            recorder.track(progress)
+
+        def _copy_blob(blob_tuple):
+            # The source url carries the read SAS, so the storage service fetches the data itself
+            source_url = src_renewal.apply(src_client.get_blob_client(blob_tuple[0]).url)
+            dst_blob = dst_client.get_blob_client(blob_tuple[0])
+            copy_props = dst_blob.start_copy_from_url(source_url)
+            try:
+                _DataHandler._wait_for_copy(dst_blob, copy_props, progress, blob_tuple[0])
+            except InterruptedError:
+                dst_blob.abort_copy(copy_props["copy_id"])
+                raise
+            progress.complete(blob_tuple[0], blob_tuple[1])
+
+        def _list_blobs():
+            for blob in src_client.list_blobs(name_starts_with=prefix or None):
+                progress.add_total(blob.size)
+                yield blob.name, blob.size
+            progress.set_total_known()
+
+        try:
+            _DataHandler._run_workers(_list_blobs(), _copy_blob, options.max_in_flight)
+            progress.finish()
+        except InterruptedError as _:
+            de = DetailedErrorResponse(error={"code": "CopyInterrupted",
+                                              "message": "Copy was interrupted by user."})
+            return Response(499, de, None)
+        except Exception as e:
+            de = DetailedErrorResponse(error={"code": "CopyFailure",
+                                              "message": f"Copy failed: {e}."})
+            return Response(500, de, None)
+        finally:
+            src_client.close()
+            dst_client.close()
         return Response(200, None, None)
 
     @staticmethod
@@ -142,14 +770,34 @@ class _DataHandler:
         return Response(200, None, blob_names)
 
     @staticmethod
-    def delete_data(container_url: str, files_to_delete: list[str]) -> Response[None]:
-        client = ContainerClient.from_container_url(container_url)
+    def _get_chunks(items: Iterable, size: int) -> Iterator[list]:
+        chunk = []
+        for item in items:
+            chunk.append(item)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    def _delete_blobs(client: ContainerClient, blob_names: Iterable[str], options: TransferOptions,
+                      recorder: Optional[_TransferRecorder] = None) -> Response[None]:
         failed = []
-        for file in files_to_delete:
+        batch_sizes = []
+
+        def _delete_batch(batch):
+            batch_sizes.append(len(batch))
             try:
-                client.delete_blob(file)
+                responses = client.delete_blobs(*batch, raise_on_any_failure=False)
+                failed.extend(name for name, response in zip(batch, responses) if response.status_code >= 300)
             except Exception as _:
-                failed.append(file)
+                failed.extend(batch)
+
+        _DataHandler._run_workers(_DataHandler._get_chunks(blob_names, _DataHandler._DELETE_BATCH_SIZE),
+                                  _delete_batch, options.max_in_flight)
+        if recorder is not None:
+            recorder.metrics.files = sum(batch_sizes) - len(failed)
         if not failed:
             return Response(204, None, None)
         detailed_error = DetailedError(code="DeletionFailed", message="Failed to delete one or multiple files",
@@ -157,6 +805,110 @@ class _DataHandler:
                                                       target=fail) for fail in failed])
         return Response(400, DetailedErrorResponse(error=detailed_error), None)
 
+    @staticmethod
+    def delete_data(container_url: str, files_to_delete: list[str],
+                    options: Optional[TransferOptions] = None,
+                    renew_url: Optional[Callable[[], Optional[str]]] = None,
+                    recorder: Optional[_TransferRecorder] = None) -> Response[None]:
+        options = options or TransferOptions()
+        client = _DataHandler._get_container_client(container_url, options, renew_url)
+        try:
+            return _DataHandler._delete_blobs(client, files_to_delete, options, recorder)
+        finally:
+            client.close()
+
+    @staticmethod
+    def delete_prefix(container_url: str, prefix: str, options: Optional[TransferOptions] = None,
+                      renew_url: Optional[Callable[[], Optional[str]]] = None,
+                      recorder: Optional[_TransferRecorder] = None) -> Response[None]:
+        # Blob storage has no server-side prefix deletion: the names are listed page by page and deleted as they come
+        options = options or TransferOptions()
+        client = _DataHandler._get_container_client(container_url, options, renew_url)
+        try:
+            return _DataHandler._delete_blobs(client, client.list_blob_names(name_starts_with=prefix or None), options,
+                                              recorder)
+        except Exception as e:
+            de = DetailedErrorResponse(error={"code": "DeletionFailed",
+                                              "message": f"Deletion failed: {e}."})
+            return Response(500, de, None)
+        finally:
+            client.close()
+
+
+class UploadSession:
+    """
+    Several uploads to the same reality data, with authoring enabled once before the first one and disabled once at
+    the end. Uploads of a session can run concurrently from several threads.
+
+    Sessions are obtained from :meth:`RealityDataHandler.upload_session` and are meant to be used as context managers,
+    which guarantees that authoring is disabled even if an upload fails.
+    """
+
+    def __init__(self, handler: "RealityDataHandler", reality_data_id: str, itwin_id: Optional[str] = None) -> None:
+        """
+        Constructor method
+
+        :param handler: Handler performing the uploads.
+        :param reality_data_id: Id of the Reality Data.
+        :param itwin_id: Optional iTwin id for finding the reality data.
+        """
+        self._handler = handler
+        self._reality_data_id = reality_data_id
+        self._itwin_id = itwin_id
+        self._lock = threading.Lock()
+        self._authoring = False
+
+    def __enter__(self) -> "UploadSession":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _open(self) -> Response[None]:
+        with self._lock:
+            if not self._authoring:
+                r = self._handler._set_authoring(self._reality_data_id, True)
+                if r.is_error():
+                    return Response(r.status_code, r.error, None)
+                self._authoring = True
+        return Response(200, None, None)
+
+    def upload(self, src: str, reality_data_dst: str = "", sync: bool = False) -> Response[None]:
+        """
+        Upload files to the reality data of the session. Authoring is enabled by the first upload.
+
+        :param src: Source path to upload. If directory, all the files in the directory will be uploaded recursively.
+        :param reality_data_dst: Destination of the data inside the Reality Data, default to root.
+        :param sync: If True, only upload the files that are missing or different in the Reality Data.
+        :return: A Response[None] containing the error from the service if any.
+        """
+        rlink = self._handler._get_link(self._reality_data_id, self._itwin_id, False)
+        if rlink.is_error():
+            return Response(rlink.status_code, rlink.error, None)
+        r = self._open()
+        if r.is_error():
+            return r
+        recorder = self._handler._start_transfer("upload")
+        return recorder.record(_DataHandler.upload_data(
+            rlink.value.links.container_url.href, src, reality_data_dst, self._handler._get_progress_hook(),
+            self._handler._transfer_options, sync,
+            self._handler._get_renew_url(self._reality_data_id, self._itwin_id, False), recorder))
+
+    def close(self) -> Response[None]:
+        """
+        Disable authoring if an upload enabled it. Called when leaving the context manager.
+
+        :return: A Response[None] containing the error from the service if any.
+        """
+        with self._lock:
+            if not self._authoring:
+                return Response(200, None, None)
+            r = self._handler._set_authoring(self._reality_data_id, False)
+            if r.is_error():
+                return Response(r.status_code, r.error, None)
+            self._authoring = False
+        return Response(200, None, None)
+
 
 class RealityDataHandler:
     """
@@ -171,20 +923,44 @@ class RealityDataHandler:
         :type token_factory: Object
         :param \\**kwargs: Internal parameters used only for development purposes.
         """
-        self._service = RealityCaptureService(token_factory, **kwargs)
+        self._service = self._create_service(token_factory, **kwargs)
         self._progress_hook = None
+        self._transfer_progress_hook = None
+        self._transfer_options = TransferOptions()
+        self._link_cache = LinkCache()
 
-    def _get_link(self, rd_id: str, itwin_id: Optional[str], read_only: bool) -> Response[ContainerDetails]:
+    @staticmethod
+    def _create_service(token_factory, **kwargs) -> RealityCaptureService:
+        return RealityCaptureService(token_factory, **kwargs)
+
+    def _fetch_link(self, rd_id: str, itwin_id: Optional[str], read_only: bool) -> Response[ContainerDetails]:
         if not read_only:
             return self._service.get_reality_data_write_access(rd_id, itwin_id)
         return self._service.get_reality_data_read_access(rd_id, itwin_id)
 
+    def _get_link(self, rd_id: str, itwin_id: Optional[str], read_only: bool) -> Response[ContainerDetails]:
+        return self._link_cache.get((rd_id, itwin_id, "Read" if read_only else "Write"),
+                                    lambda: self._fetch_link(rd_id, itwin_id, read_only))
+
+    def _get_renew_url(self, rd_id: str, itwin_id: Optional[str], read_only: bool) -> Callable[[], Optional[str]]:
+        def _renew_url() -> Optional[str]:
+            r = self._get_link(rd_id, itwin_id, read_only)
+            return None if r.is_error() else r.value.links.container_url.href
+
+        return _renew_url
+
+    def _get_progress_hook(self) -> Optional[Callable[[TransferProgress], bool]]:
+        return _DataHandler._get_progress_hook(self._progress_hook, self._transfer_progress_hook)
+
+    def _start_transfer(self, operation: str) -> _TransferRecorder:
+        return _TransferRecorder(self._service._instrumentation, operation)
+
     def _set_authoring(self, rd_id: str, authoring: bool) -> Response[RealityData]:
         rdu = RealityDataUpdate(authoring=authoring)
         return self._service.update_reality_data(rdu, rd_id)
 
     def upload_data(self, reality_data_id: str, src: str,
-                    reality_data_dst: str = "", itwin_id: Optional[str] = None) -> Response[None]:
+                    reality_data_dst: str = "", itwin_id: Optional[str] = None, sync: bool = False) -> Response[None]:
         """
         Upload files to a reality data.
 
@@ -192,24 +968,29 @@ class RealityDataHandler:
         :param src: Source path to upload. If directory, all the files in the directory will be uploaded recursively.
         :param reality_data_dst: Destination of the data inside the Reality Data, default to root.
         :param itwin_id: Optional iTwin id for finding the reality data.
+        :param sync: If True, only upload the files that are missing or different in the Reality Data.
         :return: A Response[None] containing the error from the service if any.
         """
-
-        rlink = self._get_link(reality_data_id, itwin_id, False)
-        if rlink.is_error():
-            return Response(rlink.status_code, rlink.error, None)
-        r = self._set_authoring(reality_data_id, True)
+        with self.upload_session(reality_data_id, itwin_id) as session:
+            resp = session.upload(src, reality_data_dst, sync)
+            r = session.close()
         if r.is_error():
-            return Response(r.status_code, r.error, None)
-        resp = _DataHandler.upload_data(rlink.value.links.container_url.href,
-                                        src, reality_data_dst, self._progress_hook)
-        r = self._set_authoring(reality_data_id, False)
-        if r.is_error():
-            return Response(r.status_code, r.error, None)
+            return r
         return resp
 
+    def upload_session(self, reality_data_id: str, itwin_id: Optional[str] = None) -> UploadSession:
+        """
+        Start a session of uploads to a reality data, to use as a context manager. Authoring is enabled once for all
+        the uploads of the session instead of around each of them, and always disabled when the session ends.
+
+        :param reality_data_id: Id of the Reality Data.
+        :param itwin_id: Optional iTwin id for finding the reality data.
+        :return: The upload session.
+        """
+        return UploadSession(self, reality_data_id, itwin_id)
+
     def download_data(self, reality_data_id: str, dst: str,
-                      reality_data_src: str = "", itwin_id: Optional[str] = None) -> Response[None]:
+                      reality_data_src: str = "", itwin_id: Optional[str] = None, sync: bool = False) -> Response[None]:
         """
         Download files from a reality data.
 
@@ -217,12 +998,52 @@ class RealityDataHandler:
         :param dst: Destination path of the downloads.
         :param reality_data_src: Source folder to download in the Reality Data, default to root.
         :param itwin_id: Optional iTwin id for finding the reality data.
+        :param sync: If True, only download the files that are missing or different in the destination.
         :return: A Response[None] containing the error from the service if any.
         """
         r = self._get_link(reality_data_id, itwin_id, True)
         if r.is_error():
             return Response(r.status_code, r.error, None)
-        return _DataHandler.download_data(r.value.links.container_url.href, dst, reality_data_src, self._progress_hook)
+        recorder = self._start_transfer("download")
+        return recorder.record(_DataHandler.download_data(r.value.links.container_url.href, dst, reality_data_src,
+                                                          self._get_progress_hook(), self._transfer_options, sync,
+                                                          self._get_renew_url(reality_data_id, itwin_id, True),
+                                                          recorder))
+
+    def copy_data(self, src_reality_data_id: str, dst_reality_data_id: str, prefix: str = "",
+                  src_itwin_id: Optional[str] = None, dst_itwin_id: Optional[str] = None) -> Response[None]:
+        """
+        Copy files from a reality data to another one. The copy is done by the storage service, so the data never
+        goes through this machine.
+
+        :param src_reality_data_id: Id of the Reality Data to copy from.
+        :param dst_reality_data_id: Id of the Reality Data to copy to.
+        :param prefix: Only copy the files whose path starts with this prefix, default to all files.
+        :param src_itwin_id: Optional iTwin id for finding the source reality data.
+        :param dst_itwin_id: Optional iTwin id for finding the destination reality data.
+        :return: A Response[None] containing the error from the service if any.
+        """
+        src_link = self._get_link(src_reality_data_id, src_itwin_id, True)
+        if src_link.is_error():
+            return Response(src_link.status_code, src_link.error, None)
+        dst_link = self._get_link(dst_reality_data_id, dst_itwin_id, False)
+        if dst_link.is_error():
+            return Response(dst_link.status_code, dst_link.error, None)
+        r = self._set_authoring(dst_reality_data_id, True)
+        if r.is_error():
+            return Response(r.status_code, r.error, None)
+        recorder = self._start_transfer("copy")
+        try:
+            resp = recorder.record(_DataHandler.copy_data(
+                src_link.value.links.container_url.href, dst_link.value.links.container_url.href, prefix,
+                self._get_progress_hook(), self._transfer_options,
+                self._get_renew_url(src_reality_data_id, src_itwin_id, True),
+                self._get_renew_url(dst_reality_data_id, dst_itwin_id, False), recorder))
+        finally:
+            r = self._set_authoring(dst_reality_data_id, False)
+        if r.is_error():
+            return Response(r.status_code, r.error, None)
+        return resp
 
     def list_data(self, reality_data_id, itwin_id: Optional[str] = None) -> Response[list[str]]:
         """
@@ -250,7 +1071,29 @@ class RealityDataHandler:
         r = self._get_link(reality_data_id, itwin_id, False)
         if r.is_error():
             return Response(r.status_code, r.error, None)
-        return _DataHandler.delete_data(r.value.links.container_url.href, files_to_delete)
+        recorder = self._start_transfer("delete")
+        return recorder.record(_DataHandler.delete_data(r.value.links.container_url.href, files_to_delete,
+                                                        self._transfer_options,
+                                                        self._get_renew_url(reality_data_id, itwin_id, False),
+                                                        recorder))
+
+    def delete_prefix(self, reality_data_id, prefix: str, itwin_id: Optional[str] = None) -> Response[None]:
+        """
+        Delete all the files whose path starts with a prefix from a reality data.
+
+        :param reality_data_id: id of the Reality Data.
+        :param prefix: Prefix of the files to delete, an empty prefix deletes all the files.
+        :param itwin_id: iTwin id for finding the bucket.
+        :return: A Response[None] containing the error from the service if any.
+        """
+        r = self._get_link(reality_data_id, itwin_id, False)
+        if r.is_error():
+            return Response(r.status_code, r.error, None)
+        recorder = self._start_transfer("delete")
+        return recorder.record(_DataHandler.delete_prefix(r.value.links.container_url.href, prefix,
+                                                          self._transfer_options,
+                                                          self._get_renew_url(reality_data_id, itwin_id, False),
+                                                          recorder))
 
     def set_progress_hook(self, hook: Optional[Callable[[float], bool]]) -> None:
         """
@@ -261,6 +1104,24 @@ class RealityDataHandler:
         """
         self._progress_hook = hook
 
+    def set_transfer_progress_hook(self, hook: Optional[Callable[[TransferProgress], bool]]) -> None:
+        """
+        Set the detailed progress hook, called with the transferred bytes, the transfer rate and the estimated
+        remaining time. It is called at most once per ``TransferOptions.progress_interval``.
+
+        :param hook: Function taking a TransferProgress as an argument and returning a bool.
+         When returning false, the ongoing action will be cancelled. Can be None if no progress hook is needed.
+        """
+        self._transfer_progress_hook = hook
+
+    def set_transfer_options(self, options: Optional[TransferOptions]) -> None:
+        """
+        Set the transfer options used for uploads, downloads, copies and deletions.
+
+        :param options: Transfer options to use. Can be None to restore the default options.
+        """
+        self._transfer_options = options or TransferOptions()
+
 
 class BucketDataHandler:
     """
@@ -275,41 +1136,69 @@ class BucketDataHandler:
         :type token_factory: Object
         :param \\**kwargs: Internal parameters used only for development purposes.
         """
-        self._service = RealityCaptureService(token_factory, **kwargs)
+        self._service = self._create_service(token_factory, **kwargs)
         self._progress_hook = None
+        self._transfer_progress_hook = None
+        self._transfer_options = TransferOptions()
+        self._link_cache = LinkCache()
+
+    @staticmethod
+    def _create_service(token_factory, **kwargs) -> RealityCaptureService:
+        return RealityCaptureService(token_factory, **kwargs)
 
     def _get_bucket(self, itwin_id: str) -> Response[BucketResponse]:
-        return self._service.get_bucket(itwin_id)
+        return self._link_cache.get((None, itwin_id, "Bucket"), lambda: self._service.get_bucket(itwin_id))
 
-    def upload_data(self, itwin_id: str, src: str, bucket_dst: str = "", ) -> Response[None]:
+    def _get_renew_url(self, itwin_id: str) -> Callable[[], Optional[str]]:
+        def _renew_url() -> Optional[str]:
+            r = self._get_bucket(itwin_id)
+            return None if r.is_error() else r.value.links.container_url.href
+
+        return _renew_url
+
+    def _get_progress_hook(self) -> Optional[Callable[[TransferProgress], bool]]:
+        return _DataHandler._get_progress_hook(self._progress_hook, self._transfer_progress_hook)
+
+    def _start_transfer(self, operation: str) -> _TransferRecorder:
+        return _TransferRecorder(self._service._instrumentation, operation)
+
+    def upload_data(self, itwin_id: str, src: str, bucket_dst: str = "", sync: bool = False) -> Response[None]:
         """
         Upload files to a bucket.
 
         :param itwin_id: iTwin id for finding the bucket.
         :param src: Source path to upload. If directory, all the files in the directory will be uploaded recursively.
         :param bucket_dst: Destination of the data inside the bucket, default to root.
+        :param sync: If True, only upload the files that are missing or different in the bucket.
         :return: A Response[None] containing the error from the service if any.
         """
 
         r = self._get_bucket(itwin_id)
         if r.is_error():
             return Response(r.status_code, r.error, None)
-        return _DataHandler.upload_data(r.value.links.container_url.href, src, bucket_dst, self._progress_hook)
+        recorder = self._start_transfer("upload")
+        return recorder.record(_DataHandler.upload_data(r.value.links.container_url.href, src, bucket_dst,
+                                                        self._get_progress_hook(), self._transfer_options, sync,
+                                                        self._get_renew_url(itwin_id), recorder))
 
     def download_data(self, itwin_id: str, dst: str,
-                      bucket_src: str = "") -> Response[None]:
+                      bucket_src: str = "", sync: bool = False) -> Response[None]:
         """
         Download files from a bucket.
 
         :param itwin_id: iTwin id for finding the bucket.
         :param dst: Destination path of the downloads.
         :param bucket_src: Source folder to download in the bucket, default to root.
+        :param sync: If True, only download the files that are missing or different in the destination.
         :return: A Response[None] containing the error from the service if any.
         """
         r = self._get_bucket(itwin_id)
         if r.is_error():
             return Response(r.status_code, r.error, None)
-        return _DataHandler.download_data(r.value.links.container_url.href, dst, bucket_src, self._progress_hook)
+        recorder = self._start_transfer("download")
+        return recorder.record(_DataHandler.download_data(r.value.links.container_url.href, dst, bucket_src,
+                                                          self._get_progress_hook(), self._transfer_options, sync,
+                                                          self._get_renew_url(itwin_id), recorder))
 
     def list_data(self, itwin_id: str) -> Response[list[str]]:
         """
@@ -334,7 +1223,26 @@ class BucketDataHandler:
         r = self._get_bucket(itwin_id)
         if r.is_error():
             return Response(r.status_code, r.error, None)
-        return _DataHandler.delete_data(r.value.links.container_url.href, files_to_delete)
+        recorder = self._start_transfer("delete")
+        return recorder.record(_DataHandler.delete_data(r.value.links.container_url.href, files_to_delete,
+                                                        self._transfer_options, self._get_renew_url(itwin_id),
+                                                        recorder))
+
+    def delete_prefix(self, itwin_id, prefix: str) -> Response[None]:
+        """
+        Delete all the files whose path starts with a prefix from a bucket.
+
+        :param itwin_id: iTwin id for finding the bucket.
+        :param prefix: Prefix of the files to delete, an empty prefix deletes all the files.
+        :return: A Response[None] containing the error from the service if any.
+        """
+        r = self._get_bucket(itwin_id)
+        if r.is_error():
+            return Response(r.status_code, r.error, None)
+        recorder = self._start_transfer("delete")
+        return recorder.record(_DataHandler.delete_prefix(r.value.links.container_url.href, prefix,
+                                                          self._transfer_options, self._get_renew_url(itwin_id),
+                                                          recorder))
 
     def set_progress_hook(self, hook: Optional[Callable[[float], bool]]) -> None:
         """
@@ -344,3 +1252,21 @@ class BucketDataHandler:
          When returning false, the ongoing action will be cancelled. Can be None if no progress hook is needed.
         """
         self._progress_hook = hook
+
+    def set_transfer_progress_hook(self, hook: Optional[Callable[[TransferProgress], bool]]) -> None:
+        """
+        Set the detailed progress hook, called with the transferred bytes, the transfer rate and the estimated
+        remaining time. It is called at most once per ``TransferOptions.progress_interval``.
+
+        :param hook: Function taking a TransferProgress as an argument and returning a bool.
+         When returning false, the ongoing action will be cancelled. Can be None if no progress hook is needed.
+        """
+        self._transfer_progress_hook = hook
+
+    def set_transfer_options(self, options: Optional[TransferOptions]) -> None:
+        """
+        Set the transfer options used for uploads, downloads and deletions.
+
+        :param options: Transfer options to use. Can be None to restore the default options.
+        """
+        self._transfer_options = options or TransferOptions()
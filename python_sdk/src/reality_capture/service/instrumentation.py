@@ -0,0 +1,232 @@
+import math
+import threading
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Optional
+from urllib.parse import urlparse
+
+# Path segments following these ones are identifiers, replaced by a placeholder in the endpoint names
+_COLLECTIONS = frozenset({"jobs", "reality-data", "detectors", "versions", "itwins"})
+
+
+def get_endpoint(method: str, url: str) -> str:
+    """
+    Return the name of the endpoint of a request, with its identifiers replaced by ``{id}``.
+
+    :param method: HTTP method of the request.
+    :param url: Url of the request.
+    :return: The endpoint name, for instance ``GET reality-modeling/jobs/{id}/progress``.
+    """
+    segments = urlparse(url).path.strip("/").split("/")
+    for i in range(1, len(segments)):
+        if segments[i - 1] in _COLLECTIONS:
+            segments[i] = "{id}"
+    return f"{method.upper()} {'/'.join(segments)}"
+
+
+@dataclass
+class RequestMetrics:
+    """
+    Measures of a request sent by a service.
+    """
+
+    method: str
+    "HTTP method of the request."
+    url: str
+    "Url of the request."
+    start: float
+    "Time at which the request started, as a Unix timestamp."
+    endpoint: str = ""
+    "Name of the endpoint, see :func:`get_endpoint`."
+    status_code: int = 0
+    "Status of the response returned to the caller, 503 after a network error."
+    duration: float = 0.0
+    "Total time in seconds spent in the call."
+    retries: int = 0
+    "Number of times the request was sent again after a failure or a throttling."
+    cached: bool = False
+    "True if the response came from the response cache, possibly after a revalidation."
+    bytes_sent: int = 0
+    "Size in bytes of the request bodies sent."
+    bytes_received: int = 0
+    "Size in bytes of the response bodies received."
+    phases: dict[str, float] = field(default_factory=dict)
+    """Time in seconds spent in each phase of the call: ``token`` (access token), ``wait`` (rate limiter and retry
+    delays), ``network`` (HTTP exchanges), ``decode`` (JSON parsing) and ``validation`` (pydantic models)."""
+
+    def add_phase(self, phase: str, duration: float) -> None:
+        """
+        Add time to a phase of the call.
+
+        :param phase: Name of the phase.
+        :param duration: Time in seconds.
+        """
+        self.phases[phase] = self.phases.get(phase, 0.0) + duration
+
+
+@dataclass
+class TransferMetrics:
+    """
+    Measures of a blob transfer performed by a data handler.
+    """
+
+    operation: str
+    "Kind of transfer: ``upload``, ``download``, ``copy`` or ``delete``."
+    start: float
+    "Time at which the transfer started, as a Unix timestamp."
+    status_code: int = 0
+    "Status of the response returned to the caller."
+    duration: float = 0.0
+    "Total time in seconds spent in the transfer."
+    files: int = 0
+    "Number of files transferred or deleted."
+    skipped_files: int = 0
+    "Number of files skipped because they were already synchronized."
+    bytes: int = 0
+    "Number of bytes moved, not counting the skipped files."
+    requests: int = 0
+    "Number of blob requests sent."
+    retried_requests: int = 0
+    "Number of blob requests that failed or were throttled, and retried by the storage client."
+
+
+class Instrumentation:
+    """
+    Receiver of the measures of the requests and transfers of the services and data handlers.
+
+    The methods are called once per call, after it is complete, from the thread or the task that made it. They do
+    nothing by default, subclasses override the ones they need. They must be thread-safe and fast, since they delay
+    the return of the call.
+    """
+
+    def on_request(self, metrics: RequestMetrics) -> None:
+        """
+        Called after each call of a service.
+
+        :param metrics: Measures of the call.
+        """
+
+    def on_transfer(self, metrics: TransferMetrics) -> None:
+        """
+        Called after each transfer of a data handler.
+
+        :param metrics: Measures of the transfer.
+        """
+
+
+@dataclass
+class Percentiles:
+    """
+    Percentiles of a series of durations, in seconds.
+    """
+
+    p50: float
+    "Median."
+    p95: float
+    "95th percentile."
+    p99: float
+    "99th percentile."
+
+
+@dataclass
+class EndpointSummary:
+    """
+    Summary of the calls of an endpoint, or of the transfers of an operation.
+    """
+
+    count: int
+    "Number of calls."
+    errors: int
+    "Number of calls that returned an error status."
+    retries: int
+    "Number of retried requests."
+    cache_hits: int
+    "Number of calls answered by the response cache."
+    bytes: int
+    "Number of bytes sent and received."
+    duration: Percentiles
+    "Percentiles of the duration of the calls."
+    phases: dict[str, Percentiles]
+    "Percentiles of the duration of each phase of the calls."
+
+
+def _get_percentiles(samples) -> Percentiles:
+    ordered = sorted(samples)
+
+    def _rank(q: float) -> float:
+        # Nearest-rank method
+        return ordered[max(math.ceil(q * len(ordered)) - 1, 0)]
+
+    return Percentiles(p50=_rank(0.50), p95=_rank(0.95), p99=_rank(0.99))
+
+
+class _Series:
+    def __init__(self, max_samples: int) -> None:
+        self.count = 0
+        self.errors = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.bytes = 0
+        self.durations = deque(maxlen=max_samples)
+        self.phases = defaultdict(lambda: deque(maxlen=max_samples))
+
+
+class MetricsCollector(Instrumentation):
+    """
+    Thread-safe in-memory collector summarizing the calls per endpoint and the transfers per operation.
+
+    Counters cover every call, while the percentiles are computed over the last ``max_samples`` calls of each
+    endpoint so that the memory used stays bounded.
+    """
+
+    def __init__(self, max_samples: int = 10000) -> None:
+        """
+        Constructor method
+
+        :param max_samples: Number of durations kept per endpoint for the percentiles.
+        """
+        self._max_samples = max_samples
+        self._series: dict[str, _Series] = {}
+        self._lock = threading.Lock()
+
+    def _add(self, name: str, status_code: int, retries: int, cached: bool, nb_bytes: int, duration: float,
+             phases: Optional[dict[str, float]] = None) -> None:
+        with self._lock:
+            series = self._series.get(name)
+            if series is None:
+                series = self._series[name] = _Series(self._max_samples)
+            series.count += 1
+            series.errors += status_code >= 400
+            series.retries += retries
+            series.cache_hits += cached
+            series.bytes += nb_bytes
+            series.durations.append(duration)
+            for phase, phase_duration in (phases or {}).items():
+                series.phases[phase].append(phase_duration)
+
+    def on_request(self, metrics: RequestMetrics) -> None:
+        self._add(metrics.endpoint, metrics.status_code, metrics.retries, metrics.cached,
+                  metrics.bytes_sent + metrics.bytes_received, metrics.duration, metrics.phases)
+
+    def on_transfer(self, metrics: TransferMetrics) -> None:
+        self._add(f"{metrics.operation} blobs", metrics.status_code, metrics.retried_requests, False, metrics.bytes,
+                  metrics.duration)
+
+    def get_summary(self) -> dict[str, EndpointSummary]:
+        """
+        Summarize the calls collected so far.
+
+        :return: Summary of each endpoint, transfers being named after their operation, like ``upload blobs``.
+        """
+        with self._lock:
+            return {name: EndpointSummary(count=s.count, errors=s.errors, retries=s.retries, cache_hits=s.cache_hits,
+                                          bytes=s.bytes, duration=_get_percentiles(s.durations),
+                                          phases={phase: _get_percentiles(d) for phase, d in s.phases.items()})
+                    for name, s in self._series.items()}
+
+    def reset(self) -> None:
+        """
+        Drop everything collected so far.
+        """
+        with self._lock:
+            self._series.clear()
@@ -1,44 +1,72 @@
+import functools
+import importlib
 import urllib.parse
-from pydantic import BaseModel, Field, ValidationInfo, field_validator
+from pydantic import BaseModel, Field, ValidationInfo, ValidatorFunctionWrapHandler, field_validator
 from datetime import datetime
 from enum import Enum
-from typing import Union, Optional, Any
-from reality_capture.specifications.calibration import CalibrationSpecifications, CalibrationSpecificationsCreate
-from reality_capture.specifications.change_detection import (ChangeDetectionSpecifications,
-                                                             ChangeDetectionSpecificationsCreate)
-from reality_capture.specifications.constraints import (ConstraintsSpecificationsCreate,
-                                                        ConstraintsSpecifications)
-from reality_capture.specifications.fill_image_properties import (FillImagePropertiesSpecificationsCreate,
-                                                                  FillImagePropertiesSpecifications)
-from reality_capture.specifications.import_point_cloud import ImportPCSpecifications, ImportPCSpecificationsCreate
-from reality_capture.specifications.objects2d import Objects2DSpecifications, Objects2DSpecificationsCreate
-from reality_capture.specifications.production import ProductionSpecifications, ProductionSpecificationsCreate
-from reality_capture.specifications.reconstruction import (ReconstructionSpecifications,
-                                                           ReconstructionSpecificationsCreate)
-from reality_capture.specifications.segmentation2d import (Segmentation2DSpecifications,
-                                                           Segmentation2DSpecificationsCreate)
-from reality_capture.specifications.segmentation3d import (Segmentation3DSpecifications,
-                                                           Segmentation3DSpecificationsCreate)
-from reality_capture.specifications.segmentation_orthophoto import (SegmentationOrthophotoSpecifications,
-                                                                    SegmentationOrthophotoSpecificationsCreate)
-from reality_capture.specifications.tiling import TilingSpecifications, TilingSpecificationsCreate
-from reality_capture.specifications.touchup import (TouchUpImportSpecifications, TouchUpImportSpecificationsCreate,
-                                                    TouchUpExportSpecifications, TouchUpExportSpecificationsCreate)
-from reality_capture.specifications.water_constraints import (WaterConstraintsSpecifications,
-                                                              WaterConstraintsSpecificationsCreate)
-"""from reality_capture.specifications.point_cloud_conversion import (PointCloudConversionSpecificationsCreate,
-                                                                   PointCloudConversionSpecifications)"""
-from reality_capture.specifications.training import (TrainingS3DSpecificationsCreate, TrainingS3DSpecifications)
-from reality_capture.specifications.gaussian_splats import (GaussianSplatsSpecificationsCreate,
-                                                            GaussianSplatsSpecifications)
-from reality_capture.specifications.eval_o2d import (EvalO2DSpecificationsCreate, EvalO2DSpecifications)
-from reality_capture.specifications.eval_o3d import (EvalO3DSpecificationsCreate, EvalO3DSpecifications)
-from reality_capture.specifications.eval_s2d import (EvalS2DSpecificationsCreate, EvalS2DSpecifications)
-from reality_capture.specifications.eval_s3d import (EvalS3DSpecificationsCreate, EvalS3DSpecifications)
-from reality_capture.specifications.eval_sortho import (EvalSOrthoSpecificationsCreate, EvalSOrthoSpecifications)
+from typing import TYPE_CHECKING, Union, Optional, Any
+from reality_capture.service.reality_data import URL
 
+if TYPE_CHECKING:
+    from reality_capture.specifications.calibration import CalibrationSpecifications, CalibrationSpecificationsCreate
+    from reality_capture.specifications.change_detection import (ChangeDetectionSpecifications,
+                                                                 ChangeDetectionSpecificationsCreate)
+    from reality_capture.specifications.constraints import (ConstraintsSpecificationsCreate,
+                                                            ConstraintsSpecifications)
+    from reality_capture.specifications.fill_image_properties import (FillImagePropertiesSpecificationsCreate,
+                                                                      FillImagePropertiesSpecifications)
+    from reality_capture.specifications.import_point_cloud import ImportPCSpecifications, ImportPCSpecificationsCreate
+    from reality_capture.specifications.objects2d import Objects2DSpecifications, Objects2DSpecificationsCreate
+    from reality_capture.specifications.production import ProductionSpecifications, ProductionSpecificationsCreate
+    from reality_capture.specifications.reconstruction import (ReconstructionSpecifications,
+                                                               ReconstructionSpecificationsCreate)
+    from reality_capture.specifications.segmentation2d import (Segmentation2DSpecifications,
+                                                               Segmentation2DSpecificationsCreate)
+    from reality_capture.specifications.segmentation3d import (Segmentation3DSpecifications,
+                                                               Segmentation3DSpecificationsCreate)
+    from reality_capture.specifications.segmentation_orthophoto import (SegmentationOrthophotoSpecifications,
+                                                                        SegmentationOrthophotoSpecificationsCreate)
+    from reality_capture.specifications.tiling import TilingSpecifications, TilingSpecificationsCreate
+    from reality_capture.specifications.touchup import (TouchUpImportSpecifications, TouchUpImportSpecificationsCreate,
+                                                        TouchUpExportSpecifications, TouchUpExportSpecificationsCreate)
+    from reality_capture.specifications.water_constraints import (WaterConstraintsSpecifications,
+                                                                  WaterConstraintsSpecificationsCreate)
+    """from reality_capture.specifications.point_cloud_conversion import (PointCloudConversionSpecificationsCreate,
+                                                                       PointCloudConversionSpecifications)"""
+    from reality_capture.specifications.training import (TrainingS3DSpecificationsCreate, TrainingS3DSpecifications)
+    from reality_capture.specifications.gaussian_splats import (GaussianSplatsSpecificationsCreate,
+                                                                GaussianSplatsSpecifications)
+    from reality_capture.specifications.eval_o2d import (EvalO2DSpecificationsCreate, EvalO2DSpecifications)
+    from reality_capture.specifications.eval_o3d import (EvalO3DSpecificationsCreate, EvalO3DSpecifications)
+    from reality_capture.specifications.eval_s2d import (EvalS2DSpecificationsCreate, EvalS2DSpecifications)
+    from reality_capture.specifications.eval_s3d import (EvalS3DSpecificationsCreate, EvalS3DSpecifications)
+    from reality_capture.specifications.eval_sortho import (EvalSOrthoSpecificationsCreate, EvalSOrthoSpecifications)
+
+    _SpecificationsCreate = Union[CalibrationSpecificationsCreate, ChangeDetectionSpecificationsCreate,
+                                  ConstraintsSpecificationsCreate, # PointCloudConversionSpecifications,
+                                  EvalO2DSpecificationsCreate, EvalO3DSpecificationsCreate,
+                                  EvalS2DSpecificationsCreate, EvalS3DSpecificationsCreate,
+                                  EvalSOrthoSpecificationsCreate, FillImagePropertiesSpecificationsCreate,
+                                  GaussianSplatsSpecificationsCreate, ImportPCSpecificationsCreate,
+                                  Objects2DSpecificationsCreate, ProductionSpecificationsCreate,
+                                  ReconstructionSpecificationsCreate, Segmentation2DSpecificationsCreate,
+                                  Segmentation3DSpecificationsCreate, SegmentationOrthophotoSpecificationsCreate,
+                                  TilingSpecificationsCreate, TouchUpExportSpecificationsCreate,
+                                  TouchUpImportSpecificationsCreate, WaterConstraintsSpecificationsCreate,
+                                  TrainingS3DSpecificationsCreate]
+    _Specifications = Union[CalibrationSpecifications, ChangeDetectionSpecifications,
+                            ConstraintsSpecifications, # PointCloudConversionSpecifications,
+                            EvalO2DSpecifications, EvalO3DSpecifications,
+                            EvalS2DSpecifications, EvalS3DSpecifications,
+                            EvalSOrthoSpecifications, FillImagePropertiesSpecifications,
+                            GaussianSplatsSpecifications, ImportPCSpecifications,
+                            Objects2DSpecifications, ProductionSpecifications,
+                            ReconstructionSpecifications, Segmentation2DSpecifications,
+                            Segmentation3DSpecifications, SegmentationOrthophotoSpecifications,
+                            TilingSpecifications, TouchUpExportSpecifications,
+                            TouchUpImportSpecifications, WaterConstraintsSpecifications,
+                            TrainingS3DSpecifications]
 
-from reality_capture.service.reality_data import URL
 
 class JobType(Enum):
     CALIBRATION = "Calibration"
@@ -94,27 +122,116 @@ class JobState(Enum):
     CANCELLED = "Cancelled"
 
 
-class JobCreate(BaseModel):
+TERMINAL_STATES = (JobState.SUCCESS, JobState.FAILED, JobState.CANCELLED)
+
+
+# Module and class of the specifications of each job type, the creation model is the same class with "Create"
+_SPECIFICATIONS_CLASSES: dict[JobType, tuple[str, str]] = {
+    JobType.CALIBRATION: ("calibration", "CalibrationSpecifications"),
+    JobType.CHANGE_DETECTION: ("change_detection", "ChangeDetectionSpecifications"),
+    JobType.CONSTRAINTS: ("constraints", "ConstraintsSpecifications"),
+    JobType.EVAL_O2D: ("eval_o2d", "EvalO2DSpecifications"),
+    JobType.EVAL_O3D: ("eval_o3d", "EvalO3DSpecifications"),
+    JobType.EVAL_S2D: ("eval_s2d", "EvalS2DSpecifications"),
+    JobType.EVAL_S3D: ("eval_s3d", "EvalS3DSpecifications"),
+    JobType.EVAL_SORTHO: ("eval_sortho", "EvalSOrthoSpecifications"),
+    JobType.FILL_IMAGE_PROPERTIES: ("fill_image_properties", "FillImagePropertiesSpecifications"),
+    JobType.GAUSSIAN_SPLATS: ("gaussian_splats", "GaussianSplatsSpecifications"),
+    JobType.IMPORT_POINT_CLOUD: ("import_point_cloud", "ImportPCSpecifications"),
+    JobType.OBJECTS_2D: ("objects2d", "Objects2DSpecifications"),
+    JobType.PRODUCTION: ("production", "ProductionSpecifications"),
+    JobType.RECONSTRUCTION: ("reconstruction", "ReconstructionSpecifications"),
+    JobType.SEGMENTATION_2D: ("segmentation2d", "Segmentation2DSpecifications"),
+    JobType.SEGMENTATION_3D: ("segmentation3d", "Segmentation3DSpecifications"),
+    JobType.SEGMENTATION_ORTHOPHOTO: ("segmentation_orthophoto", "SegmentationOrthophotoSpecifications"),
+    JobType.TILING: ("tiling", "TilingSpecifications"),
+    JobType.TOUCH_UP_EXPORT: ("touchup", "TouchUpExportSpecifications"),
+    JobType.TOUCH_UP_IMPORT: ("touchup", "TouchUpImportSpecifications"),
+    JobType.WATER_CONSTRAINTS: ("water_constraints", "WaterConstraintsSpecifications"),
+    JobType.TRAINING_S3D: ("training", "TrainingS3DSpecifications"),
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _get_specifications_model(job_type: Optional[JobType], create: bool = False) -> Optional[type[BaseModel]]:
+    """
+    Return the specifications model of a job type, importing its module on first use.
+
+    :param job_type: Type of the job.
+    :param create: True for the model used to create a job, False for the model of the jobs returned by the service.
+    :return: The specifications model, None if the job type is not supported.
+    """
+    entry = _SPECIFICATIONS_CLASSES.get(job_type)
+    if entry is None:
+        return None
+    module = importlib.import_module(f"reality_capture.specifications.{entry[0]}")
+    return getattr(module, entry[1] + "Create" if create else entry[1])
+
+
+def _validate_specifications(raw_specs: Any, validation_info: ValidationInfo, create: bool) -> BaseModel:
+    job_type = validation_info.data.get('type')
+    model = _get_specifications_model(job_type, create)
+    if model is None:
+        raise ValueError(f"Unsupported job type: {job_type}")
+    return model.model_validate(raw_specs)
+
+
+@functools.lru_cache(maxsize=None)
+def _define_specifications_unions() -> None:
+    """
+    Define the unions of specifications models annotating Job and JobCreate, importing all specification modules.
+    """
+    global _Specifications, _SpecificationsCreate
+    job_types = list(_SPECIFICATIONS_CLASSES)
+    _Specifications = Union[tuple(_get_specifications_model(jt) for jt in job_types)]
+    _SpecificationsCreate = Union[tuple(_get_specifications_model(jt, create=True) for jt in job_types)]
+
+
+class _SpecificationsModel(BaseModel):
+    """
+    Model depending on the specifications unions. They are forward references, so that importing this module does not
+    import the specification modules, and the model is built on first use, with the unions defined by its rebuild.
+    The unions give the schema and the serialization, the specifications are validated against the model of the job
+    type by a wrap validator that does not call the union validator.
+    """
+
+    @classmethod
+    def model_rebuild(cls, *, force: bool = False, raise_errors: bool = True, _parent_namespace_depth: int = 2,
+                      _types_namespace: Any = None) -> Optional[bool]:
+        _define_specifications_unions()
+        # The unions are globals of this module, whatever the namespace of the caller
+        return super().model_rebuild(force=force, raise_errors=raise_errors,
+                                     _types_namespace=globals() if _types_namespace is None else _types_namespace)
+
+
+def __getattr__(name: str) -> Any:
+    # The specifications classes used to be imported by this module, they are still reachable from it
+    for job_type, (_, class_name) in _SPECIFICATIONS_CLASSES.items():
+        if name in (class_name, class_name + "Create"):
+            return _get_specifications_model(job_type, name != class_name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class JobCreate(_SpecificationsModel):
     name: Optional[str] = Field(None, description="Displayable job name.", min_length=3)
     type: JobType = Field(description="Type of job.")
     # TODO : PointCloudConversionSpecificationsCreate,
-    specifications: Union[CalibrationSpecificationsCreate, ChangeDetectionSpecificationsCreate,
-                        ConstraintsSpecificationsCreate, # PointCloudConversionSpecifications,
-                        EvalO2DSpecificationsCreate, EvalO3DSpecificationsCreate,
-                        EvalS2DSpecificationsCreate, EvalS3DSpecificationsCreate,
-                        EvalSOrthoSpecificationsCreate, FillImagePropertiesSpecificationsCreate,
-                        GaussianSplatsSpecificationsCreate, ImportPCSpecificationsCreate,
-                        Objects2DSpecificationsCreate, ProductionSpecificationsCreate,
-                        ReconstructionSpecificationsCreate, Segmentation2DSpecificationsCreate,
-                        Segmentation3DSpecificationsCreate, SegmentationOrthophotoSpecificationsCreate,
-                        TilingSpecificationsCreate, TouchUpExportSpecificationsCreate,
-                        TouchUpImportSpecificationsCreate, WaterConstraintsSpecificationsCreate,
-                        TrainingS3DSpecificationsCreate] = (
+    specifications: "_SpecificationsCreate" = (
         Field(description="Specifications aligned with the job type."))
     itwin_id: str = Field(description="iTwin ID, used by the service for finding "
                                       "input reality data and uploading output data.",
                           alias="iTwinId")
 
+    @classmethod
+    def set_specification_validation_model(cls, raw_specs: Any, validation_info: ValidationInfo):
+        return _validate_specifications(raw_specs, validation_info, create=True)
+
+    @field_validator("specifications", mode="wrap")
+    @classmethod
+    def _validate_specifications_field(cls, raw_specs: Any, _: ValidatorFunctionWrapHandler,
+                                       validation_info: ValidationInfo):
+        return cls.set_specification_validation_model(raw_specs, validation_info)
+
     def get_appropriate_service(self) -> Service:
         """
         Return the appropriate service for such a job.
@@ -132,7 +249,7 @@ class Execution(BaseModel):
                                              alias="processingUnits")
 
 
-class Job(BaseModel):
+class Job(_SpecificationsModel):
     id: str = Field(description="Job unique identifier.")
     name: Optional[str] = Field(None, description="Displayable job name.", min_length=3)
     type: JobType = Field(description="Type of job.")
@@ -143,75 +260,18 @@ class Job(BaseModel):
     execution_info: Execution = Field(description="Known execution information for the job.", alias="executionInfo")
     user_id: str = Field(description="Identifier of the user that created the job.", alias="userId")
     # TODO : add PointCloudConversionSpecifications
-    specifications: Union[CalibrationSpecifications, ChangeDetectionSpecifications,
-                        ConstraintsSpecifications, # PointCloudConversionSpecifications,
-                        EvalO2DSpecifications, EvalO3DSpecifications,
-                        EvalS2DSpecifications, EvalS3DSpecifications,
-                        EvalSOrthoSpecifications, FillImagePropertiesSpecifications, 
-                        GaussianSplatsSpecifications, ImportPCSpecifications,
-                        Objects2DSpecifications, ProductionSpecifications,
-                        ReconstructionSpecifications, Segmentation2DSpecifications,
-                        Segmentation3DSpecifications, SegmentationOrthophotoSpecifications,
-                        TilingSpecifications, TouchUpExportSpecifications,
-                        TouchUpImportSpecifications, WaterConstraintsSpecifications,
-                        TrainingS3DSpecifications] = (
+    specifications: "_Specifications" = (
         Field(description="Specifications aligned with the job type."))
 
-    @field_validator("specifications", mode="plain")
     @classmethod
     def set_specification_validation_model(cls, raw_dict: dict[str, Any], validation_info: ValidationInfo):
-        job_type = validation_info.data['type']
-
-        specifications = None
-
-        if job_type == JobType.CALIBRATION:
-            specifications = CalibrationSpecifications(**raw_dict)
-        elif job_type == JobType.CHANGE_DETECTION:
-            specifications = ChangeDetectionSpecifications(**raw_dict)
-        elif job_type == JobType.CONSTRAINTS:
-            specifications = ConstraintsSpecifications(**raw_dict)
-        elif job_type == JobType.EVAL_O2D:
-           specifications = EvalO2DSpecifications(**raw_dict)
-        elif job_type == JobType.EVAL_O3D:
-           specifications = EvalO3DSpecifications(**raw_dict)
-        elif job_type == JobType.EVAL_S2D:
-           specifications = EvalS2DSpecifications(**raw_dict)
-        elif job_type == JobType.EVAL_S3D:
-           specifications = EvalS3DSpecifications(**raw_dict)
-        elif job_type == JobType.EVAL_SORTHO:
-           specifications = EvalSOrthoSpecifications(**raw_dict)
-        elif job_type == JobType.FILL_IMAGE_PROPERTIES:
-            specifications = FillImagePropertiesSpecifications(**raw_dict)
-        elif job_type == JobType.GAUSSIAN_SPLATS:
-            specifications = GaussianSplatsSpecifications(**raw_dict)
-        elif job_type == JobType.IMPORT_POINT_CLOUD:
-            specifications = ImportPCSpecifications(**raw_dict)
-        elif job_type == JobType.OBJECTS_2D:
-            specifications = Objects2DSpecifications(**raw_dict)
-        elif job_type == JobType.PRODUCTION:
-            specifications = ProductionSpecifications(**raw_dict)
-        elif job_type == JobType.RECONSTRUCTION:
-            specifications = ReconstructionSpecifications(**raw_dict)
-        elif job_type == JobType.SEGMENTATION_2D:
-           specifications = Segmentation2DSpecifications(**raw_dict)
-        elif job_type == JobType.SEGMENTATION_3D:
-           specifications = Segmentation3DSpecifications(**raw_dict)
-        elif job_type == JobType.SEGMENTATION_ORTHOPHOTO:
-           specifications = SegmentationOrthophotoSpecifications(**raw_dict)
-        elif job_type == JobType.TILING:
-            specifications = TilingSpecifications(**raw_dict)
-        elif job_type == JobType.TOUCH_UP_EXPORT:
-            specifications = TouchUpExportSpecifications(**raw_dict)
-        elif job_type == JobType.TOUCH_UP_IMPORT:
-            specifications = TouchUpImportSpecifications(**raw_dict)
-        elif job_type == JobType.WATER_CONSTRAINTS:
-            specifications = WaterConstraintsSpecifications(**raw_dict)
-        elif job_type == JobType.TRAINING_S3D:
-            specifications = TrainingS3DSpecifications(**raw_dict)
-        else:
-            raise ValueError(f"Unsupported job type: {job_type}")
-
-        return specifications
+        return _validate_specifications(raw_dict, validation_info, create=False)
+
+    @field_validator("specifications", mode="wrap")
+    @classmethod
+    def _validate_specifications_field(cls, raw_dict: Any, _: ValidatorFunctionWrapHandler,
+                                       validation_info: ValidationInfo):
+        return cls.set_specification_validation_model(raw_dict, validation_info)
 
     def get_appropriate_service(self) -> Service:
         """
@@ -222,7 +282,7 @@ class Job(BaseModel):
         return _get_appropriate_service(self.type)
 
 
-class JobResponse(BaseModel):
+class JobResponse(_SpecificationsModel):
     job: Job = Field(description="Complete job information.")
 
 
@@ -230,7 +290,7 @@ class NextPageLink(BaseModel):
     next: URL = Field(description="URL for getting the next page of results.")
 
 
-class Jobs(BaseModel):
+class Jobs(_SpecificationsModel):
     jobs: list[Job] = Field(description="List of jobs.")
     links: Optional[NextPageLink] = Field(default=None, alias="_links",
                                           description="Contains the hyperlink to the next page of results, "
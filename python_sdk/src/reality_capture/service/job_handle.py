@@ -0,0 +1,322 @@
+import threading
+import time
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Optional
+from reality_capture.service.error import DetailedErrorResponse
+from reality_capture.service.job import Job, JobState, JobType, Progress, TERMINAL_STATES, _get_appropriate_service
+from reality_capture.service.response import Response
+
+if TYPE_CHECKING:
+    import asyncio
+
+_LONG_JOB_TYPES = (JobType.CALIBRATION, JobType.GAUSSIAN_SPLATS, JobType.PRODUCTION, JobType.RECONSTRUCTION,
+                   JobType.TRAINING_S3D)
+_SHORT_JOB_TYPES = (JobType.CONSTRAINTS, JobType.FILL_IMAGE_PROPERTIES, JobType.IMPORT_POINT_CLOUD, JobType.TILING,
+                    JobType.TOUCH_UP_EXPORT, JobType.TOUCH_UP_IMPORT, JobType.WATER_CONSTRAINTS)
+
+
+class _WaitPolicy:
+    """
+    Poll scheduling shared by the synchronous and asynchronous waits.
+
+    Before any progress is observed, the interval depends on the job type and grows while nothing moves. Once the
+    percentage moves, the interval is a fraction of the estimated remaining time, so polls get closer near the end.
+
+    The request limit counts every call to the service. The cancellation made on timeout is reserved up front, and the
+    last poll retrieves the whole job, so that a finished job never needs one more request.
+    """
+
+    MIN_INTERVAL = 2.0
+    MAX_INTERVAL = 120.0
+    _QUEUED_FACTOR = 3.0
+    _GROWTH = 1.5
+    _POLLS_BEFORE_END = 4
+
+    def __init__(self, job_type: JobType, timeout: Optional[float], max_requests: Optional[int],
+                 min_interval: float, max_interval: float, cancel_on_timeout: bool = False) -> None:
+        self._min_interval = min_interval
+        self._max_interval = max(max_interval, min_interval)
+        self._interval = self._get_type_interval(job_type)
+        now = time.monotonic()
+        self._deadline = now + timeout if timeout is not None else None
+        self._max_requests = max_requests
+        self._requests = 1 if cancel_on_timeout else 0
+        self._last_sample = None
+        self._rate = None
+
+    def _get_type_interval(self, job_type: JobType) -> float:
+        if job_type in _LONG_JOB_TYPES:
+            interval = 30.0
+        elif job_type in _SHORT_JOB_TYPES:
+            interval = 5.0
+        else:
+            interval = 10.0
+        return self._clamp(interval)
+
+    def _clamp(self, interval: float) -> float:
+        return min(max(interval, self._min_interval), self._max_interval)
+
+    def on_request(self) -> None:
+        self._requests += 1
+
+    def is_last_request(self) -> bool:
+        return self._max_requests is not None and self._requests + 1 >= self._max_requests
+
+    def get_error(self) -> Optional[Response]:
+        if self._deadline is not None and time.monotonic() >= self._deadline:
+            de = DetailedErrorResponse(error={"code": "JobWaitTimeout",
+                                              "message": "Job did not finish before the timeout."})
+            return Response(408, de, None)
+        if self._max_requests is not None and self._requests >= self._max_requests:
+            de = DetailedErrorResponse(error={"code": "JobWaitRequestLimit",
+                                              "message": f"Job did not finish within {self._max_requests} requests."})
+            return Response(408, de, None)
+        return None
+
+    def get_next_interval(self, progress: Progress) -> float:
+        now = time.monotonic()
+        if self._last_sample is not None and progress.percentage > self._last_sample[1]:
+            rate = (progress.percentage - self._last_sample[1]) / max(now - self._last_sample[0], 1e-6)
+            # Smooth the rate, progress is often reported in steps
+            self._rate = rate if self._rate is None else 0.5 * self._rate + 0.5 * rate
+        if self._last_sample is None or progress.percentage != self._last_sample[1]:
+            self._last_sample = (now, progress.percentage)
+
+        if progress.state == JobState.QUEUED:
+            interval = self._interval * self._QUEUED_FACTOR
+        elif self._rate:
+            interval = (100.0 - progress.percentage) / self._rate / self._POLLS_BEFORE_END
+        else:
+            interval = self._interval
+            self._interval = self._clamp(self._interval * self._GROWTH)
+        return self._bound(interval)
+
+    def get_retry_interval(self) -> float:
+        interval = self._interval
+        self._interval = self._clamp(self._interval * self._GROWTH)
+        return self._bound(interval)
+
+    def _bound(self, interval: float) -> float:
+        # Never sleep past the deadline
+        interval = self._clamp(interval)
+        if self._deadline is not None:
+            interval = min(interval, max(self._deadline - time.monotonic(), 0.0))
+        return interval
+
+    @staticmethod
+    def is_transient(response: Response) -> bool:
+        return response.status_code == 429 or response.status_code >= 500
+
+
+class JobHandle:
+    """
+    Handle on a submitted job, to wait for its end or cancel it.
+    """
+
+    def __init__(self, service, job_id: str, job_type: JobType, min_interval: float = _WaitPolicy.MIN_INTERVAL,
+                 max_interval: float = _WaitPolicy.MAX_INTERVAL) -> None:
+        """
+        Constructor method
+
+        :param service: RealityCaptureService used to poll the job.
+        :param job_id: Id of the job.
+        :param job_type: Type of the job, used to find its service and its initial poll interval.
+        :param min_interval: Minimum time in seconds between two polls.
+        :param max_interval: Maximum time in seconds between two polls.
+        """
+        self._service = service
+        self._job_id = job_id
+        self._job_type = job_type
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._wakeup = threading.Event()
+
+    @property
+    def job_id(self) -> str:
+        return self._job_id
+
+    @property
+    def job_type(self) -> JobType:
+        return self._job_type
+
+    def progress(self) -> Response[Progress]:
+        """
+        Retrieve the current progress of the job.
+
+        :return: A Response[Progress] containing either the job progress or the error from the service.
+        """
+        return self._service.get_job_progress(self._job_id, _get_appropriate_service(self._job_type))
+
+    def cancel(self) -> Response[Job]:
+        """
+        Cancel the job. A pending ``result`` returns once the job is cancelled.
+
+        :return: A Response[Job] containing either the job information or the error from the service.
+        """
+        r = self._service.cancel_job(self._job_id, _get_appropriate_service(self._job_type))
+        self._wakeup.set()
+        return r
+
+    def result(self, timeout: Optional[float] = None, max_requests: Optional[int] = None,
+               cancel_on_timeout: bool = False) -> Response[Job]:
+        """
+        Wait for the end of the job. The poll interval adapts to the job type and to the progress rate.
+
+        :param timeout: Maximum time to wait in seconds, no limit by default.
+        :param max_requests: Maximum number of requests to the service, including the final job retrieval and the
+         cancellation, no limit by default.
+        :param cancel_on_timeout: If True, cancel the job when the timeout or the request limit is reached.
+        :return: A Response[Job] containing either the job in its final state, the error from the service, or a 408
+         error if the timeout or the request limit was reached.
+        """
+        service = _get_appropriate_service(self._job_type)
+        policy = _WaitPolicy(self._job_type, timeout, max_requests, self._min_interval, self._max_interval,
+                             cancel_on_timeout)
+        while True:
+            error = policy.get_error()
+            if error is not None:
+                if cancel_on_timeout:
+                    self._service.cancel_job(self._job_id, service)
+                return error
+            if policy.is_last_request():
+                # No request left after this one: poll the job itself, and stop right away if it is not finished
+                r = self._service.get_job(self._job_id, service)
+                policy.on_request()
+                if r.is_error():
+                    if not policy.is_transient(r):
+                        return r
+                elif r.value.state in TERMINAL_STATES:
+                    return r
+                continue
+            r = self._service.get_job_progress(self._job_id, service)
+            policy.on_request()
+            if r.is_error():
+                if not policy.is_transient(r):
+                    return r
+                interval = policy.get_retry_interval()
+            elif r.value.state in TERMINAL_STATES:
+                return self._service.get_job(self._job_id, service)
+            else:
+                interval = policy.get_next_interval(r.value)
+            self._wakeup.wait(interval)
+            self._wakeup.clear()
+
+    def future(self, timeout: Optional[float] = None, max_requests: Optional[int] = None,
+               cancel_on_timeout: bool = False) -> Future:
+        """
+        Wait for the end of the job on a background thread.
+
+        :param timeout: Maximum time to wait in seconds, no limit by default.
+        :param max_requests: Maximum number of requests to the service, including the final job retrieval and the
+         cancellation, no limit by default.
+        :param cancel_on_timeout: If True, cancel the job when the timeout or the request limit is reached.
+        :return: A future resolved with the Response[Job] returned by ``result``.
+        """
+        future = Future()
+
+        def _wait():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(self.result(timeout, max_requests, cancel_on_timeout))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=_wait, name=f"JobHandle-{self._job_id}", daemon=True).start()
+        return future
+
+
+class AsyncJobHandle(JobHandle):
+    """
+    Asynchronous version of :class:`JobHandle`, returned by the asynchronous service. Its methods are coroutines.
+    """
+
+    def __init__(self, service, job_id: str, job_type: JobType, min_interval: float = _WaitPolicy.MIN_INTERVAL,
+                 max_interval: float = _WaitPolicy.MAX_INTERVAL) -> None:
+        """
+        Constructor method
+
+        :param service: AsyncRealityCaptureService used to poll the job.
+        :param job_id: Id of the job.
+        :param job_type: Type of the job, used to find its service and its initial poll interval.
+        :param min_interval: Minimum time in seconds between two polls.
+        :param max_interval: Maximum time in seconds between two polls.
+        """
+        super().__init__(service, job_id, job_type, min_interval, max_interval)
+        # Created by the first wait, in the event loop running it
+        self._wakeup = None
+
+    async def progress(self) -> Response[Progress]:
+        """
+        Coroutine version of :meth:`JobHandle.progress`.
+        """
+        return await self._service.get_job_progress(self._job_id, _get_appropriate_service(self._job_type))
+
+    async def cancel(self) -> Response[Job]:
+        """
+        Coroutine version of :meth:`JobHandle.cancel`.
+        """
+        r = await self._service.cancel_job(self._job_id, _get_appropriate_service(self._job_type))
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return r
+
+    async def _sleep(self, interval: float) -> None:
+        # Imported here so that the synchronous service does not load asyncio
+        import asyncio
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def result(self, timeout: Optional[float] = None, max_requests: Optional[int] = None,
+                     cancel_on_timeout: bool = False) -> Response[Job]:
+        """
+        Coroutine version of :meth:`JobHandle.result`. Cancelling the task stops waiting, but not the job.
+        """
+        service = _get_appropriate_service(self._job_type)
+        policy = _WaitPolicy(self._job_type, timeout, max_requests, self._min_interval, self._max_interval,
+                             cancel_on_timeout)
+        while True:
+            error = policy.get_error()
+            if error is not None:
+                if cancel_on_timeout:
+                    await self._service.cancel_job(self._job_id, service)
+                return error
+            if policy.is_last_request():
+                r = await self._service.get_job(self._job_id, service)
+                policy.on_request()
+                if r.is_error():
+                    if not policy.is_transient(r):
+                        return r
+                elif r.value.state in TERMINAL_STATES:
+                    return r
+                continue
+            r = await self._service.get_job_progress(self._job_id, service)
+            policy.on_request()
+            if r.is_error():
+                if not policy.is_transient(r):
+                    return r
+                interval = policy.get_retry_interval()
+            elif r.value.state in TERMINAL_STATES:
+                return await self._service.get_job(self._job_id, service)
+            else:
+                interval = policy.get_next_interval(r.value)
+            await self._sleep(interval)
+
+    def future(self, timeout: Optional[float] = None, max_requests: Optional[int] = None,
+               cancel_on_timeout: bool = False) -> "asyncio.Task":
+        """
+        Wait for the end of the job in a task of the running event loop.
+
+        :param timeout: Maximum time to wait in seconds, no limit by default.
+        :param max_requests: Maximum number of requests to the service, including the final job retrieval and the
+         cancellation, no limit by default.
+        :param cancel_on_timeout: If True, cancel the job when the timeout or the request limit is reached.
+        :return: A task resolved with the Response[Job] returned by ``result``.
+        """
+        import asyncio
+        return asyncio.ensure_future(self.result(timeout, max_requests, cancel_on_timeout))
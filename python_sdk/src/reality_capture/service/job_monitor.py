@@ -0,0 +1,238 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+from reality_capture.service.job import Job, JobState, Service, TERMINAL_STATES
+from reality_capture.service.response import Response
+from reality_capture.service.service import RealityCaptureService
+
+_logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _WatchedJob:
+    job_id: str
+    service: Service
+    callback: Optional[Callable[[Job, Optional[JobState]], None]]
+    future: Future = field(default_factory=Future)
+    state: Optional[JobState] = None
+    interval: float = 0.0
+    next_poll: float = 0.0
+
+
+class JobMonitor:
+    """
+    Track the state of many jobs from a single scheduler.
+
+    Jobs due for a poll are grouped by service and fetched with ``get_jobs`` and a filter over their ids, so
+    tracking N jobs costs about N / batch_size requests per poll instead of N. Each job is polled at an interval
+    adapted to its state, which grows while the state does not change. When a batched request fails, its jobs are
+    polled again later with a growing delay rather than one by one.
+    """
+
+    DEFAULT_POLL_INTERVALS = {
+        JobState.QUEUED: 30.0,
+        JobState.ACTIVE: 10.0,
+        JobState.TERMINATING_ON_CANCEL: 5.0,
+        JobState.TERMINATING_ON_FAILURE: 5.0,
+    }
+    "Default poll interval in seconds for each non-terminal state."
+
+    def __init__(self, service: RealityCaptureService, poll_intervals: Optional[dict[JobState, float]] = None,
+                 batch_size: int = 50, max_backoff: float = 4.0) -> None:
+        """
+        Constructor method
+
+        :param service: Service used to poll the jobs.
+        :param poll_intervals: Poll interval in seconds for each non-terminal state, merged with
+         ``DEFAULT_POLL_INTERVALS``.
+        :param batch_size: Maximum number of jobs fetched by a single request, between 2 and 1000.
+        :param max_backoff: Maximum factor applied to the poll interval of a job whose state does not change.
+        """
+        self._service = service
+        self._poll_intervals = {**self.DEFAULT_POLL_INTERVALS, **(poll_intervals or {})}
+        self._batch_size = max(min(batch_size, 1000), 2)
+        self._max_backoff = max(max_backoff, 1.0)
+        self._jobs: dict[str, _WatchedJob] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def __enter__(self) -> "JobMonitor":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    def watch(self, job_id: str, service: Service,
+              callback: Optional[Callable[[Job, Optional[JobState]], None]] = None) -> Future:
+        """
+        Start tracking a job.
+
+        :param job_id: Id of the job to track.
+        :param service: Service of the job.
+        :param callback: Optional function called with the job and its previous state, None on the first poll, each
+         time the job changes state. It is called from the monitor thread.
+        :return: A future resolved with a Response[Job] once the job reaches a terminal state, or with the error
+         response if the job cannot be found. Cancelling the future stops tracking the job.
+        """
+        watched = _WatchedJob(job_id, service, callback)
+        with self._lock:
+            self._jobs[job_id] = watched
+        self._wakeup.set()
+        return watched.future
+
+    def unwatch(self, job_id: str) -> None:
+        """
+        Stop tracking a job. Its future is cancelled.
+
+        :param job_id: Id of the job to stop tracking.
+        """
+        with self._lock:
+            watched = self._jobs.pop(job_id, None)
+        if watched is not None:
+            watched.future.cancel()
+
+    def watched_jobs(self) -> list[str]:
+        """
+        Return the ids of the jobs currently tracked.
+
+        :return: List of job ids.
+        """
+        with self._lock:
+            return list(self._jobs.keys())
+
+    def start(self) -> None:
+        """
+        Start polling the tracked jobs on a background thread.
+        """
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="JobMonitor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the background thread. Tracked jobs are kept and their futures stay pending.
+        """
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._wakeup.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            # Cleared before polling, so that a job watched during the poll wakes the next wait up
+            self._wakeup.clear()
+            try:
+                self.poll(time.monotonic())
+            except Exception:
+                _logger.exception("Job monitor poll failed")
+            with self._lock:
+                next_poll = min((w.next_poll for w in self._jobs.values()), default=None)
+            timeout = None if next_poll is None else max(0.0, next_poll - time.monotonic())
+            self._wakeup.wait(timeout)
+
+    @staticmethod
+    def _get_filter(job_ids: list[str]) -> str:
+        return "id in (" + ", ".join(f"'{job_id}'" for job_id in job_ids) + ")"
+
+    def _fetch_jobs(self, service: Service, job_ids: list[str]) -> Response[dict[str, Job]]:
+        jobs = {}
+        continuation_token = ""
+        while True:
+            r = self._service.get_jobs(service, self._get_filter(job_ids), top=len(job_ids),
+                                       continuation_token=continuation_token)
+            if r.is_error():
+                return Response(r.status_code, r.error, None)
+            jobs.update((job.id, job) for job in r.value.jobs)
+            continuation_token = r.value.get_continuation_token()
+            if not continuation_token:
+                return Response(200, None, jobs)
+
+    def poll(self, now: Optional[float] = None) -> int:
+        """
+        Poll the jobs that are due, fire their callbacks and resolve the futures of the finished ones. This is what
+        the background thread runs, it can also be called directly instead of starting it.
+
+        :param now: Current value of ``time.monotonic()``, defaults to the actual one.
+        :return: Number of jobs polled.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            for job_id in [job_id for job_id, w in self._jobs.items() if w.future.cancelled()]:
+                del self._jobs[job_id]
+            due = [w for w in self._jobs.values() if w.next_poll <= now]
+        by_service = {}
+        for watched in due:
+            by_service.setdefault(watched.service, []).append(watched)
+        for service, watched_jobs in by_service.items():
+            for i in range(0, len(watched_jobs), self._batch_size):
+                batch = watched_jobs[i:i + self._batch_size]
+                r = self._fetch_jobs(service, [w.job_id for w in batch])
+                if r.is_error():
+                    # Polling the jobs one by one would only add load to a throttled or failing service: this batch
+                    # and the next ones of the service are retried later
+                    for watched in watched_jobs[i:]:
+                        self._retry_later(watched, now)
+                    break
+                jobs = r.value
+                for watched in batch:
+                    job = jobs.get(watched.job_id)
+                    if job is None:
+                        # Not returned by a successful batched query: fall back on the job itself
+                        r = self._service.get_job(watched.job_id, service)
+                        if r.is_error():
+                            self._on_error(watched, r, now)
+                            continue
+                        job = r.value
+                    self._on_job(watched, job, now)
+        return len(due)
+
+    def _get_interval(self, state: JobState) -> float:
+        return self._poll_intervals.get(state, self._poll_intervals[JobState.ACTIVE])
+
+    def _on_job(self, watched: _WatchedJob, job: Job, now: float) -> None:
+        if job.state != watched.state:
+            previous = watched.state
+            watched.state = job.state
+            watched.interval = self._get_interval(job.state)
+            if watched.callback is not None:
+                try:
+                    watched.callback(job, previous)
+                except Exception:
+                    _logger.exception("Job monitor callback failed for job %s", watched.job_id)
+        else:
+            watched.interval = min(watched.interval * 1.5, self._get_interval(job.state) * self._max_backoff)
+        watched.next_poll = now + watched.interval
+        if job.state in TERMINAL_STATES:
+            self._finish(watched, Response(200, None, job))
+
+    def _on_error(self, watched: _WatchedJob, response: Response, now: float) -> None:
+        if response.status_code == 404:
+            self._finish(watched, response)
+            return
+        self._retry_later(watched, now)
+
+    def _retry_later(self, watched: _WatchedJob, now: float) -> None:
+        # Transient failure: retry later without losing the job, backing off while the failures go on
+        interval = self._get_interval(JobState.ACTIVE)
+        watched.interval = min(max(watched.interval * 2, interval), interval * self._max_backoff)
+        watched.next_poll = now + watched.interval
+
+    def _finish(self, watched: _WatchedJob, response: Response) -> None:
+        with self._lock:
+            if self._jobs.get(watched.job_id) is watched:
+                del self._jobs[watched.job_id]
+        try:
+            watched.future.set_result(response)
+        except InvalidStateError:
+            # Cancelled by the caller in the meantime
+            pass
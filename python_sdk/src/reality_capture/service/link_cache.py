@@ -0,0 +1,166 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Hashable, Optional
+from urllib.parse import parse_qs, parse_qsl, quote, unquote, urlparse, urlsplit, urlunsplit
+from reality_capture.service.response import Response
+
+# Query parameters of the service and user delegation SAS tokens
+_SAS_PARAMETERS = frozenset({"sv", "ss", "srt", "sp", "st", "se", "sip", "spr", "sr", "si", "sig", "sdd", "ses",
+                             "skoid", "sktid", "skt", "ske", "sks", "skv", "saoid", "suoid", "scid", "rscc", "rscd",
+                             "rsce", "rscl", "rsct"})
+
+
+def get_sas_expiry(url: str) -> Optional[float]:
+    """
+    Read the expiry of a SAS url.
+
+    :param url: Container or blob url with a SAS token.
+    :return: The ``se`` parameter of the SAS token as a Unix timestamp, None if the url has no valid expiry.
+    """
+    expiry = parse_qs(urlparse(url).query).get("se")
+    if not expiry:
+        return None
+    try:
+        date = datetime.fromisoformat(expiry[0].replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return date.timestamp()
+
+
+def get_sas_token(url: str) -> str:
+    """
+    Return the query string of a SAS url, that is its SAS token.
+
+    :param url: Container or blob url with a SAS token.
+    :return: The SAS token, without the leading ``?``.
+    """
+    return urlparse(url).query
+
+
+def get_sas_parameters(url: str) -> dict[str, str]:
+    """
+    Return the decoded SAS parameters of a url, whatever the way they are encoded.
+
+    :param url: Container or blob url with a SAS token.
+    :return: Value of each SAS parameter of the url, its other query parameters are left out.
+    """
+    return {name: value for name, value in parse_qsl(urlparse(url).query, keep_blank_values=True)
+            if name in _SAS_PARAMETERS}
+
+
+def replace_sas(url: str, sas: dict[str, str]) -> str:
+    """
+    Replace the SAS parameters of a url, keeping its other query parameters as they are.
+
+    :param url: Container or blob url with a SAS token.
+    :param sas: Decoded SAS parameters to put in the url, as returned by :func:`get_sas_parameters`.
+    :return: The url with the new SAS token.
+    """
+    parts = urlsplit(url)
+    query = [parameter for parameter in parts.query.split("&")
+             if parameter and unquote(parameter.split("=", 1)[0]) not in _SAS_PARAMETERS]
+    query.extend(f"{quote(name, safe='')}={quote(value, safe='')}" for name, value in sas.items())
+    return urlunsplit(parts._replace(query="&".join(query)))
+
+
+class LinkCache:
+    """
+    Thread-safe LRU cache of the container links returned by the service (``ContainerDetails`` or
+    ``BucketResponse``).
+
+    A link is reused until it gets within ``refresh_margin`` seconds of the expiry of its SAS token, then the next
+    lookup fetches a new one. Links whose url has no SAS expiry are never cached.
+    """
+
+    def __init__(self, max_size: int = 128, refresh_margin: float = 300.0) -> None:
+        """
+        Constructor method
+
+        :param max_size: Maximum number of links kept, the least recently used ones are evicted first.
+        :param refresh_margin: Time in seconds before the expiry of a link from which it is fetched again.
+        """
+        self._max_size = max_size
+        self._refresh_margin = refresh_margin
+        self._links: OrderedDict[Hashable, tuple[float, Response]] = OrderedDict()
+        self._lock = threading.Lock()
+        # Lock of each key being fetched and its number of users, so that concurrent lookups of an expiring link share
+        # a single request without holding the lookups of the other keys
+        self._fetch_locks: dict[Hashable, list] = {}
+
+    def _get_cached(self, key: Hashable) -> Optional[Response]:
+        with self._lock:
+            entry = self._links.get(key)
+            if entry is None:
+                return None
+            if entry[0] - time.time() <= self._refresh_margin:
+                del self._links[key]
+                return None
+            self._links.move_to_end(key)
+            return entry[1]
+
+    def _store(self, key: Hashable, response: Response) -> None:
+        if response.is_error():
+            return
+        expiry = get_sas_expiry(response.value.links.container_url.href)
+        if expiry is None:
+            return
+        with self._lock:
+            self._links[key] = (expiry, response)
+            self._links.move_to_end(key)
+            while len(self._links) > self._max_size:
+                self._links.popitem(last=False)
+
+    def get(self, key: Hashable, fetch: Callable[[], Response]) -> Response:
+        """
+        Return the link of a key, fetching it if it is missing or about to expire.
+
+        :param key: Key of the link, for instance ``(reality_data_id, itwin_id, access)``.
+        :param fetch: Function requesting the link from the service.
+        :return: The cached response, or the response of ``fetch``.
+        """
+        cached = self._get_cached(key)
+        if cached is not None:
+            return cached
+        with self._lock:
+            fetch_lock = self._fetch_locks.setdefault(key, [threading.Lock(), 0])
+            fetch_lock[1] += 1
+        try:
+            with fetch_lock[0]:
+                cached = self._get_cached(key)
+                if cached is not None:
+                    return cached
+                response = fetch()
+                self._store(key, response)
+                return response
+        finally:
+            with self._lock:
+                fetch_lock[1] -= 1
+                if fetch_lock[1] == 0:
+                    del self._fetch_locks[key]
+
+    async def get_async(self, key: Hashable, fetch: Callable[[], Awaitable[Response]]) -> Response:
+        """
+        Coroutine version of :meth:`get`, taking a coroutine function as ``fetch``.
+        """
+        cached = self._get_cached(key)
+        if cached is not None:
+            return cached
+        response = await fetch()
+        self._store(key, response)
+        return response
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """
+        Drop a link from the cache.
+
+        :param key: Key of the link to drop, None to drop all the links.
+        """
+        with self._lock:
+            if key is None:
+                self._links.clear()
+            else:
+                self._links.pop(key, None)
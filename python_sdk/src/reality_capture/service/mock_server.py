@@ -0,0 +1,893 @@
+"""
+Local stand-in for the Reality Capture APIs, to load test the SDK and the applications built on it without reaching
+the real services.
+
+The server implements the jobs, progress and messages endpoints of Reality Modeling and Reality Analysis, the service
+files, buckets and detectors, the reality data of Reality Management, and an Azure Blob Storage compatible container
+endpoint to which the container urls it returns point. Everything is kept in memory. Jobs go through their states on
+their own, and the latency and throttling of the service can be configured.
+
+It can be started from a script or a test as a context manager::
+
+    with MockServer(MockServerOptions(latency=0.05, rate_limit=50)) as server:
+        service = RealityCaptureService(token_factory, service_url=server.url)
+        ...
+
+or as a standalone process, for instance to load test an application running elsewhere::
+
+    python -m reality_capture.service.mock_server --port 8080 --latency 0.05 --rate-limit 50
+"""
+import argparse
+import base64
+import hashlib
+import http.server
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Optional
+from urllib.parse import parse_qs, quote, unquote, urlencode, urlparse
+from xml.sax.saxutils import escape
+
+
+@dataclass
+class MockServerOptions:
+    """
+    Behavior of a mock server.
+    """
+
+    latency: float = 0.0
+    "Time in seconds added to each API request."
+    latency_jitter: float = 0.0
+    "Maximum random time in seconds added to the latency of each API request."
+    blob_latency: float = 0.0
+    "Time in seconds added to each blob request."
+    rate_limit: Optional[float] = None
+    "Number of API requests accepted per second, the others are answered 429. None for no limit."
+    rate_burst: int = 10
+    "Number of API requests accepted at once before the rate limit applies."
+    throttle_probability: float = 0.0
+    "Probability that an API request is answered 429, on top of the rate limit."
+    blob_throttle_probability: float = 0.0
+    """Probability that a blob request is answered 503. The storage client retries them with its own backoff,
+    which is long."""
+    queued_duration: float = 1.0
+    "Time in seconds a job stays queued."
+    active_duration: float = 5.0
+    "Time in seconds a job stays active, its progress growing linearly."
+    terminating_duration: float = 0.5
+    "Time in seconds a cancelled job stays terminating."
+    failure_probability: float = 0.0
+    "Probability that a job fails at the end of its active state."
+    page_size: int = 100
+    "Number of items per page of the lists, when the request gives none."
+    seed: Optional[int] = None
+    "Seed of the random generator of the jitter, throttling and failures, for reproducible runs."
+
+
+@dataclass
+class MockServerStats:
+    """
+    Counters of a mock server.
+    """
+
+    requests: int = 0
+    "Number of API requests received."
+    throttled: int = 0
+    "Number of API requests answered 429."
+    blob_requests: int = 0
+    "Number of blob requests received, including the throttled ones."
+    bytes_uploaded: int = 0
+    "Number of bytes of blob data received."
+    bytes_downloaded: int = 0
+    "Number of bytes of blob data sent."
+
+
+@dataclass
+class _Blob:
+    data: bytes
+    content_md5: Optional[bytes]
+    last_modified: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    etag: str = field(default_factory=lambda: f'"0x{uuid.uuid4().hex[:16].upper()}"')
+    copy_id: Optional[str] = None
+
+
+@dataclass
+class _Job:
+    service: str
+    payload: dict
+    submitted: float
+    fails: bool
+    cancelled: Optional[float] = None
+
+
+class _ApiError(Exception):
+    def __init__(self, status_code: int, code: str, message: str) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _timestamp(monotonic: float) -> str:
+    # Job times are kept on the monotonic clock, converted to dates when returned
+    wall = time.time() - (time.monotonic() - monotonic)
+    return datetime.fromtimestamp(wall, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+_JOB_FILTER_FIELDS = ("id", "name", "state", "type", "iTwinId")
+_FILTER_CLAUSE = re.compile(r"\s*(\w+)\s+(?:eq\s+'([^']*)'|in\s+\(\s*('[^']*'(?:\s*,\s*'[^']*')*)\s*\))\s*")
+
+
+def _parse_job_filter(text: str) -> list[tuple[str, set]]:
+    """
+    Parse a job filter made of ``field eq 'value'`` and ``field in ('a', 'b')`` clauses joined by ``and``, into the
+    values allowed for each field.
+    """
+    clauses = []
+    position = 0
+    while True:
+        match = _FILTER_CLAUSE.match(text, position)
+        if match is None or match.group(1) not in _JOB_FILTER_FIELDS:
+            raise _ApiError(422, "InvalidJobsRequest", f"Unsupported filter: {text!r}.")
+        values = {match.group(2)} if match.group(3) is None else set(re.findall(r"'([^']*)'", match.group(3)))
+        clauses.append((match.group(1), values))
+        position = match.end()
+        if position == len(text):
+            return clauses
+        if not text.startswith("and ", position):
+            raise _ApiError(422, "InvalidJobsRequest", f"Unsupported filter: {text!r}.")
+        position += len("and ")
+
+
+def _get_page(items: list, query: dict, default_top: int) -> tuple[list, Optional[int]]:
+    top = int(query.get("$top", default_top))
+    start = int(query.get("continuationToken", 0))
+    end = start + top
+    return items[start:end], end if end < len(items) else None
+
+
+class _MockApi:
+    """
+    State and endpoints of the mock server, shared by the threads serving the requests.
+    """
+
+    _ROUTES = [
+        ("GET", r"(?P<service>reality-modeling|reality-analysis)/jobs", "get_jobs"),
+        ("POST", r"(?P<service>reality-modeling|reality-analysis)/jobs", "submit_job"),
+        ("GET", r"(?P<service>reality-modeling|reality-analysis)/jobs/(?P<job_id>[^/]+)", "get_job"),
+        ("DELETE", r"(?P<service>reality-modeling|reality-analysis)/jobs/(?P<job_id>[^/]+)", "cancel_job"),
+        ("GET", r"(?P<service>reality-modeling|reality-analysis)/jobs/(?P<job_id>[^/]+)/progress", "get_progress"),
+        ("GET", r"(?P<service>reality-modeling|reality-analysis)/jobs/(?P<job_id>[^/]+)/messages", "get_messages"),
+        ("GET", r"reality-modeling/files", "get_files"),
+        ("GET", r"reality-modeling/itwins/(?P<itwin_id>[^/]+)/bucket", "get_bucket"),
+        ("GET", r"reality-analysis/detectors", "get_detectors"),
+        ("POST", r"reality-analysis/detectors", "create_detector"),
+        ("GET", r"reality-analysis/detectors/(?P<name>[^/]+)", "get_detector"),
+        ("PATCH", r"reality-analysis/detectors/(?P<name>[^/]+)", "update_detector"),
+        ("DELETE", r"reality-analysis/detectors/(?P<name>[^/]+)", "delete_detector"),
+        ("POST", r"reality-analysis/detectors/(?P<name>[^/]+)/versions", "create_detector_version"),
+        ("DELETE", r"reality-analysis/detectors/(?P<name>[^/]+)/versions/(?P<version>[^/]+)",
+         "delete_detector_version"),
+        ("POST", r"reality-analysis/detectors/(?P<name>[^/]+)/versions/(?P<version>[^/]+)/"
+                 r"(?P<action>publish|unpublish|complete)", "update_detector_version"),
+        ("GET", r"reality-management/reality-data", "list_reality_data"),
+        ("POST", r"reality-management/reality-data", "create_reality_data"),
+        ("GET", r"reality-management/reality-data/(?P<rd_id>[^/]+)", "get_reality_data"),
+        ("PATCH", r"reality-management/reality-data/(?P<rd_id>[^/]+)", "update_reality_data"),
+        ("DELETE", r"reality-management/reality-data/(?P<rd_id>[^/]+)", "delete_reality_data"),
+        ("GET", r"reality-management/reality-data/(?P<rd_id>[^/]+)/(?P<access>readaccess|writeaccess)",
+         "get_container"),
+        ("PATCH", r"reality-management/reality-data/(?P<rd_id>[^/]+)/move", "move_reality_data"),
+    ]
+
+    def __init__(self, options: MockServerOptions) -> None:
+        self.options = options
+        self.url = ""
+        self.stats = MockServerStats()
+        self.lock = threading.Lock()
+        self._random = random.Random(options.seed)
+        self._tokens = float(options.rate_burst)
+        self._last_refill = time.monotonic()
+        self._routes = [(method, re.compile(pattern + "$"), name) for method, pattern, name in self._ROUTES]
+        self.jobs: dict[str, _Job] = {}
+        self.reality_data: dict[str, dict] = {}
+        self.detectors: dict[str, dict] = {}
+        self.containers: dict[str, dict[str, _Blob]] = {}
+        self.blocks: dict[tuple[str, str], dict[str, bytes]] = {}
+
+    def random(self) -> float:
+        with self.lock:
+            return self._random.random()
+
+    def get_retry_after(self) -> Optional[float]:
+        """
+        Count an API request and return the time to wait before sending it again if it is throttled.
+        """
+        with self.lock:
+            self.stats.requests += 1
+            retry_after = None
+            if self.options.rate_limit is not None:
+                now = time.monotonic()
+                self._tokens = min(self._tokens + (now - self._last_refill) * self.options.rate_limit,
+                                   float(self.options.rate_burst))
+                self._last_refill = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                else:
+                    retry_after = (1.0 - self._tokens) / self.options.rate_limit
+            if retry_after is None and self._random.random() < self.options.throttle_probability:
+                retry_after = 1.0
+            if retry_after is not None:
+                self.stats.throttled += 1
+            return retry_after
+
+    def get_container_url(self, container: str, access: str = "Write") -> str:
+        sas = urlencode({"sv": "2020-08-04", "sr": "c", "sp": "racwdl" if access == "Write" else "rl",
+                         "sig": "mock"})
+        return f"{self.url}blobs/{quote(container, safe='')}?{sas}"
+
+    def dispatch(self, method: str, path: str, query: dict, body: Optional[dict]) -> tuple[int, Optional[dict]]:
+        for route_method, pattern, name in self._routes:
+            match = pattern.match(path)
+            if match is not None and route_method == method:
+                groups = {key: unquote(value) for key, value in match.groupdict().items()}
+                return getattr(self, name)(query, body or {}, **groups)
+        raise _ApiError(404, "NotFound", f"No endpoint for {method} {path}.")
+
+    # Jobs
+
+    @staticmethod
+    def _get_outputs(outputs):
+        # The creation specifications list the outputs wanted, the job gives the id of the reality data of each one
+        if isinstance(outputs, list):
+            return {name: {"location": str(uuid.uuid4())} if name == "modelingReference" else str(uuid.uuid4())
+                    for name in outputs}
+        if isinstance(outputs, dict):
+            result = {}
+            if outputs.get("modelingReference"):
+                result["modelingReference"] = {"location": str(uuid.uuid4())}
+            if "exports" in outputs:
+                result["exports"] = [{**export, "location": str(uuid.uuid4())} for export in outputs["exports"]]
+            return result
+        return outputs
+
+    def _get_job(self, service: str, job_id: str) -> _Job:
+        job = self.jobs.get(job_id)
+        if job is None or job.service != service:
+            raise _ApiError(404, "JobNotFound", f"Job {job_id} not found.")
+        return job
+
+    def _get_job_state(self, job: _Job) -> tuple[str, float, dict]:
+        """
+        Return the state, percentage and execution information of a job at the current time.
+        """
+        options = self.options
+        now = time.monotonic()
+        started = job.submitted + options.queued_duration
+        ended = started + options.active_duration
+        execution = {"createdDateTime": _timestamp(job.submitted)}
+        if job.cancelled is not None and job.cancelled < ended:
+            percentage = 0.0 if job.cancelled < started else 100.0 * (job.cancelled - started) / options.active_duration
+            if job.cancelled >= started:
+                execution["startedDateTime"] = _timestamp(started)
+            if now < job.cancelled + options.terminating_duration:
+                return "TerminatingOnCancel", percentage, execution
+            execution["endedDateTime"] = _timestamp(job.cancelled + options.terminating_duration)
+            return "Cancelled", percentage, execution
+        if now < started:
+            return "Queued", 0.0, execution
+        execution["startedDateTime"] = _timestamp(started)
+        if now < ended:
+            return "Active", min(100.0 * (now - started) / options.active_duration, 99.0), execution
+        execution["endedDateTime"] = _timestamp(ended)
+        execution["processingUnits"] = round(options.active_duration / 3600, 4)
+        if job.fails:
+            return "Failed", 100.0, execution
+        return "Success", 100.0, execution
+
+    def _get_job_payload(self, job: _Job) -> dict:
+        state, _, execution = self._get_job_state(job)
+        return {**job.payload, "state": state, "executionInfo": execution}
+
+    def get_jobs(self, query, body, service):
+        clauses = _parse_job_filter(query.get("$filter", ""))
+        ids = next((values for field_name, values in clauses if field_name == "id"), None)
+        with self.lock:
+            # Batched lookups by id only go through the jobs they name, in submission order
+            candidates = self.jobs.values() if ids is None else sorted(
+                (self.jobs[job_id] for job_id in ids if job_id in self.jobs), key=lambda job: job.submitted)
+            payloads = (self._get_job_payload(job) for job in candidates if job.service == service)
+            jobs = [payload for payload in payloads
+                    if all(payload.get(field_name) in values for field_name, values in clauses)]
+        page, next_token = _get_page(jobs, query, self.options.page_size)
+        result = {"jobs": page}
+        if next_token is not None:
+            next_query = urlencode({**query, "continuationToken": next_token})
+            result["_links"] = {"next": {"href": f"{self.url}{service}/jobs?{next_query}"}}
+        return 200, result
+
+    def submit_job(self, query, body, service):
+        if not all(key in body for key in ("type", "specifications", "iTwinId")):
+            raise _ApiError(422, "InvalidJobRequest", "A job needs a type, specifications and an iTwinId.")
+        specifications = {**body["specifications"]}
+        if "outputs" in specifications:
+            specifications["outputs"] = self._get_outputs(specifications["outputs"])
+        payload = {**body, "id": str(uuid.uuid4()), "userId": "00000000-0000-0000-0000-000000000000",
+                   "specifications": specifications}
+        job = _Job(service=service, payload=payload, submitted=time.monotonic(),
+                   fails=self.random() < self.options.failure_probability)
+        with self.lock:
+            self.jobs[payload["id"]] = job
+            return 201, {"job": self._get_job_payload(job)}
+
+    def get_job(self, query, body, service, job_id):
+        with self.lock:
+            return 200, {"job": self._get_job_payload(self._get_job(service, job_id))}
+
+    def cancel_job(self, query, body, service, job_id):
+        with self.lock:
+            job = self._get_job(service, job_id)
+            if self._get_job_state(job)[0] not in ("Queued", "Active"):
+                raise _ApiError(409, "JobNotCancellable", f"Job {job_id} is not running.")
+            job.cancelled = time.monotonic()
+            return 200, {"job": self._get_job_payload(job)}
+
+    def get_progress(self, query, body, service, job_id):
+        with self.lock:
+            state, percentage, _ = self._get_job_state(self._get_job(service, job_id))
+        return 200, {"progress": {"state": state, "percentage": round(percentage, 2)}}
+
+    def get_messages(self, query, body, service, job_id):
+        with self.lock:
+            state = self._get_job_state(self._get_job(service, job_id))[0]
+        errors = []
+        if state == "Failed":
+            errors.append({"code": "MockFailure", "title": "Simulated failure",
+                           "message": "The mock server failed job %1.", "params": [job_id]})
+        return 200, {"messages": {"errors": errors, "warnings": []}}
+
+    # Service files and buckets
+
+    def get_files(self, query, body):
+        return 200, {"files": [{"id": "mock-preset", "name": "Mock preset", "type": "Preset",
+                                "description": "Preset served by the mock server"}]}
+
+    def get_bucket(self, query, body, itwin_id):
+        container = f"bucket-{itwin_id}"
+        with self.lock:
+            self.containers.setdefault(container, {})
+        return 200, {"bucket": {"iTwinId": itwin_id},
+                     "_links": {"containerUrl": {"href": self.get_container_url(container)}}}
+
+    # Detectors
+
+    def _get_detector(self, name: str) -> dict:
+        detector = self.detectors.get(name)
+        if detector is None:
+            raise _ApiError(404, "DetectorNotFound", f"Detector {name} not found.")
+        return detector
+
+    def get_detectors(self, query, body):
+        with self.lock:
+            detectors = [{key: value for key, value in detector.items() if key != "versions"}
+                         for detector in self.detectors.values()]
+        return 200, {"detectors": detectors}
+
+    def create_detector(self, query, body):
+        if "name" not in body or "type" not in body:
+            raise _ApiError(422, "InvalidDetectorRequest", "A detector needs a name and a type.")
+        with self.lock:
+            if body["name"] in self.detectors:
+                raise _ApiError(409, "DetectorAlreadyExists", f"Detector {body['name']} already exists.")
+            self.detectors[body["name"]] = {**body, "versions": []}
+            return 201, {"detector": self.detectors[body["name"]]}
+
+    def get_detector(self, query, body, name):
+        with self.lock:
+            return 200, {"detector": self._get_detector(name)}
+
+    def update_detector(self, query, body, name):
+        with self.lock:
+            detector = self._get_detector(name)
+            detector.update({key: value for key, value in body.items() if key not in ("name", "type", "versions")})
+            return 200, {"detector": detector}
+
+    def delete_detector(self, query, body, name):
+        with self.lock:
+            self._get_detector(name)
+            del self.detectors[name]
+        return 204, None
+
+    def create_detector_version(self, query, body, name):
+        container = "detectors"
+        blob_name = f"{name}-{body.get('versionNumber')}.zip"
+        version = {**body, "creationDate": _now(), "status": "AwaitingData",
+                   "creatorId": "00000000-0000-0000-0000-000000000000"}
+        with self.lock:
+            detector = self._get_detector(name)
+            if any(v["versionNumber"] == version["versionNumber"] for v in detector["versions"]):
+                raise _ApiError(409, "VersionAlreadyExists", f"Version {version['versionNumber']} already exists.")
+            detector["versions"].insert(0, version)
+            self.containers.setdefault(container, {})
+        container_url = urlparse(self.get_container_url(container))
+        upload_url = container_url._replace(path=f"{container_url.path}/{quote(blob_name, safe='')}").geturl()
+        complete_url = (f"detectors/{quote(name, safe='')}/versions/"
+                        f"{quote(version['versionNumber'], safe='')}/complete")
+        return 201, {"version": version, "_links": {"completeUrl": {"href": complete_url},
+                                                    "uploadUrl": {"href": upload_url}}}
+
+    def _get_detector_version(self, name: str, version_number: str) -> dict:
+        for version in self._get_detector(name)["versions"]:
+            if version["versionNumber"] == version_number:
+                return version
+        raise _ApiError(404, "VersionNotFound", f"Version {version_number} of detector {name} not found.")
+
+    def delete_detector_version(self, query, body, name, version):
+        with self.lock:
+            detector_version = self._get_detector_version(name, version)
+            self.detectors[name]["versions"].remove(detector_version)
+        return 204, None
+
+    def update_detector_version(self, query, body, name, version, action):
+        with self.lock:
+            detector_version = self._get_detector_version(name, version)
+            detector = self.detectors[name]
+            if action == "complete":
+                detector_version["status"] = "Ready"
+                detector_version["downloadUrl"] = self.get_container_url("detectors", "Read")
+            elif action == "publish":
+                detector["latestVersion"] = version
+            elif detector.get("latestVersion") == version:
+                del detector["latestVersion"]
+        return 200, None
+
+    # Reality data
+
+    def _get_reality_data(self, rd_id: str) -> dict:
+        reality_data = self.reality_data.get(rd_id)
+        if reality_data is None:
+            raise _ApiError(404, "RealityDataNotFound", f"Reality data {rd_id} not found.")
+        return reality_data
+
+    def _get_reality_data_payload(self, rd_id: str) -> dict:
+        blobs = self.containers.get(rd_id, {})
+        size = sum(len(blob.data) for blob in blobs.values())
+        return {**self._get_reality_data(rd_id), "size": math.ceil(size / 1024)}
+
+    def list_reality_data(self, query, body):
+        itwin_id = query.get("iTwinId")
+        with self.lock:
+            items = [self._get_reality_data_payload(rd_id) for rd_id, rd in self.reality_data.items()
+                     if itwin_id is None or rd["iTwinId"] == itwin_id]
+        page, next_token = _get_page(items, query, self.options.page_size)
+        if query.get("_prefer") != "return=representation":
+            page = [{"id": rd["id"], "displayName": rd["displayName"], "type": rd["type"]} for rd in page]
+        result = {"realityData": page}
+        if next_token is not None:
+            next_query = urlencode({key: value for key, value in {**query, "continuationToken": next_token}.items()
+                                    if not key.startswith("_")})
+            result["_links"] = {"next": {"href": f"{self.url}reality-management/reality-data?{next_query}"}}
+        return 200, result
+
+    def create_reality_data(self, query, body):
+        if not all(key in body for key in ("iTwinId", "displayName", "type")):
+            raise _ApiError(422, "InvalidRealityDataRequest", "A reality data needs an iTwinId, a displayName and "
+                                                               "a type.")
+        now = _now()
+        rd_id = str(uuid.uuid4())
+        reality_data = {**body, "id": rd_id, "createdDateTime": now, "modifiedDateTime": now,
+                        "lastAccessedDateTime": now, "dataCenterLocation": "Mock", "authoring": False}
+        with self.lock:
+            self.reality_data[rd_id] = reality_data
+            self.containers[rd_id] = {}
+            return 201, {"realityData": self._get_reality_data_payload(rd_id)}
+
+    def get_reality_data(self, query, body, rd_id):
+        with self.lock:
+            return 200, {"realityData": self._get_reality_data_payload(rd_id)}
+
+    def update_reality_data(self, query, body, rd_id):
+        with self.lock:
+            reality_data = self._get_reality_data(rd_id)
+            reality_data.update({key: value for key, value in body.items() if value is not None and key != "id"})
+            reality_data["modifiedDateTime"] = _now()
+            return 200, {"realityData": self._get_reality_data_payload(rd_id)}
+
+    def delete_reality_data(self, query, body, rd_id):
+        with self.lock:
+            self._get_reality_data(rd_id)
+            del self.reality_data[rd_id]
+            self.containers.pop(rd_id, None)
+        return 204, None
+
+    def get_container(self, query, body, rd_id, access):
+        access = "Write" if access == "writeaccess" else "Read"
+        with self.lock:
+            self._get_reality_data(rd_id)
+        return 200, {"type": "AzureBlobSasUrl", "access": access,
+                     "_links": {"containerUrl": {"href": self.get_container_url(rd_id, access)}}}
+
+    def move_reality_data(self, query, body, rd_id):
+        with self.lock:
+            self._get_reality_data(rd_id)["iTwinId"] = body.get("iTwinId")
+        return 200, None
+
+
+class _RequestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "RealityCaptureMock"
+
+    @property
+    def api(self) -> _MockApi:
+        return self.server.api
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def _send(self, status_code: int, body: bytes = b"", headers: Optional[dict] = None,
+              head: bool = False) -> None:
+        self.send_response(status_code)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body and not head:
+            self.wfile.write(body)
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _handle(self) -> None:
+        parsed = urlparse(self.path)
+        if parsed.path.startswith("/blobs/"):
+            self._handle_blob(parsed)
+        else:
+            self._handle_api(parsed)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = _handle
+
+    # API
+
+    def _send_json(self, status_code: int, payload: Optional[dict], headers: Optional[dict] = None) -> None:
+        body = json.dumps(payload).encode() if payload is not None else b""
+        headers = {**(headers or {}), "Content-Type": "application/json"} if body else headers
+        self._send(status_code, body, headers)
+
+    def _handle_api(self, parsed) -> None:
+        body = self._read_body()
+        options = self.api.options
+        delay = options.latency + self.api.random() * options.latency_jitter
+        if delay > 0:
+            time.sleep(delay)
+        retry_after = self.api.get_retry_after()
+        if retry_after is not None:
+            self._send_json(429, {"error": {"code": "TooManyRequests", "message": "Rate limit exceeded."}},
+                            {"Retry-After": str(math.ceil(retry_after))})
+            return
+        if not self.headers.get("Authorization"):
+            self._send_json(401, {"error": {"code": "HeaderNotFound", "message": "Header Authorization was not "
+                                                                                   "found in the request."}})
+            return
+        query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+        query["_prefer"] = self.headers.get("Prefer", "")
+        try:
+            payload = json.loads(body) if body else None
+        except ValueError:
+            self._send_json(400, {"error": {"code": "InvalidRequestBody", "message": "The body is not JSON."}})
+            return
+        try:
+            status_code, result = self.api.dispatch(self.command, parsed.path.strip("/"), query, payload)
+        except _ApiError as e:
+            self._send_json(e.status_code, {"error": {"code": e.code, "message": str(e)}})
+            return
+        if self.command != "GET" or result is None:
+            self._send_json(status_code, result)
+            return
+        # Read endpoints support conditional requests, like the real ones
+        etag = '"' + hashlib.md5(json.dumps(result, sort_keys=True).encode()).hexdigest()[:16] + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self._send(304, headers={"ETag": etag})
+            return
+        self._send_json(status_code, result, {"ETag": etag})
+
+    # Blobs
+
+    def _send_blob_error(self, status_code: int, code: str, head: bool = False) -> None:
+        body = (f'<?xml version="1.0" encoding="utf-8"?><Error><Code>{code}</Code>'
+                f'<Message>{code}</Message></Error>').encode()
+        self._send(status_code, body, {"Content-Type": "application/xml", "x-ms-error-code": code}, head)
+
+    @staticmethod
+    def _get_blob_headers(blob: _Blob) -> dict:
+        headers = {"ETag": blob.etag, "Last-Modified": format_datetime(blob.last_modified, usegmt=True),
+                   "x-ms-blob-type": "BlockBlob", "x-ms-creation-time": format_datetime(blob.last_modified, usegmt=True),
+                   "Content-Type": "application/octet-stream", "Accept-Ranges": "bytes",
+                   "x-ms-version": "2021-08-06"}
+        if blob.content_md5 is not None:
+            headers["x-ms-blob-content-md5"] = base64.b64encode(blob.content_md5).decode()
+        if blob.copy_id is not None:
+            headers.update({"x-ms-copy-id": blob.copy_id, "x-ms-copy-status": "success",
+                            "x-ms-copy-progress": f"{len(blob.data)}/{len(blob.data)}"})
+        return headers
+
+    def _handle_blob(self, parsed) -> None:
+        body = self._read_body()
+        api = self.api
+        with api.lock:
+            api.stats.blob_requests += 1
+            api.stats.bytes_uploaded += len(body) if self.command == "PUT" else 0
+        if api.options.blob_latency > 0:
+            time.sleep(api.options.blob_latency)
+        if api.random() < api.options.blob_throttle_probability:
+            self._send_blob_error(503, "ServerBusy", self.command == "HEAD")
+            return
+        segments = parsed.path[len("/blobs/"):].split("/", 1)
+        container = unquote(segments[0])
+        blob_name = unquote(segments[1]) if len(segments) > 1 else ""
+        query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+        with api.lock:
+            blobs = api.containers.get(container)
+        if blobs is None:
+            self._send_blob_error(404, "ContainerNotFound", self.command == "HEAD")
+        elif not blob_name and query.get("comp") == "list" and self.command == "GET":
+            self._list_blobs(container, blobs, query)
+        elif not blob_name and query.get("comp") == "batch" and self.command == "POST":
+            self._delete_batch(blobs, body)
+        elif blob_name and self.command == "PUT":
+            self._put_blob(container, blobs, blob_name, query, body)
+        elif blob_name and self.command in ("GET", "HEAD"):
+            self._get_blob(blobs, blob_name)
+        elif blob_name and self.command == "DELETE":
+            with api.lock:
+                deleted = blobs.pop(blob_name, None)
+            if deleted is None:
+                self._send_blob_error(404, "BlobNotFound")
+            else:
+                self._send(202, headers={"x-ms-delete-type-permanent": "true"})
+        else:
+            self._send_blob_error(400, "UnsupportedHttpVerb")
+
+    def _list_blobs(self, container: str, blobs: dict[str, _Blob], query: dict) -> None:
+        prefix = query.get("prefix", "")
+        max_results = int(query.get("maxresults", 5000))
+        with self.api.lock:
+            names = sorted(name for name in blobs if name.startswith(prefix) and name > query.get("marker", ""))
+            page = [(name, blobs[name]) for name in names[:max_results]]
+        items = []
+        for name, blob in page:
+            md5 = base64.b64encode(blob.content_md5).decode() if blob.content_md5 is not None else ""
+            items.append(f"<Blob><Name>{escape(name)}</Name><Properties>"
+                         f"<Last-Modified>{format_datetime(blob.last_modified, usegmt=True)}</Last-Modified>"
+                         f"<Etag>{escape(blob.etag)}</Etag><Content-Length>{len(blob.data)}</Content-Length>"
+                         f"<Content-Type>application/octet-stream</Content-Type><Content-MD5>{md5}</Content-MD5>"
+                         f"<BlobType>BlockBlob</BlobType></Properties></Blob>")
+        next_marker = page[-1][0] if len(names) > max_results else ""
+        body = (f'<?xml version="1.0" encoding="utf-8"?><EnumerationResults ServiceEndpoint="{self.api.url}blobs/" '
+                f'ContainerName="{escape(container)}"><Prefix>{escape(prefix)}</Prefix>'
+                f'<MaxResults>{max_results}</MaxResults><Blobs>{"".join(items)}</Blobs>'
+                f'<NextMarker>{escape(next_marker)}</NextMarker></EnumerationResults>').encode()
+        self._send(200, body, {"Content-Type": "application/xml"})
+
+    def _put_blob(self, container: str, blobs: dict[str, _Blob], blob_name: str, query: dict, body: bytes) -> None:
+        api = self.api
+        content_md5 = self.headers.get("x-ms-blob-content-md5")
+        content_md5 = base64.b64decode(content_md5) if content_md5 else None
+        comp = query.get("comp")
+        if comp == "block":
+            with api.lock:
+                api.blocks.setdefault((container, blob_name), {})[query["blockid"]] = body
+            self._send(201)
+            return
+        copy_source = self.headers.get("x-ms-copy-source")
+        if comp == "blocklist":
+            block_ids = re.findall(r"<(?:Latest|Uncommitted|Committed)>([^<]*)</", body.decode())
+            with api.lock:
+                staged = api.blocks.pop((container, blob_name), {})
+            if any(block_id not in staged for block_id in block_ids):
+                self._send_blob_error(400, "InvalidBlockList")
+                return
+            blob = _Blob(data=b"".join(staged[block_id] for block_id in block_ids), content_md5=content_md5)
+        elif copy_source is not None:
+            source = urlparse(copy_source).path[len("/blobs/"):].split("/", 1)
+            with api.lock:
+                source_blob = api.containers.get(unquote(source[0]), {}).get(unquote(source[-1]))
+            if source_blob is None:
+                self._send_blob_error(404, "CannotVerifyCopySource")
+                return
+            blob = _Blob(data=source_blob.data, content_md5=source_blob.content_md5, copy_id=str(uuid.uuid4()))
+        elif comp is None:
+            # Single uploads get their MD5 computed by the storage, as Azure does
+            blob = _Blob(data=body, content_md5=content_md5 or hashlib.md5(body).digest())
+        else:
+            self._send_blob_error(400, "UnsupportedQueryParameter")
+            return
+        with api.lock:
+            blobs[blob_name] = blob
+        headers = {"ETag": blob.etag, "Last-Modified": format_datetime(blob.last_modified, usegmt=True),
+                   "x-ms-request-server-encrypted": "true"}
+        if copy_source is not None:
+            headers.update({"x-ms-copy-id": blob.copy_id, "x-ms-copy-status": "success"})
+            self._send(202, headers=headers)
+        else:
+            self._send(201, headers=headers)
+
+    def _get_blob(self, blobs: dict[str, _Blob], blob_name: str) -> None:
+        head = self.command == "HEAD"
+        with self.api.lock:
+            blob = blobs.get(blob_name)
+        if blob is None:
+            self._send_blob_error(404, "BlobNotFound", head)
+            return
+        headers = self._get_blob_headers(blob)
+        size = len(blob.data)
+        byte_range = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("x-ms-range") or self.headers.get("Range") or "")
+        if byte_range is None or head:
+            if not head:
+                with self.api.lock:
+                    self.api.stats.bytes_downloaded += size
+            if blob.content_md5 is not None:
+                headers["Content-MD5"] = headers["x-ms-blob-content-md5"]
+            self._send(200, blob.data, headers, head)
+            return
+        start = int(byte_range.group(1))
+        end = min(int(byte_range.group(2) or size - 1), size - 1)
+        if start >= size:
+            self._send_blob_error(416, "InvalidRange")
+            return
+        with self.api.lock:
+            self.api.stats.bytes_downloaded += end + 1 - start
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        self._send(206, blob.data[start:end + 1], headers)
+
+    def _delete_batch(self, blobs: dict[str, _Blob], body: bytes) -> None:
+        boundary = self.headers.get("Content-Type", "").split("boundary=")[-1]
+        parts = []
+        for part in body.decode().split(f"--{boundary}")[1:]:
+            request = re.search(r"DELETE ([^ ?]+)", part)
+            if request is None:
+                continue
+            content_id = re.search(r"Content-ID: *(\d+)", part, re.IGNORECASE)
+            name = unquote(request.group(1).split("/", 3)[-1])
+            with self.api.lock:
+                deleted = blobs.pop(name, None)
+            status = "202 Accepted" if deleted is not None else "404 The specified blob does not exist."
+            error = "" if deleted is not None else "x-ms-error-code: BlobNotFound\r\n"
+            parts.append(f"Content-Type: application/http\r\nContent-ID: {content_id.group(1) if content_id else 0}"
+                         f"\r\n\r\nHTTP/1.1 {status}\r\n{error}x-ms-version: 2021-08-06\r\n"
+                         f"Content-Length: 0\r\n\r\n")
+        response_boundary = f"batchresponse_{uuid.uuid4()}"
+        payload = "".join(f"--{response_boundary}\r\n{part}" for part in parts) + f"--{response_boundary}--\r\n"
+        self._send(202, payload.encode(), {"Content-Type": f"multipart/mixed; boundary={response_boundary}"})
+
+
+class MockServer:
+    """
+    Local HTTP server standing in for the Reality Capture APIs and the blob storage, serving from a background thread.
+    """
+
+    def __init__(self, options: Optional[MockServerOptions] = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        """
+        Constructor method
+
+        :param options: Behavior of the server, default options if not given.
+        :param host: Address to listen on.
+        :param port: Port to listen on, any free port if 0.
+        """
+        self._api = _MockApi(options or MockServerOptions())
+        self._server = http.server.ThreadingHTTPServer((host, port), _RequestHandler)
+        self._server.daemon_threads = True
+        self._server.api = self._api
+        self._api.url = f"http://{host}:{self._server.server_port}/"
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "MockServer":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        """
+        Root url of the server, to give as the ``service_url`` of the services and data handlers.
+        """
+        return self._api.url
+
+    @property
+    def options(self) -> MockServerOptions:
+        """
+        Behavior of the server, which can be changed while it runs.
+        """
+        return self._api.options
+
+    def start(self) -> None:
+        """
+        Start serving from a background thread.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop serving and close the listening socket.
+        """
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def serve_forever(self) -> None:
+        """
+        Serve from the calling thread until interrupted.
+        """
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def get_stats(self) -> MockServerStats:
+        """
+        Return a snapshot of the counters of the server.
+
+        :return: Request, throttling and blob traffic counts since the start of the server.
+        """
+        with self._api.lock:
+            return MockServerStats(**vars(self._api.stats))
+
+    def create_container(self, name: str) -> str:
+        """
+        Create an empty blob container, for benchmarks of the transfers that do not need the APIs.
+
+        :param name: Name of the container.
+        :return: Url of the container, with a SAS token granting every permission.
+        """
+        with self._api.lock:
+            self._api.containers.setdefault(name, {})
+        return self._api.get_container_url(name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Reality Capture APIs.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on.")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latency of each API request in seconds.")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="Maximum random latency added in seconds.")
+    parser.add_argument("--blob-latency", type=float, default=0.0, help="Latency of each blob request in seconds.")
+    parser.add_argument("--rate-limit", type=float, default=None, help="API requests accepted per second.")
+    parser.add_argument("--rate-burst", type=int, default=10, help="API requests accepted at once.")
+    parser.add_argument("--throttle-probability", type=float, default=0.0,
+                        help="Probability that an API request is throttled.")
+    parser.add_argument("--queued-duration", type=float, default=1.0, help="Time in seconds a job stays queued.")
+    parser.add_argument("--active-duration", type=float, default=5.0, help="Time in seconds a job stays active.")
+    parser.add_argument("--failure-probability", type=float, default=0.0, help="Probability that a job fails.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the random generator.")
+    args = parser.parse_args()
+
+    options = MockServerOptions(latency=args.latency, latency_jitter=args.latency_jitter,
+                                blob_latency=args.blob_latency, rate_limit=args.rate_limit, rate_burst=args.rate_burst,
+                                throttle_probability=args.throttle_probability,
+                                queued_duration=args.queued_duration, active_duration=args.active_duration,
+                                failure_probability=args.failure_probability, seed=args.seed)
+    server = MockServer(options, args.host, args.port)
+    print(f"Serving the Reality Capture APIs on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Generic, Optional, TypeVar
+from reality_capture.service.response import Response
+
+if TYPE_CHECKING:
+    import asyncio
+
+T = TypeVar("T")
+
+
+class _PageState:
+    """
+    Bookkeeping shared by the synchronous and asynchronous page iterators.
+    """
+
+    def __init__(self, get_items: Callable[[Any], list], get_token: Callable[[Any], Optional[str]],
+                 max_items: Optional[int]) -> None:
+        self.get_items = get_items
+        self.get_token = get_token
+        self.max_items = max_items
+        self.items = iter(())
+        self.yielded = 0
+        self.fetched = 0
+        self.error = None
+
+    def is_full(self) -> bool:
+        return self.max_items is not None and self.yielded >= self.max_items
+
+    def next_item(self, end: object) -> Any:
+        item = next(self.items, end)
+        if item is not end:
+            self.yielded += 1
+        return item
+
+    def on_page(self, response: Response) -> Optional[str]:
+        """
+        Consume a page and return the continuation token of the next one, if it is needed.
+        """
+        if response.is_error():
+            self.error = response
+            return None
+        items = self.get_items(response.value)
+        self.items = iter(items)
+        self.fetched += len(items)
+        token = self.get_token(response.value)
+        if not token or (self.max_items is not None and self.fetched >= self.max_items):
+            return None
+        return token
+
+
+class PageIterator(Generic[T]):
+    """
+    Lazy iterator over the items of a paged query, following the continuation tokens transparently.
+
+    While the items of a page are consumed, the next page is requested on a background thread. The iteration
+    stops after ``max_items`` items without requesting further pages, or at the first page request that fails, in
+    which case its response is available in ``error``.
+    """
+
+    _END = object()
+
+    def __init__(self, fetch_page: Callable[[Optional[str]], Response], get_items: Callable[[Any], list],
+                 get_token: Callable[[Any], Optional[str]], max_items: Optional[int] = None,
+                 prefetch: bool = True) -> None:
+        self._fetch_page = fetch_page
+        self._state = _PageState(get_items, get_token, max_items)
+        self._prefetch = prefetch
+        self._executor = None
+        self._pending: Optional[Future] = None
+        self._token = None
+        self._started = False
+
+    def __iter__(self) -> "PageIterator[T]":
+        return self
+
+    def __enter__(self) -> "PageIterator[T]":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    @property
+    def error(self) -> Optional[Response]:
+        """
+        Error response of the page request that stopped the iteration, None if every page was retrieved.
+        """
+        return self._state.error
+
+    def __next__(self) -> T:
+        while not self._state.is_full():
+            item = self._state.next_item(self._END)
+            if item is not self._END:
+                return item
+            response = self._get_page()
+            if response is None:
+                break
+            self._request_page(self._state.on_page(response))
+        self.close()
+        raise StopIteration
+
+    def _get_page(self) -> Optional[Response]:
+        if not self._started:
+            self._started = True
+            return self._fetch_page(None)
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            return pending.result()
+        if self._token is not None:
+            token, self._token = self._token, None
+            return self._fetch_page(token)
+        return None
+
+    def _request_page(self, token: Optional[str]) -> None:
+        if token is None:
+            return
+        if not self._prefetch:
+            self._token = token
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="PageIterator")
+        self._pending = self._executor.submit(self._fetch_page, token)
+
+    def close(self) -> None:
+        """
+        Stop the iteration and release the prefetch thread.
+        """
+        self._token = None
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+class AsyncPageIterator(Generic[T]):
+    """
+    Asynchronous version of :class:`PageIterator`, the next page is requested in a task.
+    """
+
+    _END = object()
+
+    def __init__(self, fetch_page: Callable[[Optional[str]], Awaitable[Response]], get_items: Callable[[Any], list],
+                 get_token: Callable[[Any], Optional[str]], max_items: Optional[int] = None,
+                 prefetch: bool = True) -> None:
+        self._fetch_page = fetch_page
+        self._state = _PageState(get_items, get_token, max_items)
+        self._prefetch = prefetch
+        self._pending: Optional["asyncio.Future"] = None
+        self._token = None
+        self._started = False
+
+    def __aiter__(self) -> "AsyncPageIterator[T]":
+        return self
+
+    @property
+    def error(self) -> Optional[Response]:
+        """
+        Error response of the page request that stopped the iteration, None if every page was retrieved.
+        """
+        return self._state.error
+
+    async def __anext__(self) -> T:
+        while not self._state.is_full():
+            item = self._state.next_item(self._END)
+            if item is not self._END:
+                return item
+            response = await self._get_page()
+            if response is None:
+                break
+            token = self._state.on_page(response)
+            if token is not None:
+                if self._prefetch:
+                    # Imported here so that the synchronous service does not load asyncio
+                    import asyncio
+                    self._pending = asyncio.ensure_future(self._fetch_page(token))
+                else:
+                    self._token = token
+        self.close()
+        raise StopAsyncIteration
+
+    async def _get_page(self) -> Optional[Response]:
+        if not self._started:
+            self._started = True
+            return await self._fetch_page(None)
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            return await pending
+        if self._token is not None:
+            token, self._token = self._token, None
+            return await self._fetch_page(token)
+        return None
+
+    def close(self) -> None:
+        """
+        Stop the iteration and cancel the pending page request.
+        """
+        self._token = None
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
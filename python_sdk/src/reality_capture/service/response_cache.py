@@ -0,0 +1,142 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+from reality_capture.service.response import Response
+
+
+@dataclass
+class CacheStats:
+    """
+    Counters of a response cache.
+    """
+
+    hits: int = 0
+    "Number of lookups answered by the cache, including the revalidated ones."
+    misses: int = 0
+    "Number of lookups that needed a response from the service."
+    revalidations: int = 0
+    "Number of hits that needed a conditional request answered with a 304 status by the service."
+    evictions: int = 0
+    "Number of entries dropped to keep the cache under its maximum size."
+
+
+@dataclass
+class _CacheEntry:
+    expiry: float
+    etag: Optional[str]
+    response: Response
+
+
+def _copy_response(response: Response) -> Response:
+    # Callers own the responses they get, editing them must not alter the cache
+    value = response.value.model_copy(deep=True) if response.value is not None else None
+    return Response(status_code=response.status_code, error=None, value=value)
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache of the responses of read-mostly requests of a service.
+
+    Entries are keyed by a tuple starting with the name of the endpoint, followed by the parameters of the request.
+    The endpoints cached are ``service_files``, ``detectors``, ``detector`` and ``reality_data``. Each entry is fresh
+    for the time to live of its endpoint, after which it is revalidated with an ``If-None-Match`` request when the
+    service gave an ``ETag`` for it, and requested again otherwise. Only successful responses are cached. Buckets are
+    not cached here: their response carries a SAS link, which the data handlers keep until shortly before it expires.
+
+    The cached responses do not depend on the token of the service that requested them: a cache must only be shared
+    by services using the same identity and environment.
+    """
+
+    DEFAULT_TTLS = {"service_files": 3600.0, "detectors": 300.0, "detector": 300.0, "reality_data": 60.0}
+    "Default time to live in seconds of the responses of each endpoint."
+
+    def __init__(self, max_size: int = 256, ttls: Optional[dict[str, float]] = None) -> None:
+        """
+        Constructor method
+
+        :param max_size: Maximum number of responses kept, the least recently used ones are evicted first.
+        :param ttls: Time to live in seconds of the responses of each endpoint, overriding ``DEFAULT_TTLS``. A time
+            to live of 0 disables the cache for an endpoint.
+        """
+        self._max_size = max_size
+        self._ttls = {**self.DEFAULT_TTLS, **(ttls or {})}
+        self._entries: OrderedDict[tuple, _CacheEntry] = OrderedDict()
+        self._stats = CacheStats()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> tuple[Optional[Response], Optional[str]]:
+        """
+        Look up the response of a request.
+
+        :param key: Key of the request, starting with the name of its endpoint.
+        :return: A copy of the response if it is fresh, otherwise None with the ETag of the expired response, if any.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expiry > time.monotonic():
+                self._entries.move_to_end(key)
+                self._stats.hits += 1
+                return _copy_response(entry.response), None
+            self._stats.misses += 1
+            return None, entry.etag if entry is not None else None
+
+    def store(self, key: tuple, response: Response, etag: Optional[str] = None) -> None:
+        """
+        Store the response of a request, unless it is an error.
+
+        :param key: Key of the request, starting with the name of its endpoint.
+        :param response: Response of the service.
+        :param etag: Value of the ``ETag`` header of the response.
+        """
+        ttl = self._ttls.get(key[0], 0.0)
+        if response.is_error() or ttl <= 0:
+            return
+        entry = _CacheEntry(expiry=time.monotonic() + ttl, etag=etag, response=_copy_response(response))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self._stats.evictions += 1
+
+    def revalidate(self, key: tuple, etag: str) -> Optional[Response]:
+        """
+        Mark the expired response of a request as fresh again, after the service answered 304 to its ``ETag``.
+
+        :param key: Key of the request, starting with the name of its endpoint.
+        :param etag: ``ETag`` sent in the ``If-None-Match`` header of the request.
+        :return: A copy of the response, None if it was dropped or replaced in the meantime.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.etag != etag:
+                return None
+            entry.expiry = time.monotonic() + self._ttls.get(key[0], 0.0)
+            self._entries.move_to_end(key)
+            # The lookup was counted as a miss
+            self._stats.misses -= 1
+            self._stats.hits += 1
+            self._stats.revalidations += 1
+            return _copy_response(entry.response)
+
+    def invalidate(self, prefix: tuple = ()) -> None:
+        """
+        Drop the responses whose key starts with the given elements.
+
+        :param prefix: Beginning of the keys to drop, for instance ``("reality_data", reality_data_id)``. All the
+            responses are dropped if it is empty.
+        """
+        with self._lock:
+            for key in [key for key in self._entries if key[:len(prefix)] == prefix]:
+                del self._entries[key]
+
+    def get_stats(self) -> CacheStats:
+        """
+        Return a snapshot of the counters of the cache.
+
+        :return: Hit, miss, revalidation and eviction counts since the creation of the cache.
+        """
+        with self._lock:
+            return CacheStats(**vars(self._stats))
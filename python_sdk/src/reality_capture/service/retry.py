@@ -0,0 +1,155 @@
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse the value of a ``Retry-After`` header.
+
+    :param value: Header value, either a number of seconds or an HTTP date.
+    :return: The delay in seconds, None if the header is missing or invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max((date - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Retry policy of the requests sent by the service.
+
+    Idempotent requests are retried on network errors and on the statuses of ``retry_statuses``, other requests only
+    when they were throttled (429), since the service did not process them. The delay between two attempts grows
+    exponentially, unless the service gives one in a ``Retry-After`` header.
+    """
+
+    max_retries: int = 3
+    "Maximum number of retries of a request, 0 to disable retries."
+    backoff_factor: float = 0.5
+    "Delay in seconds before the first retry, doubled at each following one."
+    max_backoff: float = 30.0
+    "Maximum delay in seconds between two attempts when the service does not give one."
+    jitter: float = 0.5
+    "Fraction of the backoff delay that is randomized, so that concurrent clients do not retry in lockstep."
+    max_retry_after: float = 60.0
+    "Maximum delay in seconds accepted from a ``Retry-After`` header, the request is not retried beyond."
+    retry_statuses: frozenset = frozenset({429, 500, 502, 503, 504})
+    "HTTP statuses for which an idempotent request is retried."
+    idempotent_methods: frozenset = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+    "HTTP methods that can be retried after a network error or a server error."
+
+    def get_backoff(self, attempt: int) -> float:
+        """
+        Return the delay before a retry when the service does not give one.
+
+        :param attempt: Number of retries already done.
+        :return: The delay in seconds.
+        """
+        delay = min(self.backoff_factor * (2 ** attempt), self.max_backoff)
+        return delay * (1.0 - self.jitter * random.random())
+
+    def get_delay(self, method: str, attempt: int, status_code: Optional[int] = None,
+                  retry_after: Optional[str] = None) -> Optional[float]:
+        """
+        Return the delay before retrying a request.
+
+        :param method: HTTP method of the request.
+        :param attempt: Number of retries already done.
+        :param status_code: Status of the response, None if the request failed with a network error.
+        :param retry_after: Value of the ``Retry-After`` header of the response.
+        :return: The delay in seconds, None if the request must not be retried.
+        """
+        if attempt >= self.max_retries:
+            return None
+        idempotent = method.upper() in self.idempotent_methods
+        if status_code is None:
+            return self.get_backoff(attempt) if idempotent else None
+        if status_code not in self.retry_statuses or not (idempotent or status_code == 429):
+            return None
+        delay = parse_retry_after(retry_after) if status_code in (429, 503) else None
+        if delay is None:
+            return self.get_backoff(attempt)
+        if delay > self.max_retry_after:
+            return None
+        return delay
+
+
+class RateLimiter:
+    """
+    Client-side token bucket limiting the rate of the requests sent by a service.
+
+    Up to ``burst`` requests are sent at once, then requests are spaced to ``rate`` per second. When the service
+    throttles a request, the whole bucket is paused for the delay it asked for, so that the other requests do not
+    hit the limit too. It can be shared by several services.
+    """
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        """
+        Constructor method
+
+        :param rate: Sustained number of requests per second.
+        :param burst: Number of requests that can be sent at once.
+        """
+        if rate <= 0:
+            raise ValueError("Rate must be positive")
+        self._rate = rate
+        self._burst = max(burst, 1)
+        self._tokens = float(self._burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        if now > self._updated:
+            self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+
+    def reserve(self) -> float:
+        """
+        Take a token from the bucket.
+
+        :return: Time in seconds to wait before sending the request.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1.0
+            # While paused, _updated is in the future and the bucket starts refilling from there
+            ready = self._updated + max(-self._tokens, 0.0) / self._rate
+            return max(ready - now, 0.0)
+
+    def acquire(self) -> None:
+        """
+        Take a token from the bucket, waiting until it is available.
+        """
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Stop handing out tokens for the given time. The bucket is empty when it resumes.
+
+        :param seconds: Pause duration in seconds.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now + seconds > self._updated:
+                self._tokens = min(self._tokens, 0.0)
+                self._updated = now + seconds
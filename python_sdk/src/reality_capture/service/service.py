@@ -1,3 +1,7 @@
+import contextvars
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
 import urllib.parse
 import requests
 import certifi
@@ -7,19 +11,34 @@ from reality_capture.service.detectors import (DetectorBase, DetectorsMinimalRes
                                                DetectorVersionCreate, DetectorVersionWithLinks)
 from reality_capture.service.files import Files
 from reality_capture.service.response import Response
-from reality_capture.service.job import JobCreate, Job, Progress, Messages, Service, Jobs
+from reality_capture.service.job import JobCreate, Job, Progress, Messages, Service, Jobs, JobType
+from reality_capture.service.job_handle import JobHandle
 from reality_capture.service.reality_data import (RealityDataCreate, RealityData, RealityDataUpdate, ContainerDetails,
-                                                  RealityDataFilter, Prefer, RealityDatas)
+                                                  RealityDataFilter, Prefer, RealityDatas, RealityDataMinimal,
+                                                  get_continuation_token)
+from reality_capture.service.pagination import PageIterator
+from reality_capture.service.instrumentation import Instrumentation, RequestMetrics, get_endpoint
+from reality_capture.service.response_cache import ResponseCache
+from reality_capture.service.retry import RateLimiter, RetryPolicy
+from reality_capture.service.token_cache import TokenCache
 from reality_capture.service.error import DetailedErrorResponse, DetailedError
 from reality_capture import __version__
-from typing import Optional, Type
+from typing import Optional, Type, Union
 from pydantic import BaseModel, ValidationError
 from urllib.parse import urlencode
 
+# Time spent getting the token of the last headers built in the current thread or task, reported by the next request
+_token_duration: contextvars.ContextVar[float] = contextvars.ContextVar("token_duration", default=0.0)
+
 
 class RealityCaptureService:
     """
     Service handling communication with Reality Capture APIs
+
+    A service instance is thread-safe and is meant to be shared: its methods can be called concurrently from any
+    number of threads. Requests share a pool of up to ``max_connections`` connections, the access token cache, the
+    retry policy and the rate limiter, while the headers of each request are built for it alone. The token factory
+    may be called from several threads and must be thread-safe itself.
     """
 
     def __init__(self, token_factory, **kwargs) -> None:
@@ -33,22 +52,49 @@ class RealityCaptureService:
         :Keyword Arguments:
             * *user_agent* (``str``) --
               Additional user agent string
+            * *retry_policy* (``RetryPolicy``) --
+              Retry policy of the requests, a default ``RetryPolicy()`` if not given, None to disable retries
+            * *rate_limiter* (``RateLimiter``) --
+              Client-side rate limiter shared by the requests, none by default
+            * *response_cache* (``ResponseCache``) --
+              Cache of the responses of the read-mostly requests (service files, detectors, buckets and reality
+              data), none by default
+            * *instrumentation* (``Instrumentation``) --
+              Receiver of the measures of every call, such as a ``MetricsCollector``, none by default
+            * *token_refresh_margin* (``float``) --
+              Time in seconds before the expiry of the cached token from which it is refreshed in the background,
+              300 by default
+            * *max_connections* (``int``) --
+              Maximum number of connections kept open to the service, it should match the number of threads sharing
+              the service, 32 by default
+            * *service_url* (``str``) --
+              Root url of the APIs, overriding *env*, for instance the url of a local ``MockServer``
 
         """
         self._token_factory = token_factory
+        self._token_cache = TokenCache(token_factory, kwargs.get("token_refresh_margin", 300.0))
         self._session = requests.Session()
         self._session.verify = certifi.where()
+        # Retries are handled by _send_request, the adapter only sizes the pool shared by the threads
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=kwargs.get("max_connections", 32), max_retries=0)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
 
         add_ua = ""
         if "user_agent" in kwargs.keys() and len(kwargs["user_agent"]) > 0:
             add_ua = " " + kwargs["user_agent"]
 
-        self._header = {
+        self._header = types.MappingProxyType({
             "Authorization": None,
             "User-Agent": f"Reality Capture Python SDK/{__version__}{add_ua}",
             "Content-type": "application/json",
             "Accept": "application/vnd.bentley.itwin-platform.v1+json",
-        }
+        })
+
+        self._retry_policy = kwargs.get("retry_policy", RetryPolicy())
+        self._rate_limiter = kwargs.get("rate_limiter")
+        self._response_cache: Optional[ResponseCache] = kwargs.get("response_cache")
+        self._instrumentation: Optional[Instrumentation] = kwargs.get("instrumentation")
 
         env = None
         if "env" in kwargs.keys():
@@ -59,11 +105,16 @@ class RealityCaptureService:
             self._service_url = "https://dev-api.bentley.com/"
         else:
             self._service_url = "https://api.bentley.com/"
+        if "service_url" in kwargs.keys():
+            self._service_url = kwargs["service_url"].rstrip("/") + "/"
 
     def _get_header(self, version) -> dict:
-        self._header["Authorization"] = self._token_factory.get_token()
-        self._header["Accept"] = f"application/vnd.bentley.itwin-platform.{version}+json"
-        return self._header
+        start = time.perf_counter()
+        token = self._token_cache.get_token()
+        _token_duration.set(time.perf_counter() - start)
+        # The base header is read-only, each request gets its own dict
+        return {**self._header, "Authorization": token,
+                "Accept": f"application/vnd.bentley.itwin-platform.{version}+json"}
 
     def _get_header_v1(self) -> dict:
         return self._get_header("v1")
@@ -95,12 +146,109 @@ class RealityCaptureService:
             r = response.text
         return f"Service response is ill-formed: {r}. Exception : {exception}"
 
+    def _get_retry_delay(self, method: str, attempt: int, status_code: Optional[int] = None,
+                         retry_after: Optional[str] = None) -> Optional[float]:
+        if self._retry_policy is None:
+            return None
+        delay = self._retry_policy.get_delay(method, attempt, status_code, retry_after)
+        if delay is not None and retry_after is not None and self._rate_limiter is not None:
+            # The service asked to slow down, hold the other requests as well
+            self._rate_limiter.pause(delay)
+        return delay
+
+    def _start_request_metrics(self, method: str, url: str) -> RequestMetrics:
+        metrics = RequestMetrics(method=method, url=url, start=time.time())
+        # Set by the _get_header call that built the headers of this request
+        metrics.add_phase("token", _token_duration.get())
+        _token_duration.set(0.0)
+        return metrics
+
+    def _finish_request_metrics(self, metrics: RequestMetrics, response: Response) -> None:
+        if self._instrumentation is None:
+            return
+        metrics.endpoint = get_endpoint(metrics.method, metrics.url)
+        metrics.status_code = response.status_code
+        metrics.duration = time.time() - metrics.start + metrics.phases["token"]
+        self._instrumentation.on_request(metrics)
+
+    def _send_request(self, method: str, url: str, headers: dict, metrics: RequestMetrics,
+                      **kwargs) -> requests.Response:
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            if self._rate_limiter is not None:
+                self._rate_limiter.acquire()
+            sent = time.perf_counter()
+            metrics.add_phase("wait", sent - start)
+            try:
+                response = self._session.request(method, url, headers=headers, **kwargs)
+            except requests.exceptions.RequestException:
+                metrics.add_phase("network", time.perf_counter() - sent)
+                delay = self._get_retry_delay(method, attempt)
+                if delay is None:
+                    raise
+            else:
+                metrics.add_phase("network", time.perf_counter() - sent)
+                metrics.bytes_sent += int(response.request.headers.get("Content-Length", 0))
+                metrics.bytes_received += len(response.content)
+                delay = self._get_retry_delay(method, attempt, response.status_code,
+                                              response.headers.get("Retry-After"))
+                if delay is None:
+                    return response
+            time.sleep(delay)
+            metrics.add_phase("wait", delay)
+            metrics.retries += 1
+            attempt += 1
+
+    def _get_cached_response(self, cache_key: Optional[tuple],
+                             headers: dict) -> tuple[Optional[Response], dict, Optional[str]]:
+        if cache_key is None or self._response_cache is None:
+            return None, headers, None
+        cached, etag = self._response_cache.get(cache_key)
+        if etag is not None:
+            headers = {**headers, "If-None-Match": etag}
+        return cached, headers, etag
+
+    def _store_cached_response(self, cache_key: Optional[tuple], response: Response, etag: Optional[str]) -> None:
+        if cache_key is not None and self._response_cache is not None:
+            self._response_cache.store(cache_key, response, etag)
+
+    def _invalidate_cached_responses(self, invalidated_keys: tuple) -> None:
+        if self._response_cache is not None:
+            for prefix in invalidated_keys:
+                self._response_cache.invalidate(prefix)
+
     def _execute_request(self, method: str, url: str, headers: dict, success_model: Type[BaseModel] = None,
-                         data_key: str = None, **kwargs) -> Response:
+                         data_key: str = None, cache_key: Optional[tuple] = None, invalidated_keys: tuple = (),
+                         **kwargs) -> Response:
+        metrics = self._start_request_metrics(method, url)
+        response = self._execute_measured_request(method, url, headers, success_model, data_key, cache_key,
+                                                  invalidated_keys, metrics, **kwargs)
+        self._finish_request_metrics(metrics, response)
+        return response
+
+    def _execute_measured_request(self, method: str, url: str, headers: dict, success_model: Optional[Type[BaseModel]],
+                                  data_key: Optional[str], cache_key: Optional[tuple], invalidated_keys: tuple,
+                                  metrics: RequestMetrics, **kwargs) -> Response:
+        cached, headers, etag = self._get_cached_response(cache_key, headers)
+        if cached is not None:
+            metrics.cached = True
+            return cached
         try:
-            response = self._session.request(method, url, headers=headers, **kwargs)
+            response = self._send_request(method, url, headers, metrics, **kwargs)
+            if response.status_code == 304 and etag is not None:
+                cached = self._response_cache.revalidate(cache_key, etag)
+                if cached is not None:
+                    metrics.cached = True
+                    return cached
+                # The cached response changed in the meantime, get the current one
+                headers = {k: v for k, v in headers.items() if k != "If-None-Match"}
+                response = self._send_request(method, url, headers, metrics, **kwargs)
             response.raise_for_status()
         except requests.exceptions.HTTPError as e:
+            if e.response.status_code == 401:
+                # The token may have been revoked, get a new one for the next requests
+                self._token_cache.invalidate()
             try:
                 error_details = DetailedErrorResponse.model_validate(e.response.json())
                 return Response(status_code=e.response.status_code, value=None, error=error_details)
@@ -111,17 +259,26 @@ class RealityCaptureService:
         except requests.exceptions.RequestException as e:
             error = DetailedError(code="NetworkError", message=f"Network error : {e}")
             return Response(status_code=503, value=None, error=DetailedErrorResponse(error=error))
+        finally:
+            # Whatever the outcome of a write, the cached responses it may have changed are dropped
+            self._invalidate_cached_responses(invalidated_keys)
 
         try:
             if not success_model:
                 return Response(status_code=response.status_code, value=None, error=None)
+            start = time.perf_counter()
             json_data = response.json()
+            decoded = time.perf_counter()
+            metrics.add_phase("decode", decoded - start)
             if data_key:
                 data_to_validate = json_data[data_key]
             else:
                 data_to_validate = json_data
             validated_data = success_model.model_validate(data_to_validate)
-            return Response(status_code=response.status_code, value=validated_data, error=None)
+            metrics.add_phase("validation", time.perf_counter() - decoded)
+            result = Response(status_code=response.status_code, value=validated_data, error=None)
+            self._store_cached_response(cache_key, result, response.headers.get("ETag"))
+            return result
         except (ValidationError, KeyError, requests.exceptions.JSONDecodeError) as e:
             error = DetailedError(code="InvalidResponse", message=self._get_ill_formed_message(response, e))
             return Response(status_code=502, error=DetailedErrorResponse(error=error), value=None)
@@ -152,6 +309,30 @@ class RealityCaptureService:
         return self._execute_request(method="GET", url=url, headers=self._get_header_v2(), success_model=Jobs,
                                      params=params)
 
+    @staticmethod
+    def _get_iter_jobs_top(top: Optional[int], max_items: Optional[int]) -> Optional[int]:
+        # Do not ask for more jobs per page than needed
+        if max_items is None:
+            return top
+        return min(top, max_items) if top is not None else min(max_items, 1000)
+
+    def iter_jobs(self, service: Service, filters: str, top: int = None, max_items: Optional[int] = None,
+                  prefetch: bool = True) -> PageIterator[Job]:
+        """
+        Iterate lazily over the jobs of a specific service, following the pages transparently.
+
+        :param service: Service to target
+        :param filters: Filter evaluated for each job, see ``get_jobs``.
+        :param top: The number of jobs to get in each page. Min 2, max 1000.
+        :param max_items: Maximum number of jobs to iterate over, no more pages are requested once it is reached.
+        :param prefetch: If True, request the next page on a background thread while the current one is consumed.
+        :return: A PageIterator over the jobs. If a page request fails, the iteration stops and its response is
+         available in the ``error`` attribute of the iterator.
+        """
+        top = self._get_iter_jobs_top(top, max_items)
+        return PageIterator(lambda token: self.get_jobs(service, filters, top, token or ""),
+                            lambda jobs: jobs.jobs, lambda jobs: jobs.get_continuation_token(), max_items, prefetch)
+
     def submit_job(self, job: JobCreate) -> Response[Job]:
         """
         Submit a job to the service. The job will be created and submitted at once.
@@ -159,6 +340,12 @@ class RealityCaptureService:
         :param job: JobCreate information to use for the job.
         :return: A Response[Job] containing either the Job created or the error from the service.
         """
+        prepared = self._prepare_job_submission(job)
+        if isinstance(prepared, Response):
+            return prepared
+        return self._post_job(*prepared)
+
+    def _prepare_job_submission(self, job: JobCreate) -> Union[Response, tuple[str, str]]:
         try:
             url = self._get_correct_url(job.get_appropriate_service()) + "jobs"
             json_dump = job.model_dump_json(by_alias=True)
@@ -166,10 +353,34 @@ class RealityCaptureService:
             detailed_error = DetailedError(code="UnknownError", message=f"Could not submit job, bad request : "
                                                                         f"{e}")
             return Response(status_code=400, value=None, error=DetailedErrorResponse(error=detailed_error))
+        return url, json_dump
 
+    def _post_job(self, url: str, json_dump: str) -> Response[Job]:
         return self._execute_request(method="POST", url=url, headers=self._get_header_v2(), success_model=Job,
                                      data_key="job", data=json_dump)
 
+    def submit_jobs(self, jobs: list[JobCreate], max_parallel: int = 8) -> list[Response[Job]]:
+        """
+        Submit several jobs to the service. All the jobs are validated and serialized first, then submitted
+        concurrently. A job rejected by the service does not stop the others, throttled submissions are retried
+        according to the retry policy of the service.
+
+        :param jobs: JobCreate information to use for each job.
+        :param max_parallel: Maximum number of concurrent submissions, it should not exceed ``max_connections``.
+        :return: A list of Response[Job] in the order of ``jobs``, each containing either the Job created or the
+         error for this job.
+        """
+        responses = [self._prepare_job_submission(job) for job in jobs]
+        pending = [i for i, prepared in enumerate(responses) if not isinstance(prepared, Response)]
+        if not pending:
+            return responses
+        with ThreadPoolExecutor(max_workers=max(1, min(max_parallel, len(pending))),
+                                thread_name_prefix="SubmitJobs") as executor:
+            submitted = executor.map(lambda i: self._post_job(*responses[i]), pending)
+            for i, r in zip(pending, submitted):
+                responses[i] = r
+        return responses
+
     def get_job(self, job_id: str, service: Service) -> Response[Job]:
         """
         Retrieve the complete Job details from the service using the job id.
@@ -244,6 +455,50 @@ class RealityCaptureService:
         return self._execute_request(method="DELETE", url=url, headers=self._get_header_v2(),
                                      success_model=Job, data_key="job")
 
+    def get_job_handle(self, job_id: str, job_type: JobType) -> JobHandle:
+        """
+        Get a handle on a submitted job, to wait for its end in the background or cancel it.
+
+        :param job_id: Id of the job.
+        :param job_type: Type of the job.
+        :return: A JobHandle for the job.
+        """
+        return JobHandle(self, job_id, job_type)
+
+    def wait_for_job(self, job_id: str, job_type: JobType, timeout: Optional[float] = None,
+                     max_requests: Optional[int] = None, cancel_on_timeout: bool = False) -> Response[Job]:
+        """
+        Wait for the end of a job. The poll interval adapts to the job type and to the progress rate.
+
+        :param job_id: Id of the job to wait for.
+        :param job_type: Type of the job.
+        :param timeout: Maximum time to wait in seconds, no limit by default.
+        :param max_requests: Maximum number of requests to the service, including the final job retrieval and the
+         cancellation, no limit by default.
+        :param cancel_on_timeout: If True, cancel the job when the timeout or the request limit is reached.
+        :return: A Response[Job] containing either the job in its final state, the error from the service, or a 408
+         error if the timeout or the request limit was reached.
+        """
+        return self.get_job_handle(job_id, job_type).result(timeout, max_requests, cancel_on_timeout)
+
+    def submit_job_and_wait(self, job: JobCreate, timeout: Optional[float] = None,
+                            max_requests: Optional[int] = None, cancel_on_timeout: bool = False) -> Response[Job]:
+        """
+        Submit a job to the service and wait for its end.
+
+        :param job: JobCreate information to use for the job.
+        :param timeout: Maximum time to wait in seconds, no limit by default.
+        :param max_requests: Maximum number of requests made while waiting, including the final job retrieval and the
+         cancellation, no limit by default. The submission is not counted.
+        :param cancel_on_timeout: If True, cancel the job when the timeout or the request limit is reached.
+        :return: A Response[Job] containing either the job in its final state, the error from the service, or a 408
+         error if the timeout or the request limit was reached.
+        """
+        r = self.submit_job(job)
+        if r.is_error():
+            return r
+        return self.wait_for_job(r.value.id, job.type, timeout, max_requests, cancel_on_timeout)
+
     def get_bucket(self, itwin_id: str) -> Response[BucketResponse]:
         """
         Retrieve a bucket information for a given iTwin
@@ -266,7 +521,7 @@ class RealityCaptureService:
 
         return self._execute_request(method="GET", url=self._get_correct_url(Service.MODELING) + f"files",
                                      headers=self._get_header_v2(),
-                                     success_model=Files)
+                                     success_model=Files, cache_key=("service_files",))
 
     def get_detectors(self, detectors_filter: Optional[str] = None) -> Response[DetectorsMinimalResponse]:
         """
@@ -290,7 +545,8 @@ class RealityCaptureService:
         return self._execute_request(method="GET",
                                      url=url,
                                      headers=self._get_header_v2(),
-                                     success_model=DetectorsMinimalResponse)
+                                     success_model=DetectorsMinimalResponse,
+                                     cache_key=("detectors", detectors_filter))
 
     def get_detector(self, detector_name: str) -> Response[DetectorResponse]:
         """
@@ -308,7 +564,12 @@ class RealityCaptureService:
             return Response(status_code=400, value=None, error=DetailedErrorResponse(error=detailed_error))
 
         return self._execute_request(method="GET", url=url, headers=self._get_header_v2(),
-                                     success_model=DetectorResponse)
+                                     success_model=DetectorResponse, cache_key=("detector", detector_name))
+
+    @staticmethod
+    def _get_detector_cache_keys(detector_name: str) -> tuple:
+        # Changing a detector changes its details and may change the detector list
+        return ("detector", detector_name), ("detectors",)
 
     def create_detector(self, detector_create: DetectorBase) -> Response[DetectorResponse]:
         """
@@ -326,7 +587,8 @@ class RealityCaptureService:
             return Response(status_code=400, value=None, error=DetailedErrorResponse(error=detailed_error))
 
         return self._execute_request(method="POST", url=url, headers=self._get_header_v2(),
-                                     success_model=DetectorResponse, data=json_dump)
+                                     success_model=DetectorResponse, data=json_dump,
+                                     invalidated_keys=(("detectors",),))
 
     def update_detector(self, detector_name: str, detector_update: DetectorUpdate) -> Response[DetectorResponse]:
         """
@@ -346,7 +608,8 @@ class RealityCaptureService:
             return Response(status_code=400, value=None, error=DetailedErrorResponse(error=detailed_error))
 
         return self._execute_request(method="PATCH", url=url, headers=self._get_header_v2(),
-                                     success_model=DetectorResponse, data=json_dump)
+                                     success_model=DetectorResponse, data=json_dump,
+                                     invalidated_keys=self._get_detector_cache_keys(detector_name))
 
     def delete_detector(self, detector_name: str) -> Response[None]:
         """
@@ -363,7 +626,8 @@ class RealityCaptureService:
                                                                         f"{e}")
             return Response(status_code=400, value=None, error=DetailedErrorResponse(error=detailed_error))
 
-        return self._execute_request(method="DELETE", url=url, headers=self._get_header_v2())
+        return self._execute_request(method="DELETE", url=url, headers=self._get_header_v2(),
+                                     invalidated_keys=self._get_detector_cache_keys(detector_name))
 
     def create_detector_version(self, detector_name: str,
                                 version_create: DetectorVersionCreate) -> Response[DetectorVersionWithLinks]:
@@ -385,7 +649,8 @@ class RealityCaptureService:
             return Response(status_code=400, value=None, error=DetailedErrorResponse(error=detailed_error))
 
         return self._execute_request(method="POST", url=url, headers=self._get_header_v2(), data=json_dump,
-                                     success_model=DetectorVersionWithLinks)
+                                     success_model=DetectorVersionWithLinks,
+                                     invalidated_keys=self._get_detector_cache_keys(detector_name))
 
     def delete_detector_version(self, detector_name: str, detector_version: str) -> Response[None]:
         """
@@ -406,7 +671,8 @@ class RealityCaptureService:
                                                    f"{e}")
             return Response(status_code=400, value=None, error=DetailedErrorResponse(error=detailed_error))
 
-        return self._execute_request(method="DELETE", url=url, headers=self._get_header_v2())
+        return self._execute_request(method="DELETE", url=url, headers=self._get_header_v2(),
+                                     invalidated_keys=self._get_detector_cache_keys(detector_name))
 
     def publish_detector_version(self, detector_name: str, version_number: str) -> Response[None]:
         """
@@ -427,7 +693,8 @@ class RealityCaptureService:
                                                    f"{e}")
             return Response(status_code=400, value=None, error=DetailedErrorResponse(error=detailed_error))
 
-        return self._execute_request(method="POST", url=url, headers=self._get_header_v2())
+        return self._execute_request(method="POST", url=url, headers=self._get_header_v2(),
+                                     invalidated_keys=self._get_detector_cache_keys(detector_name))
 
     def unpublish_detector_version(self, detector_name: str, version_number: str) -> Response[None]:
         """
@@ -448,7 +715,8 @@ class RealityCaptureService:
                                                    f"{e}")
             return Response(status_code=400, value=None, error=DetailedErrorResponse(error=detailed_error))
 
-        return self._execute_request(method="POST", url=url, headers=self._get_header_v2())
+        return self._execute_request(method="POST", url=url, headers=self._get_header_v2(),
+                                     invalidated_keys=self._get_detector_cache_keys(detector_name))
 
     def complete_detector_version_upload(self, detector_name: str, version_number: str) -> Response[None]:
         """
@@ -469,7 +737,8 @@ class RealityCaptureService:
                                                    f"{e}")
             return Response(status_code=400, value=None, error=DetailedErrorResponse(error=detailed_error))
 
-        return self._execute_request(method="POST", url=url, headers=self._get_header_v2())
+        return self._execute_request(method="POST", url=url, headers=self._get_header_v2(),
+                                     invalidated_keys=self._get_detector_cache_keys(detector_name))
 
     def create_reality_data(self, reality_data: RealityDataCreate) -> Response[RealityData]:
         """
@@ -503,7 +772,8 @@ class RealityCaptureService:
         if itwin_id is not None:
             url += "?iTwinId=" + itwin_id
         return self._execute_request(method="GET", url=url, success_model=RealityData, data_key="realityData",
-                                     headers=self._get_header_v1())
+                                     headers=self._get_header_v1(),
+                                     cache_key=("reality_data", reality_data_id, itwin_id))
 
     def update_reality_data(self, reality_data_update: RealityDataUpdate,
                             reality_data_id: str) -> Response[RealityData]:
@@ -524,7 +794,8 @@ class RealityCaptureService:
 
         return self._execute_request(method="PATCH", url=self._get_reality_management_rd_url() + reality_data_id,
                                      success_model=RealityData, data=json_dump, data_key="realityData",
-                                     headers=self._get_header_v1())
+                                     headers=self._get_header_v1(),
+                                     invalidated_keys=(("reality_data", reality_data_id),))
 
     def delete_reality_data(self, reality_data_id: str) -> Response[None]:
         """
@@ -535,7 +806,8 @@ class RealityCaptureService:
         """
 
         return self._execute_request(method="DELETE", url=self._get_reality_management_rd_url() + reality_data_id,
-                                     headers=self._get_header_v1())
+                                     headers=self._get_header_v1(),
+                                     invalidated_keys=(("reality_data", reality_data_id),))
 
     def get_reality_data_write_access(self, reality_data_id: str,
                                       itwin_id: Optional[str] = None) -> Response[ContainerDetails]:
@@ -585,13 +857,44 @@ class RealityCaptureService:
             params = reality_data_filter.as_dict_for_service_call()
             encoded_params = urlencode(params)
             url = f"{url}?{encoded_params}"
-        header = self._get_header_v1()
-        header["Prefer"] = "return=minimal"
-        if prefer == Prefer.REPRESENTATION:
-            header["Prefer"] = "return=representation"
+        representation = "representation" if prefer == Prefer.REPRESENTATION else "minimal"
+        header = {**self._get_header_v1(), "Prefer": f"return={representation}"}
 
         return self._execute_request(method="GET", url=url, headers=header, success_model=RealityDatas)
 
+    @staticmethod
+    def _get_iter_reality_data_filter(reality_data_filter: Optional[RealityDataFilter],
+                                      max_items: Optional[int]) -> Optional[RealityDataFilter]:
+        # Do not ask for more reality data per page than needed
+        if max_items is None or (reality_data_filter is not None and reality_data_filter.top is not None
+                                 and reality_data_filter.top <= max_items):
+            return reality_data_filter
+        return (reality_data_filter or RealityDataFilter()).model_copy(update={"top": min(max_items, 1000)})
+
+    def iter_reality_data(self, reality_data_filter: Optional[RealityDataFilter] = None,
+                          prefer: Optional[Prefer] = None, max_items: Optional[int] = None,
+                          prefetch: bool = True) -> PageIterator[Union[RealityData, RealityDataMinimal]]:
+        """
+        Iterate lazily over the reality data you can access, following the pages transparently.
+
+        :param reality_data_filter: Optional filtering information.
+        :param prefer: Preferred representation of Reality Data in the response.
+        :param max_items: Maximum number of reality data to iterate over, no more pages are requested once it is
+         reached.
+        :param prefetch: If True, request the next page on a background thread while the current one is consumed.
+        :return: A PageIterator over the reality data. If a page request fails, the iteration stops and its response
+         is available in the ``error`` attribute of the iterator.
+        """
+        first_filter = self._get_iter_reality_data_filter(reality_data_filter, max_items)
+
+        def _fetch_page(token: Optional[str]) -> Response[RealityDatas]:
+            if token is None:
+                return self.list_reality_data(first_filter, prefer)
+            page_filter = (first_filter or RealityDataFilter()).model_copy(update={"continuation_token": token})
+            return self.list_reality_data(page_filter, prefer)
+
+        return PageIterator(_fetch_page, lambda rds: rds.reality_data, get_continuation_token, max_items, prefetch)
+
     def move_reality_data(self, reality_data_id: str, itwin_id: str) -> Response[None]:
         """
         Move a RealityData to a different iTwin.
@@ -604,4 +907,5 @@ class RealityCaptureService:
         return self._execute_request(method="PATCH",
                                      url=self._get_reality_management_rd_url() + reality_data_id + "/move",
                                      headers=self._get_header_v1(), success_model=None,
-                                     json={"iTwinId": itwin_id})
+                                     json={"iTwinId": itwin_id},
+                                     invalidated_keys=(("reality_data", reality_data_id),))
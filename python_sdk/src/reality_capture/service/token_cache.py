@@ -0,0 +1,121 @@
+import base64
+import json
+import logging
+import threading
+import time
+from typing import Optional
+
+_logger = logging.getLogger(__name__)
+
+
+def get_token_expiry(token: str) -> Optional[float]:
+    """
+    Read the expiry of a JWT access token.
+
+    :param token: Access token, with or without its ``Bearer`` prefix.
+    :return: The ``exp`` claim of the token as a Unix timestamp, None if the token is not a JWT or has no expiry.
+    """
+    parts = token.split(" ")[-1].split(".")
+    if len(parts) != 3:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(parts[1] + "=" * (-len(parts[1]) % 4)))
+        return float(payload["exp"])
+    except (ValueError, TypeError, KeyError):
+        return None
+
+
+class TokenCache:
+    """
+    Thread-safe cache in front of a token factory.
+
+    A JWT token is reused until it gets within ``refresh_margin`` seconds of its expiry. From then on, callers keep
+    getting the cached token while a single background thread fetches the next one, so requests do not wait for the
+    identity provider. Only the first call, and calls made after the token actually expired, wait for the factory.
+    Tokens that are not JWTs have no known expiry and are requested from the factory every time.
+    """
+
+    def __init__(self, token_factory, refresh_margin: float = 300.0) -> None:
+        """
+        Constructor method
+
+        :param token_factory: An object that implements a ``get_token() -> str`` method.
+        :param refresh_margin: Time in seconds before the expiry of the token from which it is refreshed.
+        """
+        self._token_factory = token_factory
+        self._refresh_margin = refresh_margin
+        self._token = None
+        self._expiry = 0.0
+        self._lock = threading.Lock()
+        # Held while calling the factory, so that concurrent callers share a single fetch
+        self._fetch_lock = threading.Lock()
+        self._refreshing = False
+        self._opaque = False
+
+    def _get_cached(self) -> Optional[str]:
+        with self._lock:
+            return self._token if self._token is not None and self._expiry > time.time() else None
+
+    def _fetch(self) -> str:
+        token = self._token_factory.get_token()
+        expiry = get_token_expiry(token)
+        with self._lock:
+            self._token = token if expiry is not None else None
+            self._expiry = expiry or 0.0
+            self._opaque = expiry is None
+        return token
+
+    def _refresh(self) -> None:
+        try:
+            with self._fetch_lock:
+                self._fetch()
+        except Exception:
+            # The cached token is still valid, the next call tries again
+            _logger.exception("Background token refresh failed")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def get_cached_token(self) -> Optional[str]:
+        """
+        Return the cached token without ever waiting for the token factory, starting a background refresh if it is
+        about to expire.
+
+        :return: Access token, None if the token factory has to be called.
+        """
+        with self._lock:
+            token, remaining = self._token, self._expiry - time.time()
+            refresh = token is not None and 0 < remaining <= self._refresh_margin and not self._refreshing
+            if refresh:
+                self._refreshing = True
+        if token is None or remaining <= 0:
+            return None
+        if refresh:
+            threading.Thread(target=self._refresh, name="TokenRefresh", daemon=True).start()
+        return token
+
+    def get_token(self) -> str:
+        """
+        Return a valid token, from the cache if possible.
+
+        :return: Access token, as returned by the token factory.
+        """
+        token = self.get_cached_token()
+        if token is not None:
+            return token
+        with self._lock:
+            opaque = self._opaque
+        if opaque:
+            # Nothing to share between callers, the factory handles its own caching
+            return self._fetch()
+        with self._fetch_lock:
+            token = self._get_cached()
+            return token if token is not None else self._fetch()
+
+    def invalidate(self) -> None:
+        """
+        Drop the cached token, for instance after the service rejected it.
+        """
+        with self._lock:
+            self._token = None
+            self._expiry = 0.0
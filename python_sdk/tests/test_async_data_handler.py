@@ -0,0 +1,206 @@
+import asyncio
+import datetime
+import os
+import tempfile
+import threading
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from reality_capture.service.async_data_handler import AsyncRealityDataHandler, _AsyncDataHandler
+from reality_capture.service.data_handler import TransferOptions, _DataHandler
+from reality_capture.service.response import Response
+
+
+class FakeTokenFactory:
+    @staticmethod
+    def get_token() -> str:
+        return "Bearer invalid"
+
+
+async def async_items(items):
+    for item in items:
+        yield item
+
+
+def remote_blob(name, size):
+    return SimpleNamespace(name=name, size=size,
+                           last_modified=datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc))
+
+
+@pytest.fixture
+def mock_async_container_client():
+    client = MagicMock()
+    client.upload_blob = AsyncMock()
+    client.download_blob = AsyncMock()
+    client.delete_blobs = AsyncMock()
+    client.close = AsyncMock()
+    with patch.object(_AsyncDataHandler, "_get_container_client", return_value=client):
+        yield client
+
+
+class TestAsyncDataHandler:
+    def test_run_workers_bounded(self):
+        running = []
+        peak = []
+
+        async def worker(task):
+            running.append(task)
+            peak.append(len(running))
+            await asyncio.sleep(0.001)
+            running.remove(task)
+
+        asyncio.run(_AsyncDataHandler._run_workers(range(50), worker, 4))
+        assert max(peak) == 4
+
+    def test_run_workers_error_cancels(self):
+        pulled = []
+
+        def tasks():
+            for i in range(1000):
+                pulled.append(i)
+                yield i
+
+        async def worker(task):
+            if task == 3:
+                raise InterruptedError("stop")
+            await asyncio.sleep(0.01)
+
+        with pytest.raises(InterruptedError):
+            asyncio.run(_AsyncDataHandler._run_workers(tasks(), worker, 4))
+        assert len(pulled) < 1000
+
+    def test_upload_data(self, mock_async_container_client):
+        async def upload(name, data, **kwargs):
+            await kwargs["progress_hook"](2, None)
+
+        mock_async_container_client.upload_blob.side_effect = upload
+        reports = []
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for i in range(20):
+                with open(os.path.join(tmp_dir, f"{i}.jpg"), "wb") as f:
+                    f.write(b"data")
+            r = asyncio.run(_AsyncDataHandler.upload_data("https://account.blob.core.windows.net/container?sig=abc",
+                                                          tmp_dir, "images", lambda p: reports.append(p) or True,
+                                                          TransferOptions(progress_interval=0)))
+        assert r.get_response_status_code() == 200
+        assert mock_async_container_client.upload_blob.await_count == 20
+        assert sorted(c.args[0] for c in mock_async_container_client.upload_blob.call_args_list) == sorted(
+            os.path.join("images", f"{i}.jpg") for i in range(20))
+        assert reports[-1].percentage == 100
+        mock_async_container_client.close.assert_awaited_once()
+
+    def test_walk_off_loop(self, mock_async_container_client):
+        threads = []
+
+        iter_files = _DataHandler._iter_files
+
+        def _iter_files(path):
+            threads.append(threading.get_ident())
+            yield from iter_files(path)
+
+        with tempfile.TemporaryDirectory() as tmp_dir, patch.object(_DataHandler, "_iter_files",
+                                                                    side_effect=_iter_files):
+            with open(os.path.join(tmp_dir, "a.jpg"), "wb") as f:
+                f.write(b"data")
+            r = asyncio.run(_AsyncDataHandler.upload_data("https://account.blob.core.windows.net/container?sig=abc",
+                                                          tmp_dir, "", None))
+        assert r.get_response_status_code() == 200
+        assert threads and threading.get_ident() not in threads
+
+    def test_upload_data_interrupted(self, mock_async_container_client):
+        async def upload(name, data, **kwargs):
+            await kwargs["progress_hook"](2, None)
+
+        mock_async_container_client.upload_blob.side_effect = upload
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with open(os.path.join(tmp_dir, "a.jpg"), "wb") as f:
+                f.write(b"data")
+            r = asyncio.run(_AsyncDataHandler.upload_data("https://account.blob.core.windows.net/container?sig=abc",
+                                                          tmp_dir, "", lambda p: False))
+        assert r.get_response_status_code() == 499
+        assert r.error.error.code == "UploadInterrupted"
+
+    def test_download_data(self, mock_async_container_client):
+        mock_async_container_client.list_blobs.return_value = async_items([remote_blob("scan/a.jpg", 7),
+                                                                           remote_blob("other/b.jpg", 7)])
+
+        async def readinto(stream):
+            stream.write(b"content")
+
+        mock_async_container_client.download_blob.return_value = SimpleNamespace(readinto=readinto)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            r = asyncio.run(_AsyncDataHandler.download_data("https://account.blob.core.windows.net/container?sig=abc",
+                                                            tmp_dir, "scan", None))
+            assert r.get_response_status_code() == 200
+            with open(os.path.join(tmp_dir, "a.jpg"), "rb") as f:
+                assert f.read() == b"content"
+        mock_async_container_client.download_blob.assert_awaited_once()
+
+    def test_download_data_failure(self, mock_async_container_client):
+        mock_async_container_client.list_blobs.return_value = async_items([remote_blob("a.jpg", 7)])
+        mock_async_container_client.download_blob.side_effect = Exception("this is a test")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            r = asyncio.run(_AsyncDataHandler.download_data("https://account.blob.core.windows.net/container?sig=abc",
+                                                            tmp_dir, "", None))
+        assert r.get_response_status_code() == 500
+        assert r.error.error.code == "DownloadFailure"
+
+    def test_delete_prefix(self, mock_async_container_client):
+        names = [f"scan/{i}.jpg" for i in range(300)]
+        mock_async_container_client.list_blob_names.return_value = async_items(names)
+
+        async def delete_blobs(*batch, **kwargs):
+            return async_items([SimpleNamespace(status_code=404 if name == "scan/7.jpg" else 202) for name in batch])
+
+        mock_async_container_client.delete_blobs.side_effect = delete_blobs
+        r = asyncio.run(_AsyncDataHandler.delete_prefix("https://account.blob.core.windows.net/container?sig=abc",
+                                                        "scan/"))
+        assert r.get_response_status_code() == 400
+        assert [detail.target for detail in r.error.error.details] == ["scan/7.jpg"]
+        assert sorted(len(c.args) for c in mock_async_container_client.delete_blobs.call_args_list) == [44, 256]
+        mock_async_container_client.list_blob_names.assert_called_once_with(name_starts_with="scan/")
+
+
+class TestAsyncRealityDataHandler:
+    def test_upload_data_authoring(self, mock_async_container_client):
+        link = SimpleNamespace(links=SimpleNamespace(container_url=SimpleNamespace(
+            href="https://account.blob.core.windows.net/container?sig=abc")))
+
+        async def _main():
+            async with AsyncRealityDataHandler(FakeTokenFactory()) as handler:
+                handler._service.get_reality_data_write_access = AsyncMock(return_value=Response(200, None, link))
+                handler._service.update_reality_data = AsyncMock(return_value=Response(200, None, None))
+                with tempfile.TemporaryDirectory() as tmp_dir:
+                    with open(os.path.join(tmp_dir, "a.jpg"), "wb") as f:
+                        f.write(b"data")
+                    r = await handler.upload_data("d91751e9-9a24-417a-a29c-071c0dca33f0", tmp_dir)
+                return r, handler._service.update_reality_data.call_args_list
+
+        r, authoring_calls = asyncio.run(_main())
+        assert r.get_response_status_code() == 200
+        assert [c.args[0].authoring for c in authoring_calls] == [True, False]
+        mock_async_container_client.upload_blob.assert_awaited_once()
+
+    def test_upload_session(self, mock_async_container_client):
+        link = SimpleNamespace(links=SimpleNamespace(container_url=SimpleNamespace(
+            href="https://account.blob.core.windows.net/container?sig=abc")))
+
+        async def _main():
+            async with AsyncRealityDataHandler(FakeTokenFactory()) as handler:
+                handler._service.get_reality_data_write_access = AsyncMock(return_value=Response(200, None, link))
+                handler._service.update_reality_data = AsyncMock(return_value=Response(200, None, None))
+                with tempfile.TemporaryDirectory() as tmp_dir:
+                    with open(os.path.join(tmp_dir, "a.jpg"), "wb") as f:
+                        f.write(b"data")
+                    async with handler.upload_session("d91751e9-9a24-417a-a29c-071c0dca33f0") as session:
+                        results = await asyncio.gather(*[session.upload(tmp_dir, f"dst{i}") for i in range(5)])
+                return results, handler._service.update_reality_data.call_args_list
+
+        results, authoring_calls = asyncio.run(_main())
+        assert all(not r.is_error() for r in results)
+        assert [c.args[0].authoring for c in authoring_calls] == [True, False]
+        assert mock_async_container_client.upload_blob.await_count == 5
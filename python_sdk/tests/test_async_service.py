@@ -0,0 +1,249 @@
+import asyncio
+import http.server
+import json
+import os
+import threading
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from reality_capture.service.async_service import AsyncRealityCaptureService
+from reality_capture.service.instrumentation import MetricsCollector
+from reality_capture.service.job import Service, JobCreate, JobType
+from reality_capture.service.reality_data import RealityDataCreate, Prefer
+from reality_capture.service.response_cache import ResponseCache
+import reality_capture.specifications.fill_image_properties as fip
+
+
+class FakeTokenFactory:
+    @staticmethod
+    def get_token() -> str:
+        return "Bearer invalid"
+
+
+class _ApiRequestHandler(http.server.BaseHTTPRequestHandler):
+    def _reply(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.server.requests.append((self.command, self.path, dict(self.headers), self.rfile.read(length)))
+        route = self.server.routes.get((self.command, self.path.split("?")[0]), (404, ""))
+        if isinstance(route, list):
+            # Successive replies, the last one is repeated
+            route = route.pop(0) if len(route) > 1 else route[0]
+        status, body, *headers = route
+        payload = body if isinstance(body, str) else json.dumps(body)
+        self.send_response(status)
+        for name, value in (headers[0] if headers else {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload.encode())
+
+    do_GET = do_POST = do_PATCH = do_DELETE = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def api_server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _ApiRequestHandler)
+    server.routes = {}
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestAsyncService:
+    def setup_method(self, _):
+        cf = os.path.dirname(os.path.abspath(__file__))
+        self.data_folder = os.path.join(cf, "data")
+
+    def _load(self, name):
+        with open(os.path.join(self.data_folder, name), 'r') as payload_data:
+            return json.load(payload_data)
+
+    def _run(self, server, call):
+        async def _main():
+            async with AsyncRealityCaptureService(FakeTokenFactory()) as service:
+                service._service_url = f"http://127.0.0.1:{server.server_port}/"
+                return await call(service)
+
+        return asyncio.run(_main())
+
+    def test_get_job_200(self, api_server):
+        job_id = "6b1d5fb8-c5a4-4b7c-8e42-0f35f0e3aa2c"
+        api_server.routes[("GET", f"/reality-modeling/jobs/{job_id}")] = (200, self._load("job_get_200.json"))
+        response = self._run(api_server, lambda s: s.get_job(job_id, Service.MODELING))
+        assert not response.is_error()
+        assert response.value.id == self._load("job_get_200.json")["job"]["id"]
+        headers = api_server.requests[0][2]
+        assert headers["Authorization"] == "Bearer invalid"
+        assert headers["Accept"] == "application/vnd.bentley.itwin-platform.v2+json"
+
+    def test_get_job_401(self, api_server):
+        job_id = "6b1d5fb8-c5a4-4b7c-8e42-0f35f0e3aa2c"
+        api_server.routes[("GET", f"/reality-modeling/jobs/{job_id}")] = (
+            401, {"error": {"code": "HeaderNotFound",
+                            "message": "Header Authorization was not found in the request. Access denied."}})
+        response = self._run(api_server, lambda s: s.get_job(job_id, Service.MODELING))
+        assert response.is_error()
+        assert response.get_response_status_code() == 401
+        assert response.error.error.code == "HeaderNotFound"
+
+    def test_error_ill_formed(self, api_server):
+        api_server.routes[("GET", "/reality-modeling/jobs")] = (400, "not json")
+        response = self._run(api_server, lambda s: s.get_jobs(Service.MODELING, "state eq 'Active'"))
+        assert response.is_error()
+        assert response.get_response_status_code() == 400
+        assert response.error.error.code == "UnknownError"
+
+    def test_success_ill_formed(self, api_server):
+        api_server.routes[("GET", "/reality-modeling/files")] = (200, {"bad": "response"})
+        response = self._run(api_server, lambda s: s.get_service_files())
+        assert response.is_error()
+        assert response.get_response_status_code() == 502
+        assert response.error.error.code == "InvalidResponse"
+
+    def test_network_error(self, api_server):
+        port = api_server.server_port
+        api_server.shutdown()
+        api_server.server_close()
+
+        async def _main():
+            async with AsyncRealityCaptureService(FakeTokenFactory()) as service:
+                service._service_url = f"http://127.0.0.1:{port}/"
+                return await service.get_service_files()
+
+        response = asyncio.run(_main())
+        assert response.get_response_status_code() == 503
+        assert response.error.error.code == "NetworkError"
+
+    def test_bad_request_not_sent(self, api_server):
+        job = JobCreate(name="Fill Image Properties", type=JobType.FILL_IMAGE_PROPERTIES,
+                        iTwinId="2c8e4988-eb9b-4e5f-a903-8c7c18f3030a",
+                        specifications=fip.FillImagePropertiesSpecificationsCreate(
+                            inputs=fip.FillImagePropertiesInputs(imageCollections=["a"]),
+                            outputs=[fip.FillImagePropertiesOutputsCreate.SCENE]))
+        response = self._run(api_server, lambda s: s.get_job("id", "Unknown"))
+        assert response.get_response_status_code() == 400
+        assert not api_server.requests
+        api_server.routes[("POST", "/reality-modeling/jobs")] = (201, self._load("job_create_201.json"))
+        response = self._run(api_server, lambda s: s.submit_job(job))
+        assert not response.is_error()
+        assert json.loads(api_server.requests[0][3])["type"] == "FillImageProperties"
+
+    def test_submit_jobs(self, api_server):
+        api_server.routes[("POST", "/reality-modeling/jobs")] = [
+            (422, {"error": {"code": "InvalidJobSpecifications", "message": "Bad inputs."}}),
+            (201, self._load("job_create_201.json"))]
+        jobs = [JobCreate(name=f"job{i}", type=JobType.FILL_IMAGE_PROPERTIES,
+                          iTwinId="2c8e4988-eb9b-4e5f-a903-8c7c18f3030a",
+                          specifications=fip.FillImagePropertiesSpecificationsCreate(
+                              inputs=fip.FillImagePropertiesInputs(imageCollections=["a"]),
+                              outputs=[fip.FillImagePropertiesOutputsCreate.SCENE])) for i in range(6)]
+        results = self._run(api_server, lambda s: s.submit_jobs(jobs, max_parallel=2))
+        assert len(results) == 6
+        assert sum(r.is_error() for r in results) == 1
+        assert len(api_server.requests) == 6
+
+    def test_concurrent_requests_keep_their_headers(self, api_server):
+        rd_id = "d91751e9-9a24-417a-a29c-071c0dca33f0"
+        job_id = "6b1d5fb8-c5a4-4b7c-8e42-0f35f0e3aa2c"
+        api_server.routes[("GET", f"/reality-modeling/jobs/{job_id}")] = (200, self._load("job_get_200.json"))
+        api_server.routes[("GET", f"/reality-management/reality-data/{rd_id}")] = (
+            200, self._load("reality_data_get_200.json"))
+        api_server.routes[("GET", "/reality-management/reality-data/")] = (
+            200, self._load("reality_data_list_representation_200.json"))
+
+        async def _calls(service):
+            return await asyncio.gather(service.get_job(job_id, Service.MODELING),
+                                        service.get_reality_data(rd_id),
+                                        service.list_reality_data(prefer=Prefer.REPRESENTATION))
+
+        responses = self._run(api_server, _calls)
+        assert all(not r.is_error() for r in responses)
+        accepts = {path.split("?")[0]: headers["Accept"] for _, path, headers, _ in api_server.requests}
+        assert accepts[f"/reality-modeling/jobs/{job_id}"] == "application/vnd.bentley.itwin-platform.v2+json"
+        assert accepts[f"/reality-management/reality-data/{rd_id}"] == "application/vnd.bentley.itwin-platform.v1+json"
+        prefers = {path: headers.get("Prefer") for _, path, headers, _ in api_server.requests}
+        assert prefers["/reality-management/reality-data/"] == "return=representation"
+
+    def test_token_fetched_off_loop(self, api_server):
+        api_server.routes[("GET", "/reality-modeling/files")] = (200, self._load("files_get_200.json"))
+        threads = []
+
+        class BlockingTokenFactory:
+            @staticmethod
+            def get_token() -> str:
+                threads.append(threading.get_ident())
+                return "Bearer invalid"
+
+        async def _main():
+            async with AsyncRealityCaptureService(BlockingTokenFactory()) as service:
+                service._service_url = f"http://127.0.0.1:{api_server.server_port}/"
+                return await service.get_service_files()
+
+        assert not asyncio.run(_main()).is_error()
+        assert threads and threading.get_ident() not in threads
+        assert api_server.requests[0][2]["Authorization"] == "Bearer invalid"
+
+    def test_throttled_request_retried(self, api_server):
+        job_id = "6b1d5fb8-c5a4-4b7c-8e42-0f35f0e3aa2c"
+        api_server.routes[("GET", f"/reality-modeling/jobs/{job_id}")] = [
+            (429, {"error": {"code": "TooManyRequests", "message": "Slow down."}}, {"Retry-After": "0"}),
+            (200, self._load("job_get_200.json"))]
+        response = self._run(api_server, lambda s: s.get_job(job_id, Service.MODELING))
+        assert not response.is_error()
+        assert len(api_server.requests) == 2
+
+    def test_create_reality_data(self, api_server):
+        api_server.routes[("POST", "/reality-management/reality-data/")] = (
+            201, self._load("reality_data_create_201.json"))
+        rdc = RealityDataCreate(iTwinId="2c8e4988-eb9b-4e5f-a903-8c7c18f3030a", displayName="test",
+                                type="CCImageCollection")
+        response = self._run(api_server, lambda s: s.create_reality_data(rdc))
+        assert not response.is_error()
+        assert response.get_response_status_code() == 201
+
+    def test_response_cache(self, api_server):
+        rd_id = "95d8dccd-d89e-4287-bb5f-3219acbc71ae"
+        api_server.routes[("GET", f"/reality-management/reality-data/{rd_id}")] = (
+            200, self._load("reality_data_get_200.json"), {"ETag": '"v1"'})
+        api_server.routes[("DELETE", f"/reality-management/reality-data/{rd_id}")] = (204, "")
+        cache = ResponseCache()
+
+        async def _main():
+            async with AsyncRealityCaptureService(FakeTokenFactory(), response_cache=cache) as service:
+                service._service_url = f"http://127.0.0.1:{api_server.server_port}/"
+                responses = [await service.get_reality_data(rd_id), await service.get_reality_data(rd_id)]
+                await service.delete_reality_data(rd_id)
+                responses.append(await service.get_reality_data(rd_id))
+                return responses
+
+        responses = asyncio.run(_main())
+        assert all(not r.is_error() for r in responses)
+        assert responses[0].value == responses[1].value
+        assert [method for method, *_ in api_server.requests] == ["GET", "DELETE", "GET"]
+        assert api_server.requests[2][2].get("If-None-Match") is None
+        assert cache.get_stats().hits == 1
+
+    def test_instrumentation(self, api_server):
+        rd_id = "95d8dccd-d89e-4287-bb5f-3219acbc71ae"
+        api_server.routes[("GET", f"/reality-management/reality-data/{rd_id}")] = [
+            (503, "", {"Retry-After": "0"}), (200, self._load("reality_data_get_200.json"))]
+        collector = MetricsCollector()
+
+        async def _main():
+            async with AsyncRealityCaptureService(FakeTokenFactory(), instrumentation=collector) as service:
+                service._service_url = f"http://127.0.0.1:{api_server.server_port}/"
+                return await service.get_reality_data(rd_id)
+
+        assert not asyncio.run(_main()).is_error()
+        summary = collector.get_summary()["GET reality-management/reality-data/{id}"]
+        assert (summary.count, summary.errors, summary.retries) == (1, 0, 1)
+        assert summary.bytes > 0
+        assert set(summary.phases) == {"token", "wait", "network", "decode", "validation"}
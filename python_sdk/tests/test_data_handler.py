@@ -1,9 +1,18 @@
+import datetime
+import hashlib
+import http.server
 import json
 import os
+import threading
 from collections import namedtuple
+from types import SimpleNamespace
 
 import responses
-from reality_capture.service.data_handler import RealityDataHandler, BucketDataHandler
+from reality_capture.service.data_handler import (RealityDataHandler, BucketDataHandler, TransferOptions, _DataHandler,
+                                                  _ConcurrencyController, _ProgressAggregator, TransferProgress)
+from reality_capture.service.error import DetailedErrorResponse
+from reality_capture.service.response import Response
+from multiprocessing.pool import ThreadPool
 from unittest.mock import patch, MagicMock
 import pytest
 import tempfile
@@ -24,6 +33,40 @@ def mock_blob_except(*args, **kwargs):
     raise Exception("this is a test")
 
 
+def remote_blob(name, content, content_md5=True):
+    md5 = bytearray(hashlib.md5(content).digest()) if content_md5 else None
+    return SimpleNamespace(name=name, size=len(content),
+                           content_settings=SimpleNamespace(content_md5=md5),
+                           last_modified=datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc))
+
+
+class _BlobRequestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_PUT(self):
+        self.server.connections.add(self.client_address)
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(201)
+        self.send_header("Content-Length", "0")
+        self.send_header("ETag", '"0x1"')
+        self.send_header("Last-Modified", "Mon, 01 Jan 2024 00:00:00 GMT")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def local_blob_server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _BlobRequestHandler)
+    server.connections = set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
 @pytest.fixture
 def mock_container_client_default():
     with patch("azure.storage.blob.ContainerClient.from_container_url") as mock_client:
@@ -260,7 +303,7 @@ class TestRealityDataHandler:
         MyBlob = namedtuple("MyBlob", ["name", "size"])
         mock_client_instance.list_blobs.return_value = [MyBlob("a.txt", 100)]
         mock_stream = MagicMock()
-        mock_stream.readall.return_value = b"mocked file content"
+        mock_stream.readinto.side_effect = lambda stream: stream.write(b"mocked file content")
         mock_client_instance.download_blob.return_value = mock_stream
 
         rd_id = "d91751e9-9a24-417a-a29c-071c0dca33f0"
@@ -274,7 +317,189 @@ class TestRealityDataHandler:
             r = self.rdh.download_data(rd_id, tmp_dir)
             assert not r.is_error()
             assert r.get_response_status_code() == 200
-            assert os.path.exists(os.path.join(tmp_dir, "a.txt"))
+            with open(os.path.join(tmp_dir, "a.txt"), "rb") as f:
+                assert f.read() == b"mocked file content"
+
+    @responses.activate
+    def test_download_data_chunk_size(self, mock_container_client_default):
+        mock_client_class, mock_client_instance = mock_container_client_default
+        MyBlob = namedtuple("MyBlob", ["name", "size"])
+        mock_client_instance.list_blobs.return_value = [MyBlob("a.txt", 10 * 1024)]
+
+        rd_id = "d91751e9-9a24-417a-a29c-071c0dca33f0"
+        with open(f"{self.data_folder}/reality_data_read_access_200.json", 'r') as payload_data:
+            payload = json.load(payload_data)
+        responses.add(responses.GET,
+                      f'https://api.bentley.com/reality-management/reality-data/{rd_id}/readaccess',
+                      json=payload, status=200)
+
+        self.rdh.set_transfer_options(TransferOptions(chunk_size=1024, max_concurrency=2))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            r = self.rdh.download_data(rd_id, tmp_dir)
+        assert not r.is_error()
+        _, kwargs = mock_client_class.call_args
+        assert kwargs["max_single_get_size"] == 1024
+        assert kwargs["max_chunk_get_size"] == 1024
+        _, kwargs = mock_client_instance.download_blob.call_args
+        assert kwargs["max_concurrency"] == 2
+        mock_client_instance.download_blob.return_value.readall.assert_not_called()
+        mock_client_instance.download_blob.return_value.readinto.assert_called_once()
+
+    @responses.activate
+    def test_upload_data_sync(self, mock_container_client_default):
+        mock_client_class, mock_client_instance = mock_container_client_default
+        mock_client_instance.upload_blob.side_effect = mock_blob
+
+        rd_id = "d91751e9-9a24-417a-a29c-071c0dca33f0"
+        with open(f"{self.data_folder}/reality_data_read_access_200.json", 'r') as payload_data:
+            payload = json.load(payload_data)
+        with open(f"{self.data_folder}/reality_data_get_200.json", 'r') as payload_data:
+            pl_author = json.load(payload_data)
+        responses.add(responses.GET,
+                      f'https://api.bentley.com/reality-management/reality-data/{rd_id}/writeaccess',
+                      json=payload, status=200)
+        responses.add(responses.PATCH,
+                      f'https://api.bentley.com/reality-management/reality-data/{rd_id}',
+                      json=pl_author, status=200)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for name in ["same.txt", "changed.txt", "edited.txt", "new.txt"]:
+                with open(os.path.join(tmp_dir, name), "wb") as f:
+                    f.write(b"local " + name.encode())
+            mock_client_instance.list_blobs.return_value = [remote_blob("same.txt", b"local same.txt"),
+                                                            remote_blob("changed.txt", b"remote changed"),
+                                                            remote_blob("edited.txt", b"local EDITED.txt")]
+            with patch.object(_DataHandler, "_get_md5", wraps=_DataHandler._get_md5) as get_md5:
+                r = self.rdh.upload_data(rd_id, tmp_dir, sync=True)
+        assert not r.is_error()
+        uploaded = sorted(c.args[0] for c in mock_client_instance.upload_blob.call_args_list)
+        assert uploaded == ["changed.txt", "edited.txt", "new.txt"]
+        # Each file is read once, the MD5 of a changed file of the same size is reused for the upload
+        assert get_md5.call_count == 4
+        content_md5 = mock_client_instance.upload_blob.call_args.kwargs["content_settings"].content_md5
+        assert len(content_md5) == 16
+
+    @responses.activate
+    def test_download_data_sync(self, mock_container_client_default):
+        mock_client_class, mock_client_instance = mock_container_client_default
+        mock_stream = MagicMock()
+        mock_stream.readinto.side_effect = lambda stream: stream.write(b"remote content")
+        mock_client_instance.download_blob.return_value = mock_stream
+
+        rd_id = "d91751e9-9a24-417a-a29c-071c0dca33f0"
+        with open(f"{self.data_folder}/reality_data_read_access_200.json", 'r') as payload_data:
+            payload = json.load(payload_data)
+        responses.add(responses.GET,
+                      f'https://api.bentley.com/reality-management/reality-data/{rd_id}/readaccess',
+                      json=payload, status=200)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with open(os.path.join(tmp_dir, "same.txt"), "wb") as f:
+                f.write(b"remote content")
+            mock_client_instance.list_blobs.return_value = [remote_blob("same.txt", b"remote content"),
+                                                            remote_blob("other.txt", b"remote content", False)]
+            r = self.rdh.download_data(rd_id, tmp_dir, sync=True)
+            assert not r.is_error()
+            assert [c.args[0] for c in mock_client_instance.download_blob.call_args_list] == ["other.txt"]
+
+            # Files without MD5 are compared on size and modification time, aligned after the download
+            mock_client_instance.download_blob.reset_mock()
+            r = self.rdh.download_data(rd_id, tmp_dir, sync=True)
+            assert not r.is_error()
+            mock_client_instance.download_blob.assert_not_called()
+
+    def _add_copy_responses(self, src_id, dst_id):
+        with open(f"{self.data_folder}/reality_data_read_access_200.json", 'r') as payload_data:
+            payload = json.load(payload_data)
+        with open(f"{self.data_folder}/reality_data_get_200.json", 'r') as payload_data:
+            pl_author = json.load(payload_data)
+        responses.add(responses.GET,
+                      f'https://api.bentley.com/reality-management/reality-data/{src_id}/readaccess',
+                      json=payload, status=200)
+        responses.add(responses.GET,
+                      f'https://api.bentley.com/reality-management/reality-data/{dst_id}/writeaccess',
+                      json=payload, status=200)
+        responses.add(responses.PATCH,
+                      f'https://api.bentley.com/reality-management/reality-data/{dst_id}',
+                      json=pl_author, status=200)
+
+    @responses.activate
+    def test_copy_data_link_error(self):
+        src_id = "d91751e9-9a24-417a-a29c-071c0dca33f0"
+        responses.add(responses.GET,
+                      f'https://api.bentley.com/reality-management/reality-data/{src_id}/readaccess',
+                      json={"error": {"code": "HeaderNotFound",
+                                      "message": "Header Authorization was not found in the request. Access denied."}},
+                      status=401)
+        r = self.rdh.copy_data(src_id, "8b1d3c5e-2f7a-4a6b-9c0d-1e2f3a4b5c6d")
+        assert r.is_error()
+        assert r.get_response_status_code() == 401
+        assert r.error.error.code == "HeaderNotFound"
+
+    @responses.activate
+    @patch("reality_capture.service.data_handler.time.sleep")
+    def test_copy_data_ok(self, mock_sleep, mock_container_client_default):
+        mock_client_class, mock_client_instance = mock_container_client_default
+        src_id = "d91751e9-9a24-417a-a29c-071c0dca33f0"
+        dst_id = "8b1d3c5e-2f7a-4a6b-9c0d-1e2f3a4b5c6d"
+        self._add_copy_responses(src_id, dst_id)
+        mock_client_instance.list_blobs.return_value = [remote_blob("scan/a.jpg", b"a" * 10),
+                                                        remote_blob("scan/b.jpg", b"b" * 20)]
+        blob_client = mock_client_instance.get_blob_client.return_value
+        blob_client.url = "https://account.blob.core.windows.net/src/scan/a.jpg?sig=read"
+        blob_client.start_copy_from_url.return_value = {"copy_id": "id", "copy_status": "pending"}
+        blob_client.get_blob_properties.side_effect = [
+            SimpleNamespace(copy=SimpleNamespace(status="pending", progress="5/10")),
+            SimpleNamespace(copy=SimpleNamespace(status="success", progress="10/10")),
+            SimpleNamespace(copy=SimpleNamespace(status="success", progress="20/20")),
+        ]
+        reports = []
+        self.rdh.set_transfer_options(TransferOptions(progress_interval=0))
+        self.rdh.set_transfer_progress_hook(lambda p: reports.append(p) or True)
+        r = self.rdh.copy_data(src_id, dst_id, "scan/")
+        assert not r.is_error()
+        assert r.get_response_status_code() == 200
+        mock_client_instance.list_blobs.assert_called_once_with(name_starts_with="scan/")
+        blob_client.start_copy_from_url.assert_called_with("https://account.blob.core.windows.net/src/scan/a.jpg"
+                                                           "?sig=read")
+        assert blob_client.start_copy_from_url.call_count == 2
+        assert reports[-1].transferred == 30 and reports[-1].total == 30
+        # Authoring is set on the destination before the copy and released after it
+        patches = [json.loads(c.request.body) for c in responses.calls if c.request.method == "PATCH"]
+        assert patches == [{"authoring": True}, {"authoring": False}]
+
+    @responses.activate
+    def test_copy_data_failed(self, mock_container_client_default):
+        mock_client_class, mock_client_instance = mock_container_client_default
+        src_id = "d91751e9-9a24-417a-a29c-071c0dca33f0"
+        dst_id = "8b1d3c5e-2f7a-4a6b-9c0d-1e2f3a4b5c6d"
+        self._add_copy_responses(src_id, dst_id)
+        mock_client_instance.list_blobs.return_value = [remote_blob("a.jpg", b"a")]
+        blob_client = mock_client_instance.get_blob_client.return_value
+        blob_client.start_copy_from_url.return_value = {"copy_id": "id", "copy_status": "failed"}
+        r = self.rdh.copy_data(src_id, dst_id)
+        assert r.is_error()
+        assert r.get_response_status_code() == 500
+        assert r.error.error.code == "CopyFailure"
+
+    @responses.activate
+    @patch("reality_capture.service.data_handler.time.sleep")
+    def test_copy_data_interrupted(self, mock_sleep, mock_container_client_default):
+        mock_client_class, mock_client_instance = mock_container_client_default
+        src_id = "d91751e9-9a24-417a-a29c-071c0dca33f0"
+        dst_id = "8b1d3c5e-2f7a-4a6b-9c0d-1e2f3a4b5c6d"
+        self._add_copy_responses(src_id, dst_id)
+        mock_client_instance.list_blobs.return_value = [remote_blob("a.jpg", b"a" * 10)]
+        blob_client = mock_client_instance.get_blob_client.return_value
+        blob_client.start_copy_from_url.return_value = {"copy_id": "id", "copy_status": "pending"}
+        blob_client.get_blob_properties.return_value = SimpleNamespace(
+            copy=SimpleNamespace(status="pending", progress="5/10"))
+        self.rdh.set_progress_hook(lambda x: False)
+        r = self.rdh.copy_data(src_id, dst_id)
+        assert r.is_error()
+        assert r.get_response_status_code() == 499
+        assert r.error.error.code == "CopyInterrupted"
+        blob_client.abort_copy.assert_called_once_with("id")
 
     @responses.activate
     def test_delete_data_link_error(self):
@@ -293,7 +518,7 @@ class TestRealityDataHandler:
     @responses.activate
     def test_delete_bucket_fail(self, mock_container_client_default):
         mock_client_class, mock_client_instance = mock_container_client_default
-        mock_client_instance.delete_blob.side_effect = mock_blob_except
+        mock_client_instance.delete_blobs.side_effect = mock_blob_except
 
         rd_id = "d91751e9-9a24-417a-a29c-071c0dca33f0"
         with open(f"{self.data_folder}/reality_data_read_access_200.json", 'r') as payload_data:
@@ -309,7 +534,7 @@ class TestRealityDataHandler:
     @responses.activate
     def test_delete_bucket_ok(self, mock_container_client_default):
         mock_client_class, mock_client_instance = mock_container_client_default
-        mock_client_instance.delete_blob = mock_blob
+        mock_client_instance.delete_blobs.return_value = [SimpleNamespace(status_code=202)]
 
         rd_id = "d91751e9-9a24-417a-a29c-071c0dca33f0"
         with open(f"{self.data_folder}/reality_data_read_access_200.json", 'r') as payload_data:
@@ -323,6 +548,378 @@ class TestRealityDataHandler:
         assert r.get_response_status_code() == 204
 
 
+class TestUploadSession:
+    def setup_method(self, _):
+        self.rdh = RealityDataHandler(FakeTokenFactory())
+        link = SimpleNamespace(links=SimpleNamespace(container_url=SimpleNamespace(
+            href="https://account.blob.core.windows.net/container?sig=abc")))
+        self.rdh._service = MagicMock()
+        self.rdh._service.get_reality_data_write_access.return_value = Response(200, None, link)
+        self.rdh._service.update_reality_data.return_value = Response(200, None, None)
+        self.rd_id = "d91751e9-9a24-417a-a29c-071c0dca33f0"
+
+    def _authoring_calls(self):
+        return [c.args[0].authoring for c in self.rdh._service.update_reality_data.call_args_list]
+
+    @patch.object(_DataHandler, "upload_data", return_value=Response(200, None, None))
+    def test_authoring_toggled_once(self, upload_data):
+        with self.rdh.upload_session(self.rd_id) as session:
+            with ThreadPool(8) as pool:
+                responses_ = pool.map(lambda i: session.upload(f"folder{i}", f"dst{i}"), range(20))
+            assert self._authoring_calls() == [True]
+        assert all(not r.is_error() for r in responses_)
+        assert upload_data.call_count == 20
+        assert self._authoring_calls() == [True, False]
+
+    @patch.object(_DataHandler, "upload_data", side_effect=OSError("disk failure"))
+    def test_authoring_restored_on_failure(self, _):
+        with pytest.raises(OSError):
+            with self.rdh.upload_session(self.rd_id) as session:
+                session.upload("folder")
+        assert self._authoring_calls() == [True, False]
+
+    @patch.object(_DataHandler, "upload_data")
+    def test_authoring_error(self, upload_data):
+        self.rdh._service.update_reality_data.return_value = Response(
+            403, DetailedErrorResponse(error={"code": "InsufficientPermissions", "message": "denied"}), None)
+        with self.rdh.upload_session(self.rd_id) as session:
+            r = session.upload("folder")
+        assert r.get_response_status_code() == 403
+        upload_data.assert_not_called()
+        assert self._authoring_calls() == [True]
+
+    @patch.object(_DataHandler, "upload_data", return_value=Response(200, None, None))
+    def test_unused_session(self, _):
+        with self.rdh.upload_session(self.rd_id) as session:
+            pass
+        assert not session.close().is_error()
+        self.rdh._service.update_reality_data.assert_not_called()
+
+
+class TestBatchedDelete:
+    def test_delete_in_batches(self, mock_container_client_default):
+        mock_client_class, mock_client_instance = mock_container_client_default
+        names = [f"{i}.jpg" for i in range(600)]
+        failing = {"7.jpg", "300.jpg"}
+        mock_client_instance.delete_blobs.side_effect = lambda *batch, **kwargs: [
+            SimpleNamespace(status_code=404 if name in failing else 202) for name in batch]
+        r = _DataHandler.delete_data("https://account.blob.core.windows.net/container?sig=abc", names)
+        batches = [c.args for c in mock_client_instance.delete_blobs.call_args_list]
+        assert sorted(len(batch) for batch in batches) == [88, 256, 256]
+        assert sorted(name for batch in batches for name in batch) == sorted(names)
+        assert all(not c.kwargs["raise_on_any_failure"] for c in mock_client_instance.delete_blobs.call_args_list)
+        assert r.get_response_status_code() == 400
+        assert sorted(detail.target for detail in r.error.error.details) == sorted(failing)
+        assert all(detail.code == "DeletionFailed" for detail in r.error.error.details)
+        mock_client_instance.close.assert_called_once()
+
+    def test_delete_concurrency(self, mock_container_client_default):
+        mock_client_class, mock_client_instance = mock_container_client_default
+        mock_client_instance.delete_blobs.side_effect = lambda *batch, **kwargs: [
+            SimpleNamespace(status_code=202) for _ in batch]
+        options = TransferOptions(max_concurrency=1, max_in_flight=3)
+        with patch.object(_DataHandler, "_run_workers", wraps=_DataHandler._run_workers) as run_workers:
+            r = _DataHandler.delete_data("https://account.blob.core.windows.net/container?sig=abc", ["a.jpg"], options)
+        assert r.get_response_status_code() == 204
+        # Batches are bounded by the requests in flight, not by the parallelism of a single blob
+        assert run_workers.call_args.args[2] == 3
+
+    def test_delete_prefix(self, mock_container_client_default):
+        mock_client_class, mock_client_instance = mock_container_client_default
+        mock_client_instance.list_blob_names.return_value = iter(["scan/a.jpg", "scan/b.jpg"])
+        mock_client_instance.delete_blobs.side_effect = lambda *batch, **kwargs: [
+            SimpleNamespace(status_code=202) for _ in batch]
+        r = _DataHandler.delete_prefix("https://account.blob.core.windows.net/container?sig=abc", "scan/")
+        assert r.get_response_status_code() == 204
+        mock_client_instance.list_blob_names.assert_called_once_with(name_starts_with="scan/")
+        mock_client_instance.delete_blobs.assert_called_once_with("scan/a.jpg", "scan/b.jpg",
+                                                                  raise_on_any_failure=False)
+
+    def test_delete_prefix_list_error(self, mock_container_client_default):
+        mock_client_class, mock_client_instance = mock_container_client_default
+        mock_client_instance.list_blob_names.side_effect = mock_blob_except
+        r = _DataHandler.delete_prefix("https://account.blob.core.windows.net/container?sig=abc", "")
+        assert r.get_response_status_code() == 500
+        assert r.error.error.code == "DeletionFailed"
+
+
+class TestDataHandlerConnections:
+    def test_upload_shares_client(self, mock_container_client_default):
+        mock_client_class, mock_client_instance = mock_container_client_default
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for i in range(50):
+                with open(os.path.join(tmp_dir, f"{i}.txt"), "wb") as f:
+                    f.write(b"data")
+            r = _DataHandler.upload_data("https://account.blob.core.windows.net/container?sig=abc",
+                                         tmp_dir, "", None)
+        assert not r.is_error()
+        assert mock_client_class.call_count == 1
+        assert mock_client_instance.upload_blob.call_count == 50
+        mock_client_instance.close.assert_called_once()
+
+    def test_upload_connections_bounded(self, local_blob_server):
+        url = f"http://127.0.0.1:{local_blob_server.server_port}/container?sv=2020-01-01&sig=abc"
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for i in range(200):
+                with open(os.path.join(tmp_dir, f"{i}.txt"), "wb") as f:
+                    f.write(b"data")
+            r = _DataHandler.upload_data(url, tmp_dir, "", None, TransferOptions(max_connections=4))
+        assert not r.is_error()
+        # Connections are reused across files and bounded by the pool size, not by the number of files
+        assert len(local_blob_server.connections) <= 4
+
+
+def pipeline_response(status_code, size=1024):
+    request = SimpleNamespace(method="PUT", headers={"Content-Length": str(size)})
+    return SimpleNamespace(http_request=request, context={},
+                           http_response=SimpleNamespace(status_code=status_code, headers={}))
+
+
+class TestSmallFileBatching:
+    def test_get_batches(self):
+        options = TransferOptions(chunk_size=100, small_file_batch_size=2)
+        files = [("a", 10), ("big", 1000), ("b", 10), ("c", 100), ("d", 10)]
+        assert list(_DataHandler._get_batches(files, options)) == [[("big", 1000)], [("a", 10), ("b", 10)],
+                                                                   [("c", 100), ("d", 10)]]
+
+    def test_upload_batched(self, mock_container_client_default):
+        mock_client_class, mock_client_instance = mock_container_client_default
+        blob_client = mock_client_instance.get_blob_client.return_value
+        reports = []
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for i in range(10):
+                with open(os.path.join(tmp_dir, f"{i}.jpg"), "wb") as f:
+                    f.write(b"small")
+            with open(os.path.join(tmp_dir, "big.las"), "wb") as f:
+                f.write(b"x" * 1000)
+            options = TransferOptions(chunk_size=300, small_file_batch_size=4, progress_interval=0)
+            r = _DataHandler.upload_data("https://account.blob.core.windows.net/container?sig=abc", tmp_dir, "",
+                                         lambda p: reports.append(p) or True, options)
+        assert not r.is_error()
+        assert mock_client_instance.upload_blob.call_count == 10
+        assert all(isinstance(c.args[1], bytes) for c in mock_client_instance.upload_blob.call_args_list)
+        mock_client_instance.get_blob_client.assert_called_once_with("big.las")
+        assert blob_client.stage_block.call_count == 4
+        staged = sorted(c.args[0] for c in blob_client.stage_block.call_args_list)
+        committed = [b.id for b in blob_client.commit_block_list.call_args.args[0]]
+        assert staged == committed
+        assert reports[-1].transferred == reports[-1].total == 1050
+
+
+class TestLazyWalk:
+    def test_iter_files(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.makedirs(os.path.join(tmp_dir, "a", "b"))
+            for rel_path, size in [("root.txt", 1), (os.path.join("a", "a.txt"), 2),
+                                   (os.path.join("a", "b", "b.txt"), 3)]:
+                with open(os.path.join(tmp_dir, rel_path), "wb") as f:
+                    f.write(b"x" * size)
+            os.symlink(os.path.join(tmp_dir, "a"), os.path.join(tmp_dir, "link"))
+            assert sorted(_DataHandler._iter_files(tmp_dir)) == [
+                (os.path.join("a", "a.txt"), 2), (os.path.join("a", "b", "b.txt"), 3), ("root.txt", 1)]
+            assert list(_DataHandler._iter_files(os.path.join(tmp_dir, "root.txt"))) == [("root.txt", 1)]
+
+    def test_workers_start_before_walk_ends(self):
+        started = threading.Event()
+
+        def tasks():
+            yield 0
+            # The first task must be running while the walk is still going on
+            assert started.wait(5)
+            yield 1
+
+        done = []
+        _DataHandler._run_workers(tasks(), lambda task: (started.set(), done.append(task)), 4)
+        assert sorted(done) == [0, 1]
+
+    def test_worker_error_stops_walk(self):
+        walked = []
+
+        def tasks():
+            for i in range(1000):
+                walked.append(i)
+                yield i
+
+        def worker(task):
+            raise InterruptedError("stop")
+
+        with pytest.raises(InterruptedError):
+            _DataHandler._run_workers(tasks(), worker, 2)
+        assert len(walked) < 1000
+
+    def test_walk_error_stops_workers(self):
+        def tasks():
+            yield 0
+            raise PermissionError("denied")
+
+        with pytest.raises(PermissionError):
+            _DataHandler._run_workers(tasks(), lambda task: None, 2)
+
+    def test_total_grows_with_walk(self):
+        reports = []
+        progress = _ProgressAggregator(0, lambda p: reports.append(p) or True, 3600, "Upload", total_known=False)
+        progress.add_total(10)
+        progress.update("a", 10)
+        progress.add_total(10)
+        progress.update("b", 5)
+        progress.set_total_known()
+        progress.update("b", 10)
+        # Only the first report and the end are reported, reaching the total early is not the end
+        assert [(r.transferred, r.total) for r in reports] == [(10, 10), (20, 20)]
+
+    def test_final_report_after_walk(self):
+        reports = []
+        progress = _ProgressAggregator(0, lambda p: reports.append(p.percentage) or True, 3600, "Upload",
+                                       total_known=False)
+        progress.add_total(10)
+        progress.update("a", 5)
+        progress.update("a", 10)
+        # The update reaching the total was throttled, the end of the walk reports it
+        progress.set_total_known()
+        progress.finish()
+        assert reports == [50, 100]
+
+    def test_finish_reports_throttled_update(self):
+        reports = []
+        progress = _ProgressAggregator(100, lambda p: reports.append(p.transferred) or True, 3600, "Download")
+        progress.update("a", 10)
+        progress.update("a", 60)
+        progress.finish()
+        progress.finish()
+        assert reports == [10, 60]
+
+
+class TestConcurrencyController:
+    def test_acquire_bounded_by_limit(self):
+        controller = _ConcurrencyController(max_in_flight=4)
+        assert controller.limit == 4
+        assert controller.acquire(16) == 4
+        acquired = threading.Event()
+
+        def _acquire():
+            controller.release(controller.acquire(1))
+            acquired.set()
+
+        thread = threading.Thread(target=_acquire)
+        thread.start()
+        assert not acquired.wait(0.1)
+        controller.release(4)
+        assert acquired.wait(1)
+        thread.join()
+
+    def test_throttling_halves_limit(self):
+        controller = _ConcurrencyController(max_in_flight=64, interval=0)
+        assert controller.limit == 8
+        controller.on_response(pipeline_response(503))
+        assert controller.limit == 4
+        controller.on_response(pipeline_response(429))
+        assert controller.limit == 2
+        for _ in range(3):
+            controller.on_response(pipeline_response(503))
+        assert controller.limit == 1
+
+    @patch("reality_capture.service.data_handler.time.monotonic", side_effect=range(1000))
+    def test_saturation_increases_limit(self, _):
+        controller = _ConcurrencyController(max_in_flight=20, interval=0)
+        # Slow start doubles the limit while all the slots are in use
+        granted = controller.acquire(8)
+        controller.on_response(pipeline_response(201))
+        assert controller.limit == 16
+        controller.release(granted)
+        granted = controller.acquire(16)
+        controller.on_response(pipeline_response(201))
+        assert controller.limit == 20
+        controller.release(granted)
+        # No increase when the transfer does not use all of its slots
+        controller.on_response(pipeline_response(201))
+        assert controller.limit == 20
+
+    @patch("reality_capture.service.data_handler.time.monotonic", side_effect=range(1000))
+    def test_additive_increase_after_throttling(self, _):
+        controller = _ConcurrencyController(max_in_flight=64, interval=0)
+        controller.on_response(pipeline_response(503))
+        assert controller.limit == 4
+        granted = controller.acquire(4)
+        controller.on_response(pipeline_response(201))
+        assert controller.limit == 5
+        controller.release(granted)
+
+
+class TestProgressAggregator:
+    def test_running_total(self):
+        reports = []
+        progress = _ProgressAggregator(300, lambda p: reports.append(p) or True, 0, "Upload")
+        progress.update("a", 50)
+        progress.update("b", 100)
+        progress.update("a", 100)
+        progress.skip("c", 100)
+        assert [r.transferred for r in reports] == [50, 150, 200, 300]
+        assert reports[-1].percentage == 100
+        assert reports[-1].eta == 0
+        assert reports[1].bytes_per_second > 0
+
+    def test_throttled_reports(self):
+        reports = []
+        progress = _ProgressAggregator(1000, lambda p: reports.append(p.percentage) or True, 60, "Upload")
+        for i in range(1, 11):
+            progress.update("a", i * 100)
+        # First and last updates only
+        assert reports == [10, 100]
+
+    def test_interrupted(self):
+        progress = _ProgressAggregator(100, lambda _: False, 60, "Download")
+        with pytest.raises(InterruptedError):
+            progress.update("a", 10)
+        # Cancellation sticks even for throttled updates
+        with pytest.raises(InterruptedError):
+            progress.update("a", 20)
+
+    def test_hook_outside_lock(self):
+        counts = []
+        # A hook calling back into the aggregator does not deadlock
+        progress = _ProgressAggregator(100, lambda _: counts.append(progress.get_counts()) or True, 0, "Upload")
+        progress.complete("a", 100)
+        assert counts == [(1, 0, 100)]
+
+    def test_thread_safe(self):
+        progress = _ProgressAggregator(800 * 100, None, 0, "Upload")
+
+        def _update(key):
+            for i in range(1, 101):
+                progress.update(key, i * 100)
+
+        threads = [threading.Thread(target=_update, args=(str(k),)) for k in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert progress._transferred == 800 * 100
+
+    @responses.activate
+    def test_handler_transfer_progress_hook(self, mock_container_client_default):
+        mock_client_class, mock_client_instance = mock_container_client_default
+        mock_client_instance.upload_blob.side_effect = mock_blob
+
+        itwin_id = "d91751e9-9a24-417a-a29c-071c0dca33f0"
+        cf = os.path.dirname(os.path.abspath(__file__))
+        with open(os.path.join(cf, "data", "bucket_get_200.json"), 'r') as payload_data:
+            payload = json.load(payload_data)
+        responses.add(responses.GET,
+                      f'https://api.bentley.com/reality-modeling/itwins/{itwin_id}/bucket',
+                      json=payload, status=200)
+
+        percentages = []
+        reports = []
+        bdh = BucketDataHandler(FakeTokenFactory())
+        bdh.set_progress_hook(lambda p: percentages.append(p) or True)
+        bdh.set_transfer_progress_hook(lambda p: reports.append(p) or True)
+        r = bdh.upload_data(itwin_id, os.path.join(cf, "data", "bucket_get_200.json"))
+        assert not r.is_error()
+        assert percentages[-1] == 100
+        assert isinstance(reports[-1], TransferProgress)
+        assert reports[-1].transferred == reports[-1].total
+
+
 class TestBucketDataHandler:
     def setup_method(self, _):
         self.ftf = FakeTokenFactory()
@@ -491,7 +1088,7 @@ class TestBucketDataHandler:
         MyBlob = namedtuple("MyBlob", ["name", "size"])
         mock_client_instance.list_blobs.return_value = [MyBlob("a.txt", 100)]
         mock_stream = MagicMock()
-        mock_stream.readall.return_value = b"mocked file content"
+        mock_stream.readinto.side_effect = lambda stream: stream.write(b"mocked file content")
         mock_client_instance.download_blob.return_value = mock_stream
 
         itwin_id = "d91751e9-9a24-417a-a29c-071c0dca33f0"
@@ -505,7 +1102,8 @@ class TestBucketDataHandler:
             r = self.bdh.download_data(itwin_id, tmp_dir)
             assert not r.is_error()
             assert r.get_response_status_code() == 200
-            assert os.path.exists(os.path.join(tmp_dir, "a.txt"))
+            with open(os.path.join(tmp_dir, "a.txt"), "rb") as f:
+                assert f.read() == b"mocked file content"
 
     @responses.activate
     def test_delete_bucket_link_error(self):
@@ -524,7 +1122,7 @@ class TestBucketDataHandler:
     @responses.activate
     def test_delete_bucket_fail(self, mock_container_client_default):
         mock_client_class, mock_client_instance = mock_container_client_default
-        mock_client_instance.delete_blob.side_effect = mock_blob_except
+        mock_client_instance.delete_blobs.side_effect = mock_blob_except
 
         itwin_id = "d91751e9-9a24-417a-a29c-071c0dca33f0"
         with open(f"{self.data_folder}/bucket_get_200.json", 'r') as payload_data:
@@ -540,7 +1138,7 @@ class TestBucketDataHandler:
     @responses.activate
     def test_delete_bucket_ok(self, mock_container_client_default):
         mock_client_class, mock_client_instance = mock_container_client_default
-        mock_client_instance.delete_blob = mock_blob
+        mock_client_instance.delete_blobs.return_value = [SimpleNamespace(status_code=202)]
 
         itwin_id = "d91751e9-9a24-417a-a29c-071c0dca33f0"
         with open(f"{self.data_folder}/bucket_get_200.json", 'r') as payload_data:
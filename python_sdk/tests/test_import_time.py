@@ -0,0 +1,32 @@
+import subprocess
+import sys
+
+import pytest
+
+
+def _import_times(module: str) -> dict[str, int]:
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                             capture_output=True, text=True, check=True)
+    times = {}
+    for line in process.stderr.splitlines():
+        if line.startswith("import time:") and "imported package" not in line:
+            self_us, _, name = line[len("import time:"):].split("|")
+            times[name.strip()] = int(self_us)
+    return times
+
+
+class TestImportTime:
+    @pytest.mark.parametrize("module", ["reality_capture.service.job", "reality_capture.service.service"])
+    def test_specifications_not_imported(self, module):
+        times = _import_times(module)
+        assert module in times
+        assert not [name for name in times if name.startswith("reality_capture.specifications.")]
+        assert "asyncio" not in times
+
+    def test_specifications_reachable_from_job(self):
+        from reality_capture.service import job
+        from reality_capture.specifications.tiling import TilingSpecifications, TilingSpecificationsCreate
+        assert job.TilingSpecifications is TilingSpecifications
+        assert job.TilingSpecificationsCreate is TilingSpecificationsCreate
+        with pytest.raises(AttributeError):
+            getattr(job, "UnknownSpecifications")
@@ -0,0 +1,176 @@
+import json
+import os
+import tempfile
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+
+import requests
+import responses
+
+from reality_capture.service.data_handler import (BucketDataHandler, _ConcurrencyController, _DataHandler,
+                                                  _TransferRecorder)
+from reality_capture.service.instrumentation import (Instrumentation, MetricsCollector, RequestMetrics,
+                                                     TransferMetrics, get_endpoint)
+from reality_capture.service.job import Service
+from reality_capture.service.response import Response
+from reality_capture.service.response_cache import ResponseCache
+from reality_capture.service.retry import RetryPolicy
+from reality_capture.service.service import RealityCaptureService
+
+
+class FakeTokenFactory:
+    @staticmethod
+    def get_token() -> str:
+        return "Bearer invalid"
+
+
+class RecordingInstrumentation(Instrumentation):
+    def __init__(self):
+        self.requests = []
+        self.transfers = []
+
+    def on_request(self, metrics: RequestMetrics) -> None:
+        self.requests.append(metrics)
+
+    def on_transfer(self, metrics: TransferMetrics) -> None:
+        self.transfers.append(metrics)
+
+
+def _load(name):
+    data_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+    with open(os.path.join(data_folder, name), 'r') as payload_data:
+        return json.load(payload_data)
+
+
+class TestMetricsCollector:
+    def test_get_endpoint(self):
+        assert (get_endpoint("get", "https://api.bentley.com/reality-modeling/jobs/abc/progress")
+                == "GET reality-modeling/jobs/{id}/progress")
+        assert (get_endpoint("PATCH", "https://api.bentley.com/reality-management/reality-data/abc?iTwinId=x")
+                == "PATCH reality-management/reality-data/{id}")
+        assert get_endpoint("GET", "https://api.bentley.com/reality-modeling/files") == "GET reality-modeling/files"
+
+    def test_percentiles(self):
+        collector = MetricsCollector()
+        for i in range(1, 101):
+            metrics = RequestMetrics(method="GET", url="", start=0.0, endpoint="GET files", status_code=200,
+                                     duration=i / 100, bytes_received=10, phases={"network": i / 1000})
+            collector.on_request(metrics)
+        collector.on_request(RequestMetrics(method="GET", url="", start=0.0, endpoint="GET files", status_code=503,
+                                            retries=3, duration=2.0))
+        summary = collector.get_summary()["GET files"]
+        assert (summary.count, summary.errors, summary.retries, summary.bytes) == (101, 1, 3, 1000)
+        assert (summary.duration.p50, summary.duration.p95, summary.duration.p99) == (0.51, 0.96, 1.0)
+        assert summary.phases["network"].p99 == 0.099
+        collector.reset()
+        assert collector.get_summary() == {}
+
+    def test_samples_bounded(self):
+        collector = MetricsCollector(max_samples=10)
+        for i in range(100):
+            collector.on_transfer(TransferMetrics(operation="upload", start=0.0, status_code=200, duration=i,
+                                                  bytes=1))
+        summary = collector.get_summary()["upload blobs"]
+        assert summary.count == 100 and summary.bytes == 100
+        assert summary.duration.p50 == 94
+
+
+class TestServiceInstrumentation:
+    job_url = "https://api.bentley.com/reality-modeling/jobs/cc3d35b3-3e2f-4a07-8d1d-3b1f8a1b9d7c/progress"
+
+    @responses.activate
+    @patch("reality_capture.service.service.time.sleep")
+    def test_request_metrics(self, _):
+        responses.add(responses.GET, self.job_url, status=503)
+        responses.add(responses.GET, self.job_url, json=_load("job_progress_get_200.json"), status=200)
+        instrumentation = RecordingInstrumentation()
+        rcs = RealityCaptureService(FakeTokenFactory(), instrumentation=instrumentation,
+                                    retry_policy=RetryPolicy(jitter=0.0))
+        r = rcs.get_job_progress("cc3d35b3-3e2f-4a07-8d1d-3b1f8a1b9d7c", Service.MODELING)
+        assert not r.is_error()
+        metrics, = instrumentation.requests
+        assert metrics.endpoint == "GET reality-modeling/jobs/{id}/progress"
+        assert (metrics.status_code, metrics.retries, metrics.cached) == (200, 1, False)
+        assert metrics.bytes_received == len(responses.calls[1].response.content)
+        assert set(metrics.phases) == {"token", "wait", "network", "decode", "validation"}
+        assert metrics.phases["wait"] >= 0.5
+        assert metrics.duration >= sum(metrics.phases.values()) - metrics.phases["wait"]
+
+    @responses.activate
+    def test_network_error(self):
+        responses.add(responses.GET, self.job_url, body=requests.exceptions.ConnectionError("unreachable"))
+        collector = MetricsCollector()
+        rcs = RealityCaptureService(FakeTokenFactory(), instrumentation=collector)
+        with patch.object(RealityCaptureService, "_get_retry_delay", return_value=None):
+            r = rcs.get_job_progress("cc3d35b3-3e2f-4a07-8d1d-3b1f8a1b9d7c", Service.MODELING)
+        assert r.get_response_status_code() == 503
+        summary, = collector.get_summary().values()
+        assert (summary.count, summary.errors) == (1, 1)
+
+    @responses.activate
+    def test_cache_hits(self):
+        responses.add(responses.GET, "https://api.bentley.com/reality-modeling/files",
+                      json=_load("files_get_200.json"), status=200)
+        collector = MetricsCollector()
+        rcs = RealityCaptureService(FakeTokenFactory(), instrumentation=collector, response_cache=ResponseCache())
+        rcs.get_service_files()
+        rcs.get_service_files()
+        summary = collector.get_summary()["GET reality-modeling/files"]
+        assert (summary.count, summary.cache_hits) == (2, 1)
+
+
+class TestTransferInstrumentation:
+    def test_upload_metrics(self):
+        instrumentation = RecordingInstrumentation()
+        recorder = _TransferRecorder(instrumentation, "upload")
+        with patch("azure.storage.blob.ContainerClient.from_container_url") as mock_client:
+            mock_instance = MagicMock()
+            mock_client.return_value = mock_instance
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                for i in range(5):
+                    with open(os.path.join(tmp_dir, f"{i}.txt"), "wb") as f:
+                        f.write(b"data")
+                r = recorder.record(_DataHandler.upload_data("https://account.blob.core.windows.net/container?sig=a",
+                                                             tmp_dir, "", None, recorder=recorder))
+        assert not r.is_error()
+        metrics, = instrumentation.transfers
+        assert (metrics.operation, metrics.status_code, metrics.files, metrics.skipped_files, metrics.bytes) == (
+            "upload", 200, 5, 0, 20)
+        assert metrics.duration > 0
+
+    def test_retried_requests_counted(self):
+        instrumentation = RecordingInstrumentation()
+        recorder = _TransferRecorder(instrumentation, "download")
+        controller = _ConcurrencyController(max_in_flight=4)
+        recorder.track(controller=controller)
+        for status_code in (503, 500, 206, 206):
+            request = SimpleNamespace(method="GET", headers={})
+            controller.on_response(SimpleNamespace(http_request=request, context={},
+                                                   http_response=SimpleNamespace(status_code=status_code,
+                                                                                 headers={})))
+        recorder.record(Response(200, None, None))
+        metrics, = instrumentation.transfers
+        assert (metrics.requests, metrics.retried_requests) == (4, 2)
+
+    @responses.activate
+    def test_handler_reports_deletions(self):
+        itwin_id = "751d8e9f-5bc6-4e4c-8fc9-2e2b7d0c8d8a"
+        responses.add(responses.GET, f"https://api.bentley.com/reality-modeling/itwins/{itwin_id}/bucket",
+                      json=_load("bucket_get_200.json"), status=200)
+        collector = MetricsCollector()
+        handler = BucketDataHandler(FakeTokenFactory(), instrumentation=collector)
+        with patch("azure.storage.blob.ContainerClient.from_container_url") as mock_client:
+            mock_instance = MagicMock()
+            mock_client.return_value = mock_instance
+            mock_instance.delete_blobs.side_effect = lambda *batch, **kwargs: [
+                SimpleNamespace(status_code=404 if name == "b.jpg" else 202) for name in batch]
+            r = handler.delete_data(itwin_id, ["a.jpg", "b.jpg", "c.jpg"])
+        assert r.get_response_status_code() == 400
+        summary = collector.get_summary()
+        assert summary["delete blobs"].count == 1 and summary["delete blobs"].errors == 1
+        assert summary["GET reality-modeling/itwins/{id}/bucket"].count == 1
+
+    def test_no_instrumentation(self):
+        recorder = _TransferRecorder(None, "copy")
+        response = Response(200, None, None)
+        assert recorder.record(response) is response
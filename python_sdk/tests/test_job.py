@@ -1,9 +1,11 @@
 import datetime
 import pytest
 from unittest.mock import MagicMock
-from reality_capture.service.job import Service, JobCreate, Job, JobType, JobState, _get_appropriate_service
+from pydantic import ValidationError
+from reality_capture.service.job import (Service, JobCreate, Job, JobType, JobState, _get_appropriate_service,
+                                        _get_specifications_model)
 from reality_capture.specifications.eval_o2d import EvalO2DSpecifications
-from reality_capture.specifications.tiling import TilingOutputsCreate
+from reality_capture.specifications.tiling import TilingOutputsCreate, TilingSpecifications
 from reality_capture.specifications.segmentation3d import Segmentation3DOutputsCreate
 # from reality_capture.specifications.point_cloud_conversion import PCConversionOutputsCreate
 
@@ -43,3 +45,32 @@ class TestJob:
         with pytest.raises(NotImplementedError):
             _get_appropriate_service(unsupported)
 
+
+    def test_specifications_dispatch(self):
+        for job_type in JobType:
+            assert _get_specifications_model(job_type) is not None
+            assert _get_specifications_model(job_type, create=True) is not None
+        assert _get_specifications_model(JobType.TILING) is TilingSpecifications
+        cdt = {"createdDateTime": datetime.datetime(1974, 9, 1, 0, 0, 0)}
+        tiling_specs = TilingSpecifications(inputs={"scene": "scene"},
+                                            outputs={"modelingReference": {"location": "location"}})
+        j = Job(id="id", type=JobType.TILING, iTwinId="itwin", state=JobState.SUCCESS, executionInfo=cdt,
+                userId="claude@example.org", specifications=tiling_specs)
+        assert isinstance(j.specifications, TilingSpecifications)
+        assert j.specifications.inputs.scene == "scene"
+        with pytest.raises(ValidationError):
+            Job(id="id", type="Unknown", iTwinId="itwin", state=JobState.SUCCESS, executionInfo=cdt,
+                userId="claude@example.org", specifications={"inputs": {"scene": "scene"}})
+        with pytest.raises(ValidationError):
+            Job(id="id", type=JobType.TILING, iTwinId="itwin", state=JobState.SUCCESS, executionInfo=cdt,
+                userId="claude@example.org", specifications={"inputs": {}})
+
+    def test_specifications_schema(self):
+        for model, create in ((Job, False), (JobCreate, True)):
+            for mode in ("validation", "serialization"):
+                schema = model.model_json_schema(mode=mode)
+                refs = [s["$ref"].split("/")[-1] for s in schema["properties"]["specifications"]["anyOf"]]
+                assert len(refs) == len(JobType)
+                assert refs[0] == ("CalibrationSpecificationsCreate" if create else "CalibrationSpecifications")
+        assert JobCreate.model_fields["specifications"].annotation.__args__[0] is _get_specifications_model(
+            JobType.CALIBRATION, create=True)
@@ -0,0 +1,234 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from reality_capture.service.error import DetailedErrorResponse
+from reality_capture.service.job import JobState, JobType, Progress, Service
+from reality_capture.service.job_handle import AsyncJobHandle, JobHandle, _WaitPolicy
+from reality_capture.service.response import Response
+from reality_capture.service.service import RealityCaptureService
+
+
+class FakeTokenFactory:
+    @staticmethod
+    def get_token() -> str:
+        return "Bearer invalid"
+
+
+def progress(state, percentage=0):
+    return Response(200, None, Progress(state=state, percentage=percentage))
+
+
+def error(status_code):
+    return Response(status_code, DetailedErrorResponse(error={"code": "Error", "message": "error"}), None)
+
+
+def fake_service(progresses):
+    service = MagicMock()
+    service.get_job_progress.side_effect = progresses
+    service.get_job.return_value = Response(200, None, SimpleNamespace(id="job", state=JobState.SUCCESS))
+    return service
+
+
+class TestWaitPolicy:
+    def test_job_type_intervals(self):
+        assert _WaitPolicy(JobType.RECONSTRUCTION, None, None, 1, 100).get_retry_interval() == 30
+        assert _WaitPolicy(JobType.FILL_IMAGE_PROPERTIES, None, None, 1, 100).get_retry_interval() == 5
+        assert _WaitPolicy(JobType.OBJECTS_2D, None, None, 1, 100).get_retry_interval() == 10
+        assert _WaitPolicy(JobType.RECONSTRUCTION, None, None, 1, 20).get_retry_interval() == 20
+
+    @patch("reality_capture.service.job_handle.time.monotonic", return_value=0)
+    def test_grows_without_progress(self, _):
+        policy = _WaitPolicy(JobType.OBJECTS_2D, None, None, 1, 30)
+        intervals = [policy.get_next_interval(Progress(state=JobState.ACTIVE, percentage=0)) for _ in range(5)]
+        assert intervals == [10, 15, 22.5, 30, 30]
+
+    @patch("reality_capture.service.job_handle.time.monotonic")
+    def test_adapts_to_progress_rate(self, mock_monotonic):
+        policy = _WaitPolicy(JobType.RECONSTRUCTION, None, None, 1, 1000)
+        mock_monotonic.return_value = 0
+        policy.get_next_interval(Progress(state=JobState.ACTIVE, percentage=0))
+        mock_monotonic.return_value = 100
+        # 10% in 100s, 900s left: poll at a quarter of it
+        assert policy.get_next_interval(Progress(state=JobState.ACTIVE, percentage=10)) == 225
+        mock_monotonic.return_value = 200
+        # Smoothed rate (0.1 + 0.8) / 2
+        assert policy.get_next_interval(Progress(state=JobState.ACTIVE, percentage=90)) == pytest.approx(10 / 0.45 / 4)
+
+    @patch("reality_capture.service.job_handle.time.monotonic", return_value=0)
+    def test_queued_waits_longer(self, _):
+        policy = _WaitPolicy(JobType.OBJECTS_2D, None, None, 1, 100)
+        assert policy.get_next_interval(Progress(state=JobState.QUEUED, percentage=0)) == 30
+
+    @patch("reality_capture.service.job_handle.time.monotonic")
+    def test_deadline(self, mock_monotonic):
+        mock_monotonic.return_value = 0
+        policy = _WaitPolicy(JobType.RECONSTRUCTION, 12, None, 1, 100)
+        assert policy.get_retry_interval() == 12
+        assert policy.get_error() is None
+        mock_monotonic.return_value = 12
+        assert policy.get_error().error.error.code == "JobWaitTimeout"
+
+    def test_request_limit_counts_cancel(self):
+        policy = _WaitPolicy(JobType.RECONSTRUCTION, None, 3, 1, 100, cancel_on_timeout=True)
+        assert not policy.is_last_request()
+        policy.on_request()
+        assert policy.is_last_request()
+        policy.on_request()
+        assert policy.get_error().error.error.code == "JobWaitRequestLimit"
+
+
+class TestJobHandle:
+    def test_result(self):
+        service = fake_service([progress(JobState.QUEUED), progress(JobState.ACTIVE, 50), progress(JobState.SUCCESS, 100)])
+        r = JobHandle(service, "job", JobType.RECONSTRUCTION, 0, 0).result()
+        assert not r.is_error()
+        assert r.value.state == JobState.SUCCESS
+        assert service.get_job_progress.call_count == 3
+        service.get_job.assert_called_once_with("job", Service.MODELING)
+
+    def test_request_limit(self):
+        service = fake_service([progress(JobState.ACTIVE, i) for i in range(10)])
+        service.get_job.return_value = Response(200, None, SimpleNamespace(id="job", state=JobState.ACTIVE))
+        r = JobHandle(service, "job", JobType.RECONSTRUCTION, 0, 0).result(max_requests=4, cancel_on_timeout=True)
+        assert r.get_response_status_code() == 408
+        assert r.error.error.code == "JobWaitRequestLimit"
+        # Every call counts: two progress polls, the last poll on the job itself, then the cancellation
+        assert service.get_job_progress.call_count == 2
+        service.get_job.assert_called_once_with("job", Service.MODELING)
+        service.cancel_job.assert_called_once_with("job", Service.MODELING)
+
+    def test_request_limit_finished_job(self):
+        service = fake_service([progress(JobState.ACTIVE, 10)])
+        r = JobHandle(service, "job", JobType.RECONSTRUCTION, 0, 0).result(max_requests=2)
+        assert r.value.state == JobState.SUCCESS
+        assert service.get_job_progress.call_count == 1
+        assert service.get_job.call_count == 1
+
+    def test_request_limit_no_final_sleep(self):
+        service = fake_service(lambda *args: progress(JobState.ACTIVE))
+        service.get_job.return_value = Response(200, None, SimpleNamespace(id="job", state=JobState.ACTIVE))
+        handle = JobHandle(service, "job", JobType.RECONSTRUCTION, 5, 5)
+        start = time.monotonic()
+        r = handle.result(max_requests=1)
+        # The limit is returned as soon as the last request is made, without waiting for the next poll
+        assert time.monotonic() - start < 2.5
+        assert r.error.error.code == "JobWaitRequestLimit"
+        service.get_job_progress.assert_not_called()
+        assert service.get_job.call_count == 1
+
+    def test_timeout(self):
+        service = fake_service(lambda *args: progress(JobState.ACTIVE))
+        r = JobHandle(service, "job", JobType.OBJECTS_2D, 0.01, 0.01).result(timeout=0.05)
+        assert r.error.error.code == "JobWaitTimeout"
+        service.cancel_job.assert_not_called()
+        service.get_job.assert_not_called()
+
+    def test_transient_errors_retried(self):
+        service = fake_service([error(503), error(429), progress(JobState.FAILED)])
+        r = JobHandle(service, "job", JobType.OBJECTS_2D, 0, 0).result()
+        assert not r.is_error()
+        assert service.get_job_progress.call_count == 3
+
+    def test_error_returned(self):
+        service = fake_service([error(404)])
+        r = JobHandle(service, "job", JobType.OBJECTS_2D, 0, 0).result()
+        assert r.get_response_status_code() == 404
+
+    def test_cancel_wakes_future(self):
+        cancelled = threading.Event()
+        service = fake_service(lambda *args: progress(JobState.CANCELLED if cancelled.is_set() else JobState.ACTIVE))
+        service.cancel_job.side_effect = lambda *args: cancelled.set()
+        handle = JobHandle(service, "job", JobType.RECONSTRUCTION, 60, 60)
+        future = handle.future()
+        while service.get_job_progress.call_count == 0:
+            time.sleep(0.001)
+        handle.cancel()
+        assert not future.result(timeout=5).is_error()
+        assert service.get_job_progress.call_count == 2
+
+
+class TestServiceWait:
+    def test_submit_job_and_wait(self):
+        rcs = RealityCaptureService(FakeTokenFactory())
+        job = SimpleNamespace(type=JobType.FILL_IMAGE_PROPERTIES)
+        with patch.object(rcs, "submit_job", return_value=Response(201, None, SimpleNamespace(id="job"))), \
+                patch.object(rcs, "get_job_progress", side_effect=[progress(JobState.SUCCESS, 100)]), \
+                patch.object(rcs, "get_job", return_value=Response(200, None, "final")) as get_job:
+            r = rcs.submit_job_and_wait(job)
+        assert r.value == "final"
+        get_job.assert_called_once_with("job", Service.MODELING)
+
+    def test_submit_job_and_wait_error(self):
+        rcs = RealityCaptureService(FakeTokenFactory())
+        with patch.object(rcs, "submit_job", return_value=error(400)):
+            r = rcs.submit_job_and_wait(SimpleNamespace(type=JobType.TILING))
+        assert r.get_response_status_code() == 400
+
+    def test_async_wait_for_job(self):
+        pytest.importorskip("aiohttp")
+        from reality_capture.service.async_service import AsyncRealityCaptureService
+
+        async def _main():
+            async with AsyncRealityCaptureService(FakeTokenFactory()) as service:
+                service.get_job_progress = AsyncMock(side_effect=[progress(JobState.ACTIVE, 10),
+                                                                  progress(JobState.SUCCESS, 100)])
+                service.get_job = AsyncMock(return_value=Response(200, None, "final"))
+                with patch.object(AsyncJobHandle, "_sleep", AsyncMock()) as sleep:
+                    r = await service.wait_for_job("job", JobType.SEGMENTATION_2D)
+                return r, sleep.await_count
+
+        r, sleeps = asyncio.run(_main())
+        assert r.value == "final"
+        assert sleeps == 1
+
+    def test_async_request_limit(self):
+        pytest.importorskip("aiohttp")
+        from reality_capture.service.async_service import AsyncRealityCaptureService
+
+        async def _main():
+            async with AsyncRealityCaptureService(FakeTokenFactory()) as service:
+                service.get_job_progress = AsyncMock(return_value=progress(JobState.ACTIVE, 10))
+                service.get_job = AsyncMock(return_value=Response(200, None, SimpleNamespace(state=JobState.ACTIVE)))
+                service.cancel_job = AsyncMock(return_value=Response(200, None, "cancelling"))
+                with patch.object(AsyncJobHandle, "_sleep", AsyncMock()) as sleep:
+                    r = await service.wait_for_job("job", JobType.RECONSTRUCTION, max_requests=3,
+                                                   cancel_on_timeout=True)
+                calls = (service.get_job_progress.await_count, service.get_job.await_count,
+                         service.cancel_job.await_count)
+                return r, calls, sleep.await_count
+
+        r, calls, sleeps = asyncio.run(_main())
+        assert r.error.error.code == "JobWaitRequestLimit"
+        assert calls == (1, 1, 1)
+        assert sleeps == 1
+
+    def test_async_job_handle(self):
+        pytest.importorskip("aiohttp")
+        from reality_capture.service.async_service import AsyncRealityCaptureService
+
+        async def _main():
+            async with AsyncRealityCaptureService(FakeTokenFactory()) as service:
+                states = [JobState.ACTIVE]
+                service.get_job_progress = AsyncMock(side_effect=lambda *_: progress(states[0], 10))
+                service.get_job = AsyncMock(return_value=Response(200, None, "final"))
+
+                async def _cancel(*_):
+                    states[0] = JobState.CANCELLED
+                    return Response(200, None, "cancelling")
+
+                service.cancel_job = AsyncMock(side_effect=_cancel)
+                handle = service.get_job_handle("job", JobType.RECONSTRUCTION)
+                assert isinstance(handle, JobHandle)
+                assert (await handle.progress()).value.percentage == 10
+                task = handle.future()
+                await asyncio.sleep(0.01)
+                # Cancelling wakes the pending wait up instead of waiting for the next poll, 30s away
+                assert (await handle.cancel()).value == "cancelling"
+                return await asyncio.wait_for(task, 5)
+
+        assert asyncio.run(_main()).value == "final"
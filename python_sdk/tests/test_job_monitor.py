@@ -0,0 +1,139 @@
+import threading
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from reality_capture.service.error import DetailedErrorResponse
+from reality_capture.service.job import JobState, Service
+from reality_capture.service.job_monitor import JobMonitor
+from reality_capture.service.response import Response
+
+
+def fake_job(job_id, state):
+    return SimpleNamespace(id=job_id, state=state)
+
+
+def jobs_page(jobs, token=None):
+    return Response(200, None, SimpleNamespace(jobs=jobs, get_continuation_token=lambda: token))
+
+
+def not_found():
+    return Response(404, DetailedErrorResponse(error={"code": "JobNotFound", "message": "Job not found."}), None)
+
+
+class TestJobMonitor:
+    def setup_method(self, _):
+        self.service = MagicMock()
+        self.states = {}
+        self.service.get_jobs.side_effect = lambda service, filters, top, continuation_token: jobs_page(
+            [fake_job(job_id, state) for job_id, state in self.states.items() if f"'{job_id}'" in filters])
+
+    def test_batched_polling(self):
+        monitor = JobMonitor(self.service, batch_size=50)
+        for i in range(120):
+            self.states[f"job{i}"] = JobState.ACTIVE
+            monitor.watch(f"job{i}", Service.MODELING)
+        assert monitor.poll(0) == 120
+        # 120 jobs in 3 requests instead of 120
+        assert self.service.get_jobs.call_count == 3
+        self.service.get_job.assert_not_called()
+        assert self.service.get_jobs.call_args_list[0].args[1].startswith("id in ('job0', 'job1'")
+
+    def test_grouped_by_service(self):
+        monitor = JobMonitor(self.service)
+        self.states.update(a=JobState.ACTIVE, b=JobState.ACTIVE)
+        monitor.watch("a", Service.MODELING)
+        monitor.watch("b", Service.ANALYSIS)
+        monitor.poll(0)
+        assert sorted(c.args[0].value for c in self.service.get_jobs.call_args_list) == sorted(
+            [Service.MODELING.value, Service.ANALYSIS.value])
+
+    def test_follows_pages(self):
+        pages = [jobs_page([fake_job("a", JobState.ACTIVE)], "token"), jobs_page([fake_job("b", JobState.ACTIVE)])]
+        self.service.get_jobs.side_effect = pages
+        monitor = JobMonitor(self.service)
+        monitor.watch("a", Service.MODELING)
+        monitor.watch("b", Service.MODELING)
+        monitor.poll(0)
+        assert self.service.get_jobs.call_args_list[1].kwargs["continuation_token"] == "token"
+        self.service.get_job.assert_not_called()
+
+    def test_state_intervals_and_backoff(self):
+        monitor = JobMonitor(self.service, poll_intervals={JobState.QUEUED: 30, JobState.ACTIVE: 10}, max_backoff=2)
+        self.states.update(q=JobState.QUEUED, a=JobState.ACTIVE)
+        monitor.watch("q", Service.MODELING)
+        monitor.watch("a", Service.MODELING)
+        assert monitor.poll(0) == 2
+        assert monitor.poll(9) == 0
+        assert monitor.poll(10) == 1
+        # Unchanged state: the interval grows, up to max_backoff times the state interval
+        assert monitor.poll(24) == 0
+        assert monitor.poll(25) == 1
+        assert monitor.poll(30) == 1
+        assert monitor.poll(44) == 0
+        assert monitor.poll(45) == 1
+        # Capped at 20s for the active job, 60s for the queued one
+        assert monitor.poll(64) == 0
+        assert monitor.poll(65) == 1
+        assert monitor.poll(74) == 0
+        assert monitor.poll(75) == 1
+
+    def test_transitions_and_future(self):
+        monitor = JobMonitor(self.service)
+        transitions = []
+        self.states["a"] = JobState.QUEUED
+        future = monitor.watch("a", Service.MODELING, lambda job, previous: transitions.append((previous, job.state)))
+        monitor.poll(0)
+        monitor.poll(100)
+        self.states["a"] = JobState.ACTIVE
+        monitor.poll(200)
+        self.states["a"] = JobState.SUCCESS
+        monitor.poll(300)
+        assert transitions == [(None, JobState.QUEUED), (JobState.QUEUED, JobState.ACTIVE),
+                               (JobState.ACTIVE, JobState.SUCCESS)]
+        assert future.done()
+        assert future.result().value.state == JobState.SUCCESS
+        assert monitor.watched_jobs() == []
+
+    def test_missing_job_falls_back_on_get_job(self):
+        self.service.get_job.side_effect = [Response(200, None, fake_job("a", JobState.FAILED)), not_found()]
+        monitor = JobMonitor(self.service)
+        future_a = monitor.watch("a", Service.MODELING)
+        future_b = monitor.watch("b", Service.MODELING)
+        monitor.poll(0)
+        assert future_a.result().value.state == JobState.FAILED
+        assert future_b.result().get_response_status_code() == 404
+
+    def test_batch_error_retried_later(self):
+        throttled = Response(429, DetailedErrorResponse(error={"code": "TooManyRequests", "message": "Slow down."}),
+                             None)
+        self.service.get_jobs.side_effect = lambda service, filters, top, continuation_token: throttled
+        monitor = JobMonitor(self.service, poll_intervals={JobState.ACTIVE: 10}, batch_size=50, max_backoff=4)
+        for i in range(120):
+            monitor.watch(f"job{i}", Service.MODELING)
+        assert monitor.poll(0) == 120
+        # No per-job fallback, and the next batches are not sent either
+        self.service.get_job.assert_not_called()
+        assert self.service.get_jobs.call_count == 1
+        assert monitor.poll(9) == 0
+        assert monitor.poll(10) == 120
+        # Backing off while the failures go on
+        assert monitor.poll(29) == 0
+        assert monitor.poll(30) == 120
+        assert len(monitor.watched_jobs()) == 120
+
+    def test_cancelled_future_unwatches(self):
+        monitor = JobMonitor(self.service)
+        self.states["a"] = JobState.ACTIVE
+        monitor.watch("a", Service.MODELING).cancel()
+        assert monitor.poll(0) == 0
+        assert monitor.watched_jobs() == []
+
+    def test_background_thread(self):
+        self.states["a"] = JobState.ACTIVE
+        done = threading.Event()
+        with JobMonitor(self.service, poll_intervals={JobState.ACTIVE: 0.01}) as monitor:
+            future = monitor.watch("a", Service.MODELING,
+                                   lambda job, previous: done.set() if job.state == JobState.SUCCESS else None)
+            self.states["a"] = JobState.SUCCESS
+            assert future.result(timeout=5).value.state == JobState.SUCCESS
+            assert done.wait(5)
@@ -0,0 +1,210 @@
+import asyncio
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+import responses
+from azure.core.pipeline.transport import HttpRequest, RequestsTransport
+from azure.storage.blob import ContainerClient
+
+from reality_capture.service.data_handler import BucketDataHandler, RealityDataHandler, _SasRenewal, \
+    _SasRenewingTransport
+from reality_capture.service.error import DetailedErrorResponse
+from reality_capture.service.link_cache import LinkCache, get_sas_expiry, get_sas_parameters, get_sas_token
+from reality_capture.service.response import Response
+
+
+class FakeTokenFactory:
+    @staticmethod
+    def get_token() -> str:
+        return "Bearer invalid"
+
+
+def sas_url(expires_in, sig="abc"):
+    expiry = (datetime.now(timezone.utc) + timedelta(seconds=expires_in)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return f"https://account.blob.core.windows.net/container?sv=2020-08-04&se={expiry.replace(':', '%3A')}" \
+           f"&sr=c&sp=rl&sig={sig}"
+
+
+def link(url):
+    return Response(200, None, SimpleNamespace(links=SimpleNamespace(container_url=SimpleNamespace(href=url))))
+
+
+class TestLinkCache:
+    def test_get_sas_expiry(self):
+        url = "https://account.blob.core.windows.net/container?sv=2020-08-04&se=2021-07-22T03%3A50%3A21Z&sr=c&sig=x"
+        assert get_sas_expiry(url) == datetime(2021, 7, 22, 3, 50, 21, tzinfo=timezone.utc).timestamp()
+        assert get_sas_expiry("https://account.blob.core.windows.net/container?sig=x") is None
+        assert get_sas_expiry("https://account.blob.core.windows.net/container?se=tomorrow") is None
+        assert get_sas_token(url) == "sv=2020-08-04&se=2021-07-22T03%3A50%3A21Z&sr=c&sig=x"
+
+    def test_cached_until_margin(self):
+        cache = LinkCache(refresh_margin=300)
+        fetched = []
+
+        def fetch(url):
+            fetched.append(url)
+            return link(url)
+
+        valid, expiring = sas_url(3600, "valid"), sas_url(60, "expiring")
+        assert cache.get("a", lambda: fetch(valid)).value.links.container_url.href == valid
+        assert cache.get("a", lambda: fetch(valid)).value.links.container_url.href == valid
+        cache.get("b", lambda: fetch(expiring))
+        cache.get("b", lambda: fetch(expiring))
+        assert fetched == [valid, expiring, expiring]
+
+    def test_not_cached(self):
+        cache = LinkCache()
+        calls = []
+        error = Response(401, DetailedErrorResponse(error={"code": "HeaderNotFound", "message": "denied"}), None)
+        for response in (error, link("https://account.blob.core.windows.net/container?sig=x")):
+            cache.get("a", lambda: calls.append(1) or response)
+            cache.get("a", lambda: calls.append(1) or response)
+        assert len(calls) == 4
+
+    def test_lru(self):
+        cache = LinkCache(max_size=2)
+        calls = []
+
+        def fetch(key):
+            calls.append(key)
+            return link(sas_url(3600, key))
+
+        for key in ("a", "b", "a", "c", "a", "b"):
+            cache.get(key, lambda: fetch(key))
+        assert calls == ["a", "b", "c", "b"]
+        cache.invalidate("a")
+        cache.get("a", lambda: fetch("a"))
+        assert calls[-1] == "a"
+
+    def test_fetch_lock_per_key(self):
+        cache = LinkCache()
+        fetching = threading.Event()
+        release = threading.Event()
+
+        def slow_fetch():
+            fetching.set()
+            release.wait(5)
+            return link(sas_url(3600, "a"))
+
+        thread = threading.Thread(target=lambda: cache.get("a", slow_fetch))
+        thread.start()
+        assert fetching.wait(5)
+        # Fetching the link of a key does not hold the lookups of the other keys
+        assert cache.get("b", lambda: link(sas_url(3600, "b"))).value.links.container_url.href.endswith("sig=b")
+        release.set()
+        thread.join()
+        assert cache._fetch_locks == {}
+
+    def test_get_async(self):
+        cache = LinkCache()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            return link(sas_url(3600))
+
+        async def _main():
+            for _ in range(3):
+                await cache.get_async("a", fetch)
+
+        asyncio.run(_main())
+        assert len(calls) == 1
+
+
+class TestSasRenewal:
+    def test_apply(self):
+        old, new = sas_url(60, "old"), sas_url(3600, "new")
+        renewal = _SasRenewal(old, lambda: new)
+        blob_url = old.replace("container?", "container/a%20b.jpg?comp=block&")
+        assert renewal.apply(blob_url) == new.replace("container?", "container/a%20b.jpg?comp=block&")
+        assert _SasRenewal(old, lambda: None).apply(blob_url) == blob_url
+        assert _SasRenewal(old, None).apply(blob_url) == blob_url
+
+    def test_apply_raw_link(self):
+        # Links as the service returns them: colons of the expiry left as they are, and a parameter that is not
+        # part of the SAS
+        old = "https://account.blob.core.windows.net/container?sv=2020-08-04&se=2024-01-01T00:00:00Z&sr=c&sp=rl" \
+              "&sig=old%2B&comp=list"
+        new = "https://account.blob.core.windows.net/container?sv=2020-08-04&se=2024-01-02T00:00:00Z&sr=c&sp=rl" \
+              "&sig=new%2B"
+        # The storage client re-encodes the url before sending it
+        blob_url = ContainerClient.from_container_url(old).get_blob_client("a b.jpg").url
+        assert "se=2024-01-01T00%3A00%3A00Z" in blob_url
+        renewed = _SasRenewal(old, lambda: new).apply(blob_url + "&comp=block&blockid=MDA%3D")
+        assert get_sas_parameters(renewed) == get_sas_parameters(new)
+        assert renewed.startswith("https://account.blob.core.windows.net/container/a%20b.jpg?")
+        assert "comp=block&blockid=MDA%3D" in renewed
+
+    def test_transport(self):
+        old, new = sas_url(60, "old"), sas_url(3600, "new")
+        transport = _SasRenewingTransport(_SasRenewal(old, lambda: new))
+        request = HttpRequest("GET", old.replace("container?", "container/a.jpg?"))
+        with patch.object(RequestsTransport, "send", return_value="response") as send:
+            assert transport.send(request) == "response"
+        assert send.call_args.args[0].url == new.replace("container?", "container/a.jpg?")
+
+    def test_async_handlers(self):
+        pytest.importorskip("aiohttp")
+        from azure.core.pipeline.transport import AioHttpTransport
+        from reality_capture.service.async_data_handler import (AsyncBucketDataHandler, AsyncRealityDataHandler,
+                                                                _AsyncSasRenewal, _SasRenewingAioTransport)
+        old, new = sas_url(60, "old"), sas_url(3600, "new")
+
+        async def _main():
+            async with AsyncRealityDataHandler(FakeTokenFactory()) as handler:
+                handler._service.get_reality_data_read_access = AsyncMock(side_effect=[link(old), link(new)])
+                assert (await handler._get_link("rd", None, True)).value.links.container_url.href == old
+                # The link expires within the refresh margin, the renewal fetches a new one
+                renewal = _AsyncSasRenewal(old, handler._get_renew_url("rd", None, True))
+                transport = _SasRenewingAioTransport(renewal)
+                request = HttpRequest("GET", old.replace("container?", "container/a.jpg?"))
+                with patch.object(AioHttpTransport, "send", AsyncMock(return_value="response")) as send:
+                    assert await transport.send(request) == "response"
+            async with AsyncBucketDataHandler(FakeTokenFactory()) as bucket_handler:
+                bucket_handler._service.get_bucket = AsyncMock(return_value=link(new))
+                bucket_url = await bucket_handler._get_renew_url("itwin")()
+            return send.call_args.args[0].url, bucket_url
+
+        renewed, bucket_url = asyncio.run(_main())
+        assert renewed == new.replace("container?", "container/a.jpg?")
+        assert bucket_url == new
+
+
+class TestHandlersLinkCache:
+    def setup_method(self, _):
+        cf = os.path.dirname(os.path.abspath(__file__))
+        with open(os.path.join(cf, "data", "reality_data_read_access_200.json"), 'r') as payload_data:
+            self.read_access = json.load(payload_data)
+        with open(os.path.join(cf, "data", "bucket_get_200.json"), 'r') as payload_data:
+            self.bucket = json.load(payload_data)
+
+    @responses.activate
+    def test_reality_data_link_reused(self):
+        rd_id = "d91751e9-9a24-417a-a29c-071c0dca33f0"
+        self.read_access["_links"]["containerUrl"]["href"] = sas_url(3600)
+        responses.add(responses.GET, f"https://api.bentley.com/reality-management/reality-data/{rd_id}/readaccess",
+                      json=self.read_access, status=200)
+        rdh = RealityDataHandler(FakeTokenFactory())
+        with patch("azure.storage.blob.ContainerClient.from_container_url") as client:
+            client.return_value.list_blob_names.return_value = ["a.jpg"]
+            for _ in range(3):
+                assert rdh.list_data(rd_id).value == ["a.jpg"]
+        assert len(responses.calls) == 1
+
+    @responses.activate
+    def test_bucket_link_reused(self):
+        itwin_id = "ad14b27c-91ea-4492-9433-1e2d6903b5e4"
+        self.bucket["_links"]["containerUrl"]["href"] = sas_url(3600)
+        responses.add(responses.GET, f"https://api.bentley.com/reality-modeling/itwins/{itwin_id}/bucket",
+                      json=self.bucket, status=200)
+        bdh = BucketDataHandler(FakeTokenFactory())
+        with patch("azure.storage.blob.ContainerClient.from_container_url") as client:
+            client.return_value.list_blob_names.return_value = []
+            bdh.list_data(itwin_id)
+            bdh.list_data(itwin_id)
+        assert len(responses.calls) == 1
@@ -0,0 +1,191 @@
+import filecmp
+import os
+import tempfile
+import time
+from unittest.mock import patch
+
+import pytest
+
+from reality_capture.service.data_handler import (BucketDataHandler, RealityDataHandler, TransferOptions,
+                                                  _DataHandler)
+from reality_capture.service.detectors import Capabilities, DetectorBase, DetectorVersionCreate
+from reality_capture.service.job import JobCreate, JobState, JobType, Service
+from reality_capture.service.job_monitor import JobMonitor
+from reality_capture.service.mock_server import MockServer, MockServerOptions
+from reality_capture.service.reality_data import RealityDataCreate, RealityDataFilter, Type
+from reality_capture.service.response_cache import ResponseCache
+from reality_capture.service.service import RealityCaptureService
+import reality_capture.specifications.fill_image_properties as fip
+
+
+class FakeTokenFactory:
+    @staticmethod
+    def get_token() -> str:
+        return "Bearer invalid"
+
+
+def _job_create(itwin_id: str = "itwin") -> JobCreate:
+    specifications = fip.FillImagePropertiesSpecificationsCreate(
+        inputs=fip.FillImagePropertiesInputs(imageCollections=["95d8dccd-d89e-4287-bb5f-3219acbc71ae"]),
+        outputs=[fip.FillImagePropertiesOutputsCreate.SCENE])
+    return JobCreate(name="Mock job", type=JobType.FILL_IMAGE_PROPERTIES, iTwinId=itwin_id,
+                     specifications=specifications)
+
+
+@pytest.fixture
+def mock_server():
+    with MockServer(MockServerOptions(queued_duration=0.1, active_duration=0.3, terminating_duration=0.1,
+                                      seed=0)) as server:
+        yield server
+
+
+class TestMockServerApi:
+    def test_job_state_machine(self, mock_server):
+        service = RealityCaptureService(FakeTokenFactory(), service_url=mock_server.url)
+        job = service.submit_job(_job_create())
+        assert job.get_response_status_code() == 201
+        assert job.value.state == JobState.QUEUED
+        assert job.value.specifications.outputs.scene
+        time.sleep(0.25)
+        progress = service.get_job_progress(job.value.id, Service.MODELING).value
+        assert progress.state == JobState.ACTIVE and 0 < progress.percentage < 100
+        time.sleep(0.3)
+        job = service.get_job(job.value.id, Service.MODELING).value
+        assert job.state == JobState.SUCCESS
+        assert job.execution_info.ended_date_time is not None
+        assert service.get_job(job.id, Service.ANALYSIS).get_response_status_code() == 404
+
+    def test_cancel_and_failure(self, mock_server):
+        mock_server.options.failure_probability = 1.0
+        service = RealityCaptureService(FakeTokenFactory(), service_url=mock_server.url)
+        failing = service.submit_job(_job_create()).value
+        cancelled = service.submit_job(_job_create()).value
+        assert service.cancel_job(cancelled.id, Service.MODELING).value.state == JobState.TERMINATING_ON_CANCEL
+        time.sleep(0.5)
+        assert service.get_job(cancelled.id, Service.MODELING).value.state == JobState.CANCELLED
+        assert service.cancel_job(cancelled.id, Service.MODELING).get_response_status_code() == 409
+        assert service.get_job(failing.id, Service.MODELING).value.state == JobState.FAILED
+        messages = service.get_job_messages(failing.id, Service.MODELING).value
+        assert messages.errors[0].params == [failing.id]
+
+    def test_jobs_pages(self, mock_server):
+        service = RealityCaptureService(FakeTokenFactory(), service_url=mock_server.url)
+        ids = [service.submit_job(_job_create()).value.id for _ in range(5)]
+        jobs = list(service.iter_jobs(Service.MODELING, "iTwinId eq 'itwin'", top=2))
+        assert [job.id for job in jobs] == ids
+
+    def test_jobs_filter(self, mock_server):
+        service = RealityCaptureService(FakeTokenFactory(), service_url=mock_server.url)
+        ids = [service.submit_job(_job_create()).value.id for _ in range(5)]
+        other = service.submit_job(_job_create("other")).value.id
+        r = service.get_jobs(Service.MODELING, f"id in ('{ids[3]}', '{ids[1]}', 'unknown')")
+        assert [job.id for job in r.value.jobs] == [ids[1], ids[3]]
+        r = service.get_jobs(Service.MODELING, f"iTwinId eq 'itwin' and id in ('{ids[0]}', '{other}')")
+        assert [job.id for job in r.value.jobs] == [ids[0]]
+        assert service.get_jobs(Service.MODELING, "state eq 'Failed'").value.jobs == []
+        assert service.get_jobs(Service.ANALYSIS, f"id in ('{ids[0]}')").value.jobs == []
+        for filters in ("", "createdDateTime gt '2024-01-01'", "state eq 'Queued' or state eq 'Active'"):
+            r = service.get_jobs(Service.MODELING, filters)
+            assert r.get_response_status_code() == 422 and r.error.error.code == "InvalidJobsRequest"
+
+    def test_job_monitor(self, mock_server):
+        service = RealityCaptureService(FakeTokenFactory(), service_url=mock_server.url)
+        futures = []
+        intervals = {state: 0.05 for state in JobMonitor.DEFAULT_POLL_INTERVALS}
+        with patch.object(service, "get_job", wraps=service.get_job) as get_job, \
+                JobMonitor(service, poll_intervals=intervals) as monitor:
+            for _ in range(5):
+                futures.append(monitor.watch(service.submit_job(_job_create()).value.id, Service.MODELING))
+            assert all(future.result(timeout=10).value.state == JobState.SUCCESS for future in futures)
+        # Batched polls only, the jobs are never fetched one by one
+        get_job.assert_not_called()
+
+    def test_reality_data_and_detectors(self, mock_server):
+        service = RealityCaptureService(FakeTokenFactory(), service_url=mock_server.url)
+        created = service.create_reality_data(RealityDataCreate(iTwinId="itwin", displayName="Scan",
+                                                                type=Type.CC_IMAGE_COLLECTION)).value
+        assert service.get_reality_data(created.id).value.display_name == "Scan"
+        assert len(service.list_reality_data(RealityDataFilter(iTwinId="itwin")).value.reality_data) == 1
+        assert service.move_reality_data(created.id, "other").get_response_status_code() == 200
+        assert service.list_reality_data(RealityDataFilter(iTwinId="itwin")).value.reality_data == []
+        assert service.delete_reality_data(created.id).get_response_status_code() == 204
+        assert service.get_reality_data(created.id).error.error.code == "RealityDataNotFound"
+
+        name = "@bentley/mock-detector"
+        assert not service.create_detector(DetectorBase(name=name, type="PhotoObjectDetector")).is_error()
+        version = DetectorVersionCreate(versionNumber="1.0", capabilities=Capabilities(labels=["crack"],
+                                                                                       exports=["Objects"]))
+        assert not service.create_detector_version(name, version).is_error()
+        assert not service.complete_detector_version_upload(name, "1.0").is_error()
+        assert not service.publish_detector_version(name, "1.0").is_error()
+        assert service.get_detectors().value.detectors[0].latest_version == "1.0"
+        assert service.get_detector(name).value.detector.versions[0].status.value == "Ready"
+
+    def test_throttling(self):
+        with MockServer(MockServerOptions(rate_limit=0.001, rate_burst=2)) as server:
+            service = RealityCaptureService(FakeTokenFactory(), service_url=server.url, retry_policy=None)
+            statuses = [service.get_service_files().get_response_status_code() for _ in range(3)]
+            assert statuses == [200, 200, 429]
+            assert server.get_stats().throttled == 1
+
+    def test_conditional_requests(self, mock_server):
+        cache = ResponseCache(ttls={"service_files": 0.001})
+        service = RealityCaptureService(FakeTokenFactory(), service_url=mock_server.url, response_cache=cache)
+        first = service.get_service_files()
+        time.sleep(0.01)
+        second = service.get_service_files()
+        assert second.value == first.value
+        assert cache.get_stats().revalidations == 1
+
+
+class TestMockServerBlobs:
+    def test_reality_data_transfers(self, mock_server):
+        service = RealityCaptureService(FakeTokenFactory(), service_url=mock_server.url)
+        rd_id = service.create_reality_data(RealityDataCreate(iTwinId="itwin", displayName="Scan",
+                                                              type=Type.CC_IMAGE_COLLECTION)).value.id
+        copy_id = service.create_reality_data(RealityDataCreate(iTwinId="itwin", displayName="Copy",
+                                                                type=Type.CC_IMAGE_COLLECTION)).value.id
+        handler = RealityDataHandler(FakeTokenFactory(), service_url=mock_server.url)
+        with tempfile.TemporaryDirectory() as src, tempfile.TemporaryDirectory() as dst:
+            os.makedirs(os.path.join(src, "sub"))
+            for i in range(10):
+                with open(os.path.join(src, f"{i}.jpg"), "wb") as f:
+                    f.write(os.urandom(100 * i))
+            with open(os.path.join(src, "sub", "large.bin"), "wb") as f:
+                # Larger than a single put, uploaded in blocks and downloaded in ranges
+                f.write(os.urandom(10 * 1024 * 1024))
+            assert not handler.upload_data(rd_id, src).is_error()
+            uploaded = mock_server.get_stats().bytes_uploaded
+            assert not handler.upload_data(rd_id, src, sync=True).is_error()
+            assert mock_server.get_stats().bytes_uploaded == uploaded
+            assert not handler.download_data(rd_id, dst).is_error()
+            assert not filecmp.dircmp(src, dst).diff_files
+            assert filecmp.cmp(os.path.join(src, "sub", "large.bin"), os.path.join(dst, "sub", "large.bin"),
+                               shallow=False)
+        assert service.get_reality_data(rd_id).value.size > 10 * 1024
+        assert not handler.copy_data(rd_id, copy_id).is_error()
+        assert sorted(handler.list_data(copy_id).value) == sorted(handler.list_data(rd_id).value)
+        r = handler.delete_data(rd_id, ["0.jpg", "missing.jpg"])
+        assert [detail.target for detail in r.error.error.details] == ["missing.jpg"]
+        assert handler.delete_prefix(rd_id, "sub/").get_response_status_code() == 204
+        assert len(handler.list_data(rd_id).value) == 9
+
+    def test_bucket_block_transfers(self, mock_server):
+        handler = BucketDataHandler(FakeTokenFactory(), service_url=mock_server.url)
+        # Batched uploads stage the files larger than a chunk block by block
+        handler.set_transfer_options(TransferOptions(chunk_size=1024 * 1024, small_file_batch_size=4))
+        with tempfile.TemporaryDirectory() as src, tempfile.TemporaryDirectory() as dst:
+            for name, size in [("small.txt", 4), ("large.bin", 3 * 1024 * 1024 + 5)]:
+                with open(os.path.join(src, name), "wb") as f:
+                    f.write(os.urandom(size))
+            assert not handler.upload_data("itwin", src, "folder").is_error()
+            assert sorted(handler.list_data("itwin").value) == ["folder/large.bin", "folder/small.txt"]
+            assert not handler.download_data("itwin", dst, "folder").is_error()
+            assert filecmp.cmp(os.path.join(src, "large.bin"), os.path.join(dst, "large.bin"), shallow=False)
+
+    def test_container_url(self, mock_server):
+        url = mock_server.create_container("benchmark")
+        assert url.startswith(mock_server.url + "blobs/benchmark?")
+        assert _DataHandler.list_data(url).value == []
+        handler = RealityDataHandler(FakeTokenFactory(), service_url=mock_server.url)
+        assert handler.list_data("unknown").get_response_status_code() == 404
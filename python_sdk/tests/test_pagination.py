@@ -0,0 +1,151 @@
+import asyncio
+import json
+import os
+import threading
+from types import SimpleNamespace
+
+import pytest
+import responses
+
+from reality_capture.service.error import DetailedErrorResponse
+from reality_capture.service.job import Service
+from reality_capture.service.pagination import AsyncPageIterator, PageIterator
+from reality_capture.service.reality_data import RealityDataFilter
+from reality_capture.service.response import Response
+from reality_capture.service.service import RealityCaptureService
+
+
+class FakeTokenFactory:
+    @staticmethod
+    def get_token() -> str:
+        return "Bearer invalid"
+
+
+def fake_pages(nb_pages, page_size=3):
+    pages = {None if i == 0 else str(i): Response(200, None, SimpleNamespace(
+        items=[i * page_size + j for j in range(page_size)], token=str(i + 1) if i + 1 < nb_pages else None))
+        for i in range(nb_pages)}
+    requested = []
+
+    def fetch_page(token):
+        requested.append(token)
+        return pages[token]
+
+    return fetch_page, requested
+
+
+def page_iterator(fetch_page, **kwargs):
+    return PageIterator(fetch_page, lambda page: page.items, lambda page: page.token, **kwargs)
+
+
+class TestPageIterator:
+    def test_follows_pages(self):
+        fetch_page, requested = fake_pages(3)
+        iterator = page_iterator(fetch_page)
+        assert list(iterator) == list(range(9))
+        assert requested == [None, "1", "2"]
+        assert iterator.error is None
+
+    def test_lazy(self):
+        fetch_page, requested = fake_pages(3)
+        iterator = page_iterator(fetch_page, prefetch=False)
+        assert requested == []
+        assert next(iterator) == 0
+        assert requested == [None]
+        iterator.close()
+
+    def test_prefetch_in_background(self):
+        fetch_page, requested = fake_pages(2)
+        second_page_requested = threading.Event()
+
+        def fetch(token):
+            if token is not None:
+                second_page_requested.set()
+            return fetch_page(token)
+
+        iterator = page_iterator(fetch)
+        assert next(iterator) == 0
+        # The next page is requested while the first one is still being consumed
+        assert second_page_requested.wait(5)
+        assert list(iterator) == [1, 2, 3, 4, 5]
+
+    def test_max_items(self):
+        fetch_page, requested = fake_pages(10)
+        assert list(page_iterator(fetch_page, max_items=4)) == [0, 1, 2, 3]
+        assert requested == [None, "1"]
+        fetch_page, requested = fake_pages(10)
+        assert list(page_iterator(fetch_page, max_items=3)) == [0, 1, 2]
+        assert requested == [None]
+
+    def test_error_stops(self):
+        fetch_page, _ = fake_pages(3)
+        error = Response(401, DetailedErrorResponse(error={"code": "HeaderNotFound", "message": "denied"}), None)
+        iterator = page_iterator(lambda token: error if token == "2" else fetch_page(token))
+        assert list(iterator) == list(range(6))
+        assert iterator.error is error
+
+    def test_async(self):
+        fetch_page, requested = fake_pages(3)
+
+        async def fetch(token):
+            return fetch_page(token)
+
+        async def _main():
+            iterator = AsyncPageIterator(fetch, lambda page: page.items, lambda page: page.token, max_items=7)
+            return [item async for item in iterator]
+
+        assert asyncio.run(_main()) == list(range(7))
+        assert requested == [None, "1", "2"]
+
+
+class TestServicePagination:
+    def setup_method(self, _):
+        self.rcs = RealityCaptureService(FakeTokenFactory())
+        cf = os.path.dirname(os.path.abspath(__file__))
+        self.data_folder = os.path.join(cf, "data")
+
+    def _load(self, name):
+        with open(os.path.join(self.data_folder, name), 'r') as payload_data:
+            return json.load(payload_data)
+
+    @responses.activate
+    def test_iter_jobs(self):
+        first_page = self._load("jobs_get_200.json")
+        last_page = {**first_page, "_links": None}
+        responses.add(responses.GET, "https://api.bentley.com/reality-modeling/jobs", json=first_page, status=200)
+        responses.add(responses.GET, "https://api.bentley.com/reality-modeling/jobs", json=last_page, status=200)
+        jobs = list(self.rcs.iter_jobs(Service.MODELING, "state eq 'Success'"))
+        assert len(jobs) == 4
+        assert "continuationToken=MTRmZDkwOGYtNWEzOS00YzY3LWFmMGYtMGMxMWQxYWNkMDhl" in responses.calls[1].request.url
+
+    @responses.activate
+    def test_iter_jobs_max_items(self):
+        responses.add(responses.GET, "https://api.bentley.com/reality-modeling/jobs",
+                      json=self._load("jobs_get_200.json"), status=200)
+        jobs = list(self.rcs.iter_jobs(Service.MODELING, "state eq 'Success'", max_items=2))
+        assert len(jobs) == 2
+        assert len(responses.calls) == 1
+        assert "%24top=2" in responses.calls[0].request.url
+
+    @responses.activate
+    def test_iter_reality_data(self):
+        first_page = self._load("reality_data_list_minimal_200.json")
+        responses.add(responses.GET, "https://api.bentley.com/reality-management/reality-data/", json=first_page,
+                      status=200)
+        responses.add(responses.GET, "https://api.bentley.com/reality-management/reality-data/",
+                      json={**first_page, "_links": None}, status=200)
+        rd_filter = RealityDataFilter(iTwinId="0d4e1f7b-1a4c-0000-0000-1643d04e3954")
+        iterator = self.rcs.iter_reality_data(rd_filter, max_items=5)
+        assert len(list(iterator)) == 2
+        assert iterator.error is None
+        assert "%24top=5" in responses.calls[0].request.url
+        assert "continuationToken=eyJ0b3AiOjEwMCwic2tpcCI6MTAwfQ" in responses.calls[1].request.url
+        assert "iTwinId=0d4e1f7b-1a4c-0000-0000-1643d04e3954" in responses.calls[1].request.url
+
+    @responses.activate
+    def test_iter_reality_data_error(self):
+        responses.add(responses.GET, "https://api.bentley.com/reality-management/reality-data/",
+                      json=self._load("reality_data_list_422.json"), status=422)
+        iterator = self.rcs.iter_reality_data()
+        assert list(iterator) == []
+        assert iterator.error.get_response_status_code() == 422
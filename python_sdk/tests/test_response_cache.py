@@ -0,0 +1,183 @@
+import json
+import os
+from unittest.mock import patch
+
+import responses
+
+from reality_capture.service.detectors import DetectorUpdate
+from reality_capture.service.error import DetailedError, DetailedErrorResponse
+from reality_capture.service.files import Files
+from reality_capture.service.reality_data import RealityDataUpdate
+from reality_capture.service.response import Response
+from reality_capture.service.response_cache import ResponseCache
+from reality_capture.service.service import RealityCaptureService
+
+
+class FakeTokenFactory:
+    @staticmethod
+    def get_token() -> str:
+        return "Bearer invalid"
+
+
+def _files_response() -> Response:
+    return Response(status_code=200, error=None, value=Files(files=[]))
+
+
+class TestResponseCache:
+    def test_fresh_and_expired(self):
+        cache = ResponseCache(ttls={"service_files": 10})
+        with patch("reality_capture.service.response_cache.time.monotonic", return_value=100.0):
+            cache.store(("service_files",), _files_response(), etag='"v1"')
+            cached, etag = cache.get(("service_files",))
+        assert cached.value == Files(files=[]) and etag is None
+        with patch("reality_capture.service.response_cache.time.monotonic", return_value=111.0):
+            cached, etag = cache.get(("service_files",))
+        assert cached is None and etag == '"v1"'
+        assert cache.get_stats().hits == 1
+        assert cache.get_stats().misses == 1
+
+    def test_revalidate(self):
+        cache = ResponseCache(ttls={"service_files": 0.001})
+        cache.store(("service_files",), _files_response(), etag='"v1"')
+        with patch("reality_capture.service.response_cache.time.monotonic", return_value=1e12):
+            assert cache.get(("service_files",))[0] is None
+            assert cache.revalidate(("service_files",), '"v0"') is None
+            assert cache.revalidate(("service_files",), '"v1"').value == Files(files=[])
+        stats = cache.get_stats()
+        assert (stats.hits, stats.misses, stats.revalidations) == (1, 0, 1)
+
+    def test_errors_and_disabled_endpoints_not_stored(self):
+        cache = ResponseCache(ttls={"detector": 0})
+        error = DetailedErrorResponse(error=DetailedError(code="NotFound", message="Not found"))
+        cache.store(("service_files",), Response(status_code=404, error=error, value=None))
+        cache.store(("detector", "name"), _files_response())
+        cache.store(("bucket", "itwin"), _files_response())
+        cache.store(("unknown",), _files_response())
+        assert cache.get(("service_files",)) == (None, None)
+        assert cache.get(("detector", "name")) == (None, None)
+        assert cache.get(("bucket", "itwin")) == (None, None)
+        assert cache.get(("unknown",)) == (None, None)
+
+    def test_lru_eviction(self):
+        cache = ResponseCache(max_size=2)
+        cache.store(("detector", "a"), _files_response())
+        cache.store(("detector", "b"), _files_response())
+        cache.get(("detector", "a"))
+        cache.store(("detector", "c"), _files_response())
+        assert cache.get(("detector", "b"))[0] is None
+        assert cache.get(("detector", "a"))[0] is not None
+        assert cache.get_stats().evictions == 1
+
+    def test_invalidate_prefix(self):
+        cache = ResponseCache()
+        cache.store(("reality_data", "rd1", None), _files_response())
+        cache.store(("reality_data", "rd1", "itwin"), _files_response())
+        cache.store(("reality_data", "rd2", None), _files_response())
+        cache.invalidate(("reality_data", "rd1"))
+        assert cache.get(("reality_data", "rd1", None))[0] is None
+        assert cache.get(("reality_data", "rd1", "itwin"))[0] is None
+        assert cache.get(("reality_data", "rd2", None))[0] is not None
+        cache.invalidate()
+        assert cache.get(("reality_data", "rd2", None))[0] is None
+
+    def test_returned_responses_are_copies(self):
+        cache = ResponseCache()
+        response = _files_response()
+        cache.store(("service_files",), response)
+        response.value.files.append(None)
+        cached = cache.get(("service_files",))[0]
+        cached.value.files.append(None)
+        assert cache.get(("service_files",))[0].value.files == []
+
+
+class TestServiceResponseCache:
+    rd_id = "95d8dccd-d89e-4287-bb5f-3219acbc71ae"
+    rd_url = f"https://api.bentley.com/reality-management/reality-data/{rd_id}"
+
+    def setup_method(self, _):
+        self.cache = ResponseCache()
+        self.rcs = RealityCaptureService(FakeTokenFactory(), response_cache=self.cache)
+        cf = os.path.dirname(os.path.abspath(__file__))
+        self.data_folder = os.path.join(cf, "data")
+
+    def _load(self, name):
+        with open(os.path.join(self.data_folder, name), 'r') as payload_data:
+            return json.load(payload_data)
+
+    @responses.activate
+    def test_not_cached_by_default(self):
+        responses.add(responses.GET, "https://api.bentley.com/reality-modeling/files",
+                      json=self._load("files_get_200.json"), status=200)
+        rcs = RealityCaptureService(FakeTokenFactory())
+        rcs.get_service_files()
+        rcs.get_service_files()
+        assert len(responses.calls) == 2
+
+    @responses.activate
+    def test_reality_data_invalidated_by_writes(self):
+        responses.add(responses.GET, self.rd_url, json=self._load("reality_data_get_200.json"), status=200)
+        responses.add(responses.PATCH, self.rd_url, json=self._load("reality_data_get_200.json"), status=200)
+        responses.add(responses.DELETE, self.rd_url, status=204)
+        first = self.rcs.get_reality_data(self.rd_id)
+        second = self.rcs.get_reality_data(self.rd_id)
+        assert not second.is_error() and second.value == first.value
+        assert len(responses.calls) == 1
+        self.rcs.update_reality_data(RealityDataUpdate(displayName="Renamed"), self.rd_id)
+        self.rcs.get_reality_data(self.rd_id)
+        assert len(responses.calls) == 3
+        self.rcs.delete_reality_data(self.rd_id)
+        self.rcs.get_reality_data(self.rd_id)
+        assert len(responses.calls) == 5
+        assert self.cache.get_stats().hits == 1
+
+    @responses.activate
+    def test_errors_not_cached(self):
+        responses.add(responses.GET, self.rd_url, status=404,
+                      json={"error": {"code": "RealityDataNotFound", "message": "Not found."}})
+        assert self.rcs.get_reality_data(self.rd_id).is_error()
+        assert self.rcs.get_reality_data(self.rd_id).is_error()
+        assert len(responses.calls) == 2
+
+    @responses.activate
+    def test_detectors_invalidated_by_update(self):
+        detectors_url = "https://api.bentley.com/reality-analysis/detectors"
+        responses.add(responses.GET, detectors_url, json=self._load("detectors_get_200.json"), status=200)
+        responses.add(responses.GET, detectors_url + "/mydetector", json=self._load("detector_get_200.json"),
+                      status=200)
+        responses.add(responses.PATCH, detectors_url + "/mydetector", json=self._load("detector_update_200.json"),
+                      status=200)
+        for _ in range(2):
+            assert not self.rcs.get_detectors().is_error()
+            assert not self.rcs.get_detector("mydetector").is_error()
+        assert len(responses.calls) == 2
+        self.rcs.update_detector("mydetector", DetectorUpdate(description="Updated"))
+        self.rcs.get_detectors()
+        self.rcs.get_detector("mydetector")
+        assert len(responses.calls) == 5
+
+    @responses.activate
+    def test_bucket_not_cached(self):
+        # Its SAS link would outlive its expiry, the data handlers cache it in a LinkCache instead
+        bucket_url = "https://api.bentley.com/reality-modeling/itwins/itwin/bucket"
+        responses.add(responses.GET, bucket_url, json=self._load("bucket_get_200.json"), status=200,
+                      headers={"ETag": '"v1"'})
+        self.rcs.get_bucket("itwin")
+        self.rcs.get_bucket("itwin")
+        assert len(responses.calls) == 2
+        assert "If-None-Match" not in responses.calls[1].request.headers
+
+    @responses.activate
+    def test_etag_revalidation(self):
+        files_url = "https://api.bentley.com/reality-modeling/files"
+        responses.add(responses.GET, files_url, json=self._load("files_get_200.json"), status=200,
+                      headers={"ETag": '"v1"'})
+        responses.add(responses.GET, files_url, status=304,
+                      match=[responses.matchers.header_matcher({"If-None-Match": '"v1"'})])
+        first = self.rcs.get_service_files()
+        with patch("reality_capture.service.response_cache.time.monotonic", return_value=1e12):
+            second = self.rcs.get_service_files()
+        assert not second.is_error() and second.value == first.value
+        assert len(responses.calls) == 2
+        assert responses.calls[1].request.headers["If-None-Match"] == '"v1"'
+        stats = self.cache.get_stats()
+        assert (stats.hits, stats.misses, stats.revalidations) == (1, 1, 1)
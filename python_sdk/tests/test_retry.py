@@ -0,0 +1,153 @@
+import json
+import os
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import requests
+import responses
+
+from reality_capture.service.job import Service
+from reality_capture.service.retry import RateLimiter, RetryPolicy, parse_retry_after
+from reality_capture.service.service import RealityCaptureService
+
+
+class FakeTokenFactory:
+    @staticmethod
+    def get_token() -> str:
+        return "Bearer invalid"
+
+
+class TestRetryPolicy:
+    def test_parse_retry_after(self):
+        assert parse_retry_after("12") == 12.0
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("soon") is None
+        date = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+        assert 28 <= parse_retry_after(date) <= 30
+        date = format_datetime(datetime.now(timezone.utc) - timedelta(seconds=30), usegmt=True)
+        assert parse_retry_after(date) == 0.0
+
+    def test_backoff(self):
+        policy = RetryPolicy(backoff_factor=1.0, max_backoff=5.0, jitter=0.0)
+        assert [policy.get_backoff(i) for i in range(5)] == [1.0, 2.0, 4.0, 5.0, 5.0]
+        policy = RetryPolicy(backoff_factor=1.0, jitter=0.5)
+        assert all(2.0 <= policy.get_backoff(2) <= 4.0 for _ in range(100))
+
+    def test_get_delay(self):
+        policy = RetryPolicy(max_retries=2, jitter=0.0)
+        assert policy.get_delay("GET", 0) == 0.5
+        assert policy.get_delay("GET", 1, 503) == 1.0
+        assert policy.get_delay("GET", 2, 503) is None
+        assert policy.get_delay("GET", 0, 404) is None
+        assert policy.get_delay("POST", 0) is None
+        assert policy.get_delay("POST", 0, 500) is None
+        assert policy.get_delay("POST", 0, 429) == 0.5
+        assert policy.get_delay("POST", 0, 429, "7") == 7.0
+        assert policy.get_delay("DELETE", 0, 503, "3") == 3.0
+        assert policy.get_delay("GET", 0, 500, "3") == 0.5
+        assert policy.get_delay("GET", 0, 429, "3600") is None
+
+
+class TestRateLimiter:
+    def test_burst_then_rate(self):
+        with patch("reality_capture.service.retry.time.monotonic", return_value=100.0):
+            limiter = RateLimiter(rate=10, burst=3)
+            delays = [limiter.reserve() for _ in range(5)]
+        assert delays[:3] == [0.0, 0.0, 0.0]
+        assert abs(delays[3] - 0.1) < 1e-9
+        assert abs(delays[4] - 0.2) < 1e-9
+
+    def test_refill(self):
+        with patch("reality_capture.service.retry.time.monotonic") as monotonic:
+            monotonic.return_value = 100.0
+            limiter = RateLimiter(rate=2, burst=2)
+            assert [limiter.reserve() for _ in range(2)] == [0.0, 0.0]
+            monotonic.return_value = 101.0
+            assert [limiter.reserve() for _ in range(2)] == [0.0, 0.0]
+            assert limiter.reserve() == 0.5
+
+    def test_pause(self):
+        with patch("reality_capture.service.retry.time.monotonic", return_value=100.0):
+            limiter = RateLimiter(rate=10, burst=5)
+            limiter.pause(2.0)
+            assert abs(limiter.reserve() - 2.1) < 1e-9
+            # A shorter pause does not shorten the current one
+            limiter.pause(1.0)
+            assert abs(limiter.reserve() - 2.2) < 1e-9
+
+
+class TestServiceRetry:
+    def setup_method(self, _):
+        cf = os.path.dirname(os.path.abspath(__file__))
+        with open(os.path.join(cf, "data", "job_get_200.json"), 'r') as payload_data:
+            self.job = json.load(payload_data)
+        self.url = "https://api.bentley.com/reality-modeling/jobs/6b1d5fb8-c5a4-4b7c-8e42-0f35f0e3aa2c"
+
+    @responses.activate
+    def test_retry_after(self):
+        responses.add(responses.GET, self.url, status=503, headers={"Retry-After": "4"},
+                      json={"error": {"code": "ServiceUnavailable", "message": "Try again later."}})
+        responses.add(responses.GET, self.url, status=200, json=self.job)
+        rcs = RealityCaptureService(FakeTokenFactory())
+        with patch("reality_capture.service.service.time.sleep") as sleep:
+            r = rcs.get_job("6b1d5fb8-c5a4-4b7c-8e42-0f35f0e3aa2c", Service.MODELING)
+        assert not r.is_error()
+        assert len(responses.calls) == 2
+        sleep.assert_called_once_with(4.0)
+
+    @responses.activate
+    def test_gives_up(self):
+        responses.add(responses.GET, self.url, status=500, json={"error": {"code": "InternalError", "message": "x"}})
+        rcs = RealityCaptureService(FakeTokenFactory(), retry_policy=RetryPolicy(max_retries=2))
+        with patch("reality_capture.service.service.time.sleep") as sleep:
+            r = rcs.get_job("6b1d5fb8-c5a4-4b7c-8e42-0f35f0e3aa2c", Service.MODELING)
+        assert r.get_response_status_code() == 500
+        assert r.error.error.code == "InternalError"
+        assert len(responses.calls) == 3
+        assert sleep.call_count == 2
+
+    @responses.activate
+    def test_network_error(self):
+        responses.add(responses.GET, self.url, body=requests.exceptions.ConnectionError("network failure"))
+        responses.add(responses.GET, self.url, status=200, json=self.job)
+        rcs = RealityCaptureService(FakeTokenFactory())
+        with patch("reality_capture.service.service.time.sleep"):
+            r = rcs.get_job("6b1d5fb8-c5a4-4b7c-8e42-0f35f0e3aa2c", Service.MODELING)
+        assert not r.is_error()
+
+    @responses.activate
+    def test_post_not_retried(self):
+        url = "https://api.bentley.com/reality-analysis/detectors/my-detector/versions/1.0/publish"
+        responses.add(responses.POST, url, status=500, json={"error": {"code": "InternalError", "message": "x"}})
+        rcs = RealityCaptureService(FakeTokenFactory())
+        with patch("reality_capture.service.service.time.sleep") as sleep:
+            r = rcs.publish_detector_version("my-detector", "1.0")
+        assert r.get_response_status_code() == 500
+        assert len(responses.calls) == 1
+        sleep.assert_not_called()
+
+    @responses.activate
+    def test_throttled_post_retried(self):
+        url = "https://api.bentley.com/reality-analysis/detectors/my-detector/versions/1.0/publish"
+        responses.add(responses.POST, url, status=429, headers={"Retry-After": "1"},
+                      json={"error": {"code": "TooManyRequests", "message": "Slow down."}})
+        responses.add(responses.POST, url, status=200)
+        limiter = RateLimiter(rate=100, burst=10)
+        rcs = RealityCaptureService(FakeTokenFactory(), rate_limiter=limiter)
+        with patch("reality_capture.service.service.time.sleep") as sleep:
+            r = rcs.publish_detector_version("my-detector", "1.0")
+        assert not r.is_error()
+        assert len(responses.calls) == 2
+        sleep.assert_any_call(1.0)
+        # The throttling paused the limiter for the other requests
+        assert limiter.reserve() > 0.5
+
+    @responses.activate
+    def test_disabled(self):
+        responses.add(responses.GET, self.url, status=503, headers={"Retry-After": "1"},
+                      json={"error": {"code": "ServiceUnavailable", "message": "Try again later."}})
+        rcs = RealityCaptureService(FakeTokenFactory(), retry_policy=None)
+        r = rcs.get_job("6b1d5fb8-c5a4-4b7c-8e42-0f35f0e3aa2c", Service.MODELING)
+        assert r.get_response_status_code() == 503
+        assert len(responses.calls) == 1
@@ -0,0 +1,109 @@
+import http.server
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from reality_capture.service.job import Service
+from reality_capture.service.reality_data import Prefer
+from reality_capture.service.service import RealityCaptureService
+
+
+class FakeTokenFactory:
+    @staticmethod
+    def get_token() -> str:
+        return "Bearer invalid"
+
+
+class _ApiRequestHandler(http.server.BaseHTTPRequestHandler):
+    # Keep-alive, so that the client connection pool is exercised
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        with self.server.lock:
+            self.server.requests.append((path, dict(self.headers)))
+            self.server.clients.add(self.client_address)
+        if path.startswith("/reality-modeling/jobs/"):
+            job = json.loads(json.dumps(self.server.job))
+            job["job"]["id"] = path.rsplit("/", 1)[1]
+            body = json.dumps(job)
+        elif path == "/reality-management/reality-data/":
+            prefer = self.headers.get("Prefer")
+            body = json.dumps(self.server.rd_list[prefer])
+        else:
+            body = ""
+        self.send_response(200 if body else 404)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def api_server():
+    data_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+    def _load(name):
+        with open(os.path.join(data_folder, name), 'r') as payload_data:
+            return json.load(payload_data)
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _ApiRequestHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.requests = []
+    server.clients = set()
+    server.job = _load("job_get_200.json")
+    server.rd_list = {"return=minimal": _load("reality_data_list_minimal_200.json"),
+                      "return=representation": _load("reality_data_list_representation_200.json")}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestServiceConcurrency:
+    def test_shared_service_stress(self, api_server, caplog):
+        rcs = RealityCaptureService(FakeTokenFactory(), max_connections=16)
+        rcs._service_url = f"http://127.0.0.1:{api_server.server_port}/"
+
+        def _call(i):
+            if i % 3 == 0:
+                job_id = f"00000000-0000-0000-0000-{i:012d}"
+                r = rcs.get_job(job_id, Service.MODELING)
+                return not r.is_error() and r.value.id == job_id
+            prefer = Prefer.REPRESENTATION if i % 3 == 1 else None
+            r = rcs.list_reality_data(prefer=prefer)
+            return not r.is_error() and r.value.reality_data[0].__class__.__name__ == (
+                "RealityData" if prefer else "RealityDataMinimal")
+
+        with caplog.at_level(logging.WARNING, logger="urllib3"):
+            with ThreadPoolExecutor(max_workers=16) as executor:
+                results = list(executor.map(_call, range(600)))
+        assert all(results)
+        assert len(api_server.requests) == 600
+        for path, headers in api_server.requests:
+            if path.startswith("/reality-modeling/"):
+                assert headers["Accept"] == "application/vnd.bentley.itwin-platform.v2+json"
+                assert "Prefer" not in headers
+            else:
+                assert headers["Accept"] == "application/vnd.bentley.itwin-platform.v1+json"
+                assert headers["Prefer"] in ("return=minimal", "return=representation")
+            assert headers["Authorization"] == "Bearer invalid"
+        # Connections are reused from a pool sized for the threads
+        assert len(api_server.clients) <= 16
+        assert "Connection pool is full" not in caplog.text
+
+    def test_base_header_read_only(self):
+        rcs = RealityCaptureService(FakeTokenFactory())
+        with pytest.raises(TypeError):
+            rcs._header["Prefer"] = "return=minimal"
+        header = rcs._get_header_v1()
+        header["Prefer"] = "return=minimal"
+        assert "Prefer" not in rcs._get_header_v1()
@@ -1,6 +1,8 @@
 import responses
 import json
 import os
+import threading
+import time
 from unittest.mock import patch
 import requests
 
@@ -154,3 +156,55 @@ class TestServiceJobs:
         assert response.is_error()
         assert response.error.error.code == "UnknownError"
 
+
+    @responses.activate
+    def test_submit_jobs(self):
+        with open(os.path.join(self.data_folder, "job_create_201.json"), 'r') as payload_data:
+            created = json.load(payload_data)
+        lock = threading.Lock()
+        state = {"running": 0, "peak": 0, "throttled": False}
+
+        def _create(request):
+            name = json.loads(request.body)["name"]
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+                throttle = name == "job3" and not state["throttled"]
+                state["throttled"] = state["throttled"] or throttle
+            time.sleep(0.02)
+            with lock:
+                state["running"] -= 1
+            if throttle:
+                return 429, {"Retry-After": "0"}, json.dumps({"error": {"code": "TooManyRequests",
+                                                                         "message": "Slow down."}})
+            if name == "job5":
+                return 422, {}, json.dumps({"error": {"code": "InvalidJobSpecifications", "message": "Bad inputs."}})
+            return 201, {}, json.dumps({"job": {**created["job"], "name": name}})
+
+        responses.add_callback(responses.POST, "https://api.bentley.com/reality-modeling/jobs", callback=_create)
+        jobs = [self._make_fip_job_create().model_copy(update={"name": f"job{i}"}) for i in range(12)]
+        original = JobCreate.get_appropriate_service
+
+        def _get_service(job):
+            if job.name == "job7":
+                raise NotImplementedError("unsupported")
+            return original(job)
+
+        with patch.object(JobCreate, "get_appropriate_service", _get_service):
+            results = self.rcs.submit_jobs(jobs, max_parallel=4)
+        assert len(results) == 12
+        for i, r in enumerate(results):
+            if i == 5:
+                assert r.get_response_status_code() == 422
+            elif i == 7:
+                assert r.get_response_status_code() == 400
+            else:
+                assert not r.is_error()
+                assert r.value.name == f"job{i}"
+        assert state["throttled"]
+        assert state["peak"] <= 4
+        # 11 serializable jobs, one of them sent twice
+        assert len(responses.calls) == 12
+
+    def test_submit_jobs_empty(self):
+        assert self.rcs.submit_jobs([]) == []
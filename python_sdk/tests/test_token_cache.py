@@ -0,0 +1,125 @@
+import base64
+import json
+import threading
+import time
+from unittest.mock import patch
+
+import responses
+
+from reality_capture.service.job import Service
+from reality_capture.service.service import RealityCaptureService
+from reality_capture.service.token_cache import TokenCache, get_token_expiry
+
+
+def make_token(exp, sub="user"):
+    def _encode(data):
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+
+    return f"Bearer {_encode({'alg': 'RS256'})}.{_encode({'sub': sub, 'exp': exp})}.signature"
+
+
+class CountingTokenFactory:
+    def __init__(self, lifetime=3600.0, delay=0.0):
+        self.lifetime = lifetime
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def get_token(self) -> str:
+        with self.lock:
+            self.calls += 1
+            calls = self.calls
+        time.sleep(self.delay)
+        return make_token(time.time() + self.lifetime, sub=f"user{calls}")
+
+
+class TestTokenCache:
+    def test_get_cached_token(self):
+        factory = CountingTokenFactory()
+        cache = TokenCache(factory)
+        # Never calls the factory, the caller decides where to wait for it
+        assert cache.get_cached_token() is None
+        token = cache.get_token()
+        assert cache.get_cached_token() == token
+        assert factory.calls == 1
+
+    def test_get_token_expiry(self):
+        assert get_token_expiry(make_token(1700000000)) == 1700000000.0
+        assert get_token_expiry(make_token(1700000000)[len("Bearer "):]) == 1700000000.0
+        assert get_token_expiry("Bearer invalid") is None
+        assert get_token_expiry("Bearer a.b.c") is None
+
+    def test_cached(self):
+        factory = CountingTokenFactory()
+        cache = TokenCache(factory)
+        token = cache.get_token()
+        assert all(cache.get_token() == token for _ in range(100))
+        assert factory.calls == 1
+
+    def test_opaque_token_not_cached(self):
+        class OpaqueTokenFactory:
+            calls = 0
+
+            def get_token(self):
+                self.calls += 1
+                return "Bearer opaque"
+
+        factory = OpaqueTokenFactory()
+        cache = TokenCache(factory)
+        assert [cache.get_token() for _ in range(3)] == ["Bearer opaque"] * 3
+        assert factory.calls == 3
+
+    def test_concurrent_first_fetch(self):
+        factory = CountingTokenFactory(delay=0.1)
+        cache = TokenCache(factory)
+        tokens = []
+        threads = [threading.Thread(target=lambda: tokens.append(cache.get_token())) for _ in range(16)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert factory.calls == 1
+        assert len(set(tokens)) == 1
+
+    def test_background_refresh(self):
+        factory = CountingTokenFactory(lifetime=60.0, delay=0.2)
+        cache = TokenCache(factory, refresh_margin=120.0)
+        first = cache.get_token()
+        start = time.monotonic()
+        # Within the margin: the cached token is returned without waiting for the refresh
+        assert cache.get_token() == first
+        assert cache.get_token() == first
+        assert time.monotonic() - start < 0.1
+        deadline = time.monotonic() + 5
+        while cache.get_token() == first and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert factory.calls >= 2
+        assert cache.get_token() != first
+
+    def test_refresh_failure_keeps_token(self):
+        factory = CountingTokenFactory(lifetime=60.0)
+        cache = TokenCache(factory, refresh_margin=120.0)
+        first = cache.get_token()
+        with patch.object(factory, "get_token", side_effect=RuntimeError("identity provider down")):
+            assert cache.get_token() == first
+            time.sleep(0.1)
+            assert cache.get_token() == first
+
+    def test_expired(self):
+        factory = CountingTokenFactory(lifetime=-1.0)
+        cache = TokenCache(factory)
+        assert cache.get_token() != cache.get_token()
+        assert factory.calls == 2
+
+    @responses.activate
+    def test_service_invalidates_on_401(self):
+        url = "https://api.bentley.com/reality-modeling/jobs/6b1d5fb8-c5a4-4b7c-8e42-0f35f0e3aa2c"
+        responses.add(responses.GET, url, status=401,
+                      json={"error": {"code": "InvalidToken", "message": "Token was revoked."}})
+        factory = CountingTokenFactory()
+        rcs = RealityCaptureService(factory)
+        for _ in range(2):
+            rcs.get_job("6b1d5fb8-c5a4-4b7c-8e42-0f35f0e3aa2c", Service.MODELING)
+        assert factory.calls == 2
+        tokens = [call.request.headers["Authorization"] for call in responses.calls]
+        assert tokens[0] != tokens[1]